@@ -0,0 +1,1198 @@
+# analysis_service.py
+"""
+Analysis layer behind the Flask app.
+
+Jobs run in dedicated worker processes, so annotation, radar drawing and the
+other Python-side work in the pipelines never competes with request handling
+for the GIL. The web process only talks to the workers through local queues:
+each worker has its own task queue and is handed one job at a time once it
+reports itself free; status updates come back on the shared `_event_queue`
+and are applied to `jobs` by a listener thread. Per-worker task queues mean a
+worker killed in the middle of `get()` cannot wedge the queue for the others.
+
+Nothing heavy (torch, supervision, sports, cv2, the pipelines) is imported in
+the web process; each worker loads the pipelines and models when it starts
+(warmup) or on its first job.
+"""
+import os
+import sys
+import json
+import shutil
+import time
+import signal
+import uuid
+import queue
+import atexit
+import threading
+import traceback
+import multiprocessing as mp
+from collections import Counter, deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from pathlib import Path
+
+from video_index import VideoIndex
+from storage import StorageManager
+
+# --- CONFIG: adjust to your backend paths ---
+BASE_DIR = Path(__file__).resolve().parent
+FOOT_DIR = BASE_DIR / "foot"
+UPLOAD_FOLDER = BASE_DIR / "uploaded_videos"        # where uploaded videos are stored
+OUTPUT_FOLDER = BASE_DIR / "output_videos"         # where model outputs should go
+TRACKS_FOLDER = BASE_DIR / "tracks"                # per-job stored tracks for /rerender
+METRICS_FOLDER = BASE_DIR / "metrics"              # per-job match metrics summaries
+HEATMAPS_FOLDER = BASE_DIR / "heatmaps"            # per-job heatmaps/pass network + rendered images
+THUMBNAILS_FOLDER = BASE_DIR / "thumbnails"        # video index thumbnails
+LIVE_FOLDER = BASE_DIR / "live"                    # per-job published frames/tracks of live jobs
+JOBS_FOLDER = BASE_DIR / "jobs"                    # per-job cancel flag, checkpoint and task of unfinished jobs
+POSITIONS_FOLDER = BASE_DIR / "positions"          # per-job position streams for the client-side radar
+TRACKS_FOLDER.mkdir(parents=True, exist_ok=True)
+METRICS_FOLDER.mkdir(parents=True, exist_ok=True)
+HEATMAPS_FOLDER.mkdir(parents=True, exist_ok=True)
+THUMBNAILS_FOLDER.mkdir(parents=True, exist_ok=True)
+LIVE_FOLDER.mkdir(parents=True, exist_ok=True)
+JOBS_FOLDER.mkdir(parents=True, exist_ok=True)
+POSITIONS_FOLDER.mkdir(parents=True, exist_ok=True)
+
+# Number of analysis worker processes (each holds its own copy of the models).
+NUM_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# Set ANALYSIS_WARMUP=0 to skip loading models at worker start.
+WARMUP_ENABLED = os.getenv("ANALYSIS_WARMUP", "1") != "0"
+# Re-render jobs and heatmap rendering load no model and get their own small
+# process pool, so they never queue behind the analysis workers.
+NUM_RERENDER_WORKERS = int(os.getenv("RERENDER_WORKERS", "2"))
+
+# Admission control (see submit_job). Job costs are estimated in worker-
+# seconds: frames x pixels relative to 1080p x pipeline weight, divided by
+# the 1080p frames per second one worker analyses (measure it on the
+# deployment's hardware and set ANALYSIS_HD_FPS accordingly).
+ANALYSIS_HD_FPS = float(os.getenv("ANALYSIS_HD_FPS", "6"))
+COST_WEIGHTS = {"detection": 1.0, "players": 0.6, "ball": 0.3}  # per analysis pass / output kind
+# New jobs are turned away (503 + Retry-After) once the queue would take
+# longer than this to drain across all workers.
+MAX_BACKLOG_SECONDS = float(os.getenv("MAX_BACKLOG_SECONDS", "21600"))
+# Per-client quotas (429 + Retry-After): unfinished jobs, and their total
+# estimated cost. A client's first job is always admitted.
+CLIENT_MAX_JOBS = int(os.getenv("CLIENT_MAX_JOBS", "4"))
+CLIENT_MAX_BACKLOG_SECONDS = float(os.getenv("CLIENT_MAX_BACKLOG_SECONDS", "86400"))
+# An upload the video index has not probed yet is costed from its file size
+# as 1080p at 25 fps and this bitrate (bits/s), rather than probed while
+# the request waits.
+UNPROBED_BITRATE = float(os.getenv("UNPROBED_BITRATE", "8000000"))
+
+# Storage lifecycle (storage.py): byte quotas of the two video folders (0 =
+# none) and free space kept on disk. Jobs are admitted only once their
+# estimated outputs fit, evicting re-renderable outputs LRU-first; uploads
+# unused for STORAGE_PROXY_DAYS are replaced by smaller H.264 proxies.
+GB = 1024 ** 3
+STORAGE_OUTPUT_QUOTA = int(float(os.getenv("STORAGE_OUTPUT_QUOTA_GB", "0")) * GB)
+STORAGE_UPLOAD_QUOTA = int(float(os.getenv("STORAGE_UPLOAD_QUOTA_GB", "0")) * GB)
+STORAGE_MIN_FREE = int(float(os.getenv("STORAGE_MIN_FREE_GB", "5")) * GB)
+STORAGE_PROXY_DAYS = float(os.getenv("STORAGE_PROXY_DAYS", "14"))   # 0 = only when over quota
+STORAGE_PROXY_CRF = int(os.getenv("STORAGE_PROXY_CRF", "28"))
+STORAGE_SWEEP_INTERVAL = 300.0    # s between quota/proxy sweeps
+# Estimated output size: bytes per pixel of every frame written, per output
+# (mp4v at the pipelines' default quality; the "both" layout adds the radar)
+OUTPUT_BYTES_PER_PIXEL = 0.02
+# ------------------------------------------------
+
+# Simple in-memory job store
+# (job_id -> {status, input, output, outputs: {kind: filename}, error,
+#  client, cost_seconds, submitted}; the videos of a batch job also have
+#  `batch`, the batch's id, and the batch itself `children`, their ids)
+# status: queued -> running -> done | error | cancelled | preempted
+# (cancelling while a running job winds down). Unfinished analysis jobs
+# also keep their task in JOBS_FOLDER, so they are resumed after a restart.
+# Written by request threads and the event listener: hold jobs_lock.
+jobs = {}
+jobs_lock = threading.Lock()
+
+# worker name -> {status, error, seconds}
+# status: starting -> loading -> ready | idle | error (error also holds why a
+# replaced worker died)
+workers_state = {}
+
+_workers = {}  # worker name -> (Process, task queue)
+_free_workers = set()  # names of workers waiting for a task
+_busy = {}  # worker name -> client of the task it was handed, until it is free again
+_pending = deque()  # tasks not yet handed to a worker
+_tasks = {}  # job id -> task of resumable (analysis) jobs
+_futures = {}  # job id -> Future of re-render jobs
+_sources = {}  # job id -> (upload, tracks dir, re-render options) its outputs are rebuilt from
+_event_queue = None
+_light_events = None  # _event_queue, in the re-render pool's processes
+_stopping = False
+_workers_lock = threading.Lock()
+
+# analysis output kind -> output filename prefix
+OUTPUT_PREFIXES = {
+    "players": "analyzed",   # annotated camera view + player radar
+    "ball": "tracked",       # camera view + ball path radar
+}
+
+_rerender_executor = None
+
+# How often the listener checks that the workers are still alive (seconds)
+_LIVENESS_INTERVAL = 1.0
+
+# Lazily loaded analysis modules (see load_pipelines); only used in workers
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def _ensure_foot_importable():
+    """
+    The modules under foot/ import each other as top-level packages
+    (`config`, `models.*`, `utils.*`), so foot/ has to be on sys.path.
+    """
+    foot_dir = str(FOOT_DIR)
+    if foot_dir not in sys.path:
+        sys.path.insert(0, foot_dir)
+
+
+def load_pipelines() -> dict:
+    """
+    Import the pipeline modules on first use and return the entry points.
+    """
+    with _pipelines_lock:
+        if not _pipelines:
+            _ensure_foot_importable()
+            from pipelines.combined_pipelines import run_combined_pipeline
+            from pipelines.live_pipelines import run_live_pipeline
+
+            _pipelines["analysis"] = run_combined_pipeline
+            _pipelines["live"] = run_live_pipeline
+        return _pipelines
+
+
+# ---------------------- Worker process side ----------------------
+def _warmup(name, event_queue):
+    event_queue.put(("worker", name, {"status": "loading"}))
+    started = time.perf_counter()
+    try:
+        load_pipelines()
+        from models.registry import warmup_models
+        warmup_models()
+        update = {"status": "ready"}
+    except Exception:
+        update = {"status": "error", "error": traceback.format_exc()}
+    update["seconds"] = round(time.perf_counter() - started, 2)
+    event_queue.put(("worker", name, update))
+
+
+def _exit_on_sigterm(signum, frame):
+    """
+    `Process.terminate()` sends SIGTERM, which by default kills the worker
+    without running any cleanup. Stop our own children (frame decoders) and
+    raise SystemExit instead, so `finally` blocks release shared memory.
+    """
+    for child in mp.active_children():
+        child.terminate()
+    raise SystemExit(0)
+
+
+def _run_task(task, event_queue, name, **extra_options):
+    """
+    Run one task in this worker, reporting its state changes on
+    `event_queue`. `extra_options` are passed to the pipeline on top of the
+    task's own (the shared models of a batch, which are not stored with it).
+    """
+    from utils.job_control import JobCancelled
+
+    job_id, pipeline_name, input_path, outputs, options = task
+    event_queue.put(("job", job_id, {"status": "running", "worker": name}))
+    try:
+        pipeline = load_pipelines()[pipeline_name]
+        pipeline(input_path, outputs, **options, **extra_options)
+        names = {kind: Path(path).name for kind, path in outputs.items() if path}
+        update = {"status": "done", "output": next(iter(names.values()), None), "outputs": names}
+    except JobCancelled as e:
+        update = {"status": "preempted" if e.preempted else "cancelled"}
+    except Exception:
+        update = {"status": "error", "error": traceback.format_exc()}
+    event_queue.put(("job", job_id, update))
+
+
+def _run_batch(task, event_queue, name):
+    """
+    Run the analysis tasks of a batch job together, sharing batched models
+    (foot/pipelines/batch_pipelines.py); each one reports as its own job.
+    """
+    from pipelines.batch_pipelines import run_batch_pipeline
+
+    batch_id, _, _, _, options = task
+    event_queue.put(("job", batch_id, {"status": "running", "worker": name}))
+    try:
+        run_batch_pipeline(
+            options["tasks"],
+            lambda child, models: _run_task(child, event_queue, name, models=models),
+        )
+        update = {"status": "done"}
+    except Exception:
+        update = {"status": "error", "error": traceback.format_exc()}
+    event_queue.put(("job", batch_id, update))
+
+
+def _worker_main(task_queue, event_queue, warmup_enabled):
+    """
+    Entry point of an analysis worker process: run tasks until a None
+    sentinel arrives, reporting every job state change on `event_queue`.
+    """
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    _ensure_foot_importable()
+
+    name = mp.current_process().name
+    if warmup_enabled:
+        _warmup(name, event_queue)
+    else:
+        event_queue.put(("worker", name, {"status": "idle"}))
+
+    while True:
+        event_queue.put(("free", name, None))
+        task = task_queue.get()
+        if task is None:
+            break
+        if task[1] == "batch":
+            _run_batch(task, event_queue, name)
+        else:
+            _run_task(task, event_queue, name)
+
+
+def _init_light_worker(event_queue):
+    global _light_events
+    _light_events = event_queue
+
+
+def _run_rerender(job_id, tracks_dir, outputs, options):
+    """
+    Runs in the re-render pool: rebuild outputs from stored tracks. Returns
+    the names of the outputs written.
+    """
+    _light_events.put(("started", job_id, None))
+    _ensure_foot_importable()
+    from pipelines.rerender_pipelines import run_rerender_pipeline
+    run_rerender_pipeline(tracks_dir, outputs, **options)
+    names = {kind: Path(path).name for kind, path in outputs.items() if Path(path).exists()}
+    if not names:
+        raise RuntimeError("no output was written")
+    return names
+
+
+def _run_heatmap(npz_path, team, player, output_path):
+    """
+    Runs in the re-render pool: one heatmap as an image (.png) or a grid
+    (.json), or None if that team/player has none.
+    """
+    _ensure_foot_importable()
+    import json
+    from utils.heatmaps import load_heatmaps, heatmap_grid, render_heatmap
+    data = load_heatmaps(npz_path)
+    grid = heatmap_grid(data, team=team, player=player)
+    if grid is None:
+        return None
+    if output_path.endswith(".json"):
+        with open(output_path, "w") as f:
+            json.dump({"cell_cm": int(data["cell"]), "grid": grid.tolist()}, f)
+        return output_path
+    return render_heatmap(grid, output_path)
+
+
+def _run_pass_network(npz_path, output_path):
+    _ensure_foot_importable()
+    import json
+    from utils.heatmaps import load_heatmaps, pass_network
+    with open(output_path, "w") as f:
+        json.dump(pass_network(load_heatmaps(npz_path)), f)
+    return output_path
+
+
+# ---------------------- Web process side ----------------------
+def _spawn_worker(name):
+    """
+    Start one worker process; caller holds _workers_lock.
+    Not a daemon: workers spawn their own frame decoder processes.
+    """
+    workers_state[name] = {"status": "starting", "error": None, "seconds": None}
+    ctx = mp.get_context("spawn")
+    task_queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_worker_main,
+        args=(task_queue, _event_queue, WARMUP_ENABLED),
+        name=name,
+    )
+    proc.start()
+    _workers[name] = (proc, task_queue)
+
+
+def _next_task():
+    """
+    Take the pending task that runs next; caller holds _workers_lock.
+    Live jobs go first. Otherwise clients take turns -- the fewer tasks a
+    client has on workers (a batch is one), the sooner its next one
+    starts -- and within that
+    the shortest estimated job wins, each second a job has waited counting
+    as a second less of cost so that long jobs still get their turn.
+    """
+    now = time.time()
+    running = Counter(_busy.values())
+    with jobs_lock:
+
+        def priority(task):
+            if task[1] == "live":
+                return (0, 0, 0.0)
+            info = jobs.get(task[0], {})
+            waited = now - info.get("submitted", now)
+            return (1, running[info.get("client")], info.get("cost_seconds", 0.0) - waited)
+
+        task = min(_pending, key=priority)
+    _pending.remove(task)
+    return task
+
+
+def _dispatch():
+    """
+    Hand pending tasks to free workers; caller holds _workers_lock.
+    """
+    while _pending and _free_workers:
+        name = _free_workers.pop()
+        task = _next_task()
+        with jobs_lock:
+            _busy[name] = jobs.get(task[0], {}).get("client")
+        _workers[name][1].put(task)
+
+
+def _reap_dead_workers():
+    """
+    Fail the job of any worker that died without reporting (OOM, native
+    crash, SIGKILL) and start a replacement so queued jobs keep flowing.
+    """
+    with _workers_lock:
+        if _stopping:
+            return
+        for name, (proc, _) in list(_workers.items()):
+            if proc.is_alive():
+                continue
+            _free_workers.discard(name)
+            _busy.pop(name, None)
+            error = f"worker {name} died (exit code {proc.exitcode})"
+            with jobs_lock:
+                lost = {job_id for job_id, info in jobs.items()
+                        if info["status"] in ("running", "cancelling") and info.get("worker") == name}
+                # videos of a batch that had not started yet went down with it
+                lost |= {job_id for job_id, info in jobs.items()
+                         if info.get("batch") in lost and info["status"] in ("queued", "cancelling")}
+                for job_id in lost:
+                    info = jobs[job_id]
+                    info["status"] = "error"
+                    info["error"] = error
+                    info["resumable"] = _has_checkpoint(job_id)
+            _spawn_worker(name)
+            workers_state[name]["error"] = error
+
+
+def _listen_for_events(event_queue):
+    last_check = last_sweep = time.monotonic()
+    while True:
+        try:
+            event = event_queue.get(timeout=_LIVENESS_INTERVAL)
+        except queue.Empty:
+            event = ()
+        if event is None:
+            break
+        if event:
+            kind, key, update = event
+            if kind == "job":
+                _job_ended(key, update)
+                with jobs_lock:
+                    if key in jobs:
+                        jobs[key].update(update)
+                _record_outputs(key, update)
+            elif kind == "started":
+                # a re-render the pool picked up (it may already be done)
+                with jobs_lock:
+                    if key in jobs and jobs[key]["status"] == "queued":
+                        jobs[key]["status"] = "running"
+            elif kind == "worker":
+                workers_state.setdefault(key, {"status": None, "error": None, "seconds": None})
+                workers_state[key].update(update)
+            elif kind == "free":
+                with _workers_lock:
+                    if key in _workers:
+                        _busy.pop(key, None)
+                        _free_workers.add(key)
+                        _dispatch()
+        if time.monotonic() - last_check >= _LIVENESS_INTERVAL:
+            _reap_dead_workers()
+            last_check = time.monotonic()
+        if time.monotonic() - last_sweep >= STORAGE_SWEEP_INTERVAL:
+            _sweep_storage()
+            last_sweep = time.monotonic()
+
+
+def start_workers():
+    """
+    Spawn the analysis worker processes and the event listener thread.
+    Idempotent; called at startup and again (as a no-op) on every submit.
+    Workers that die later are replaced by the listener. Analysis jobs left
+    unfinished by the previous run of the server are queued again and
+    resume from their checkpoints.
+    """
+    with _workers_lock:
+        if _workers or _stopping:
+            return
+        _start_listener()
+        for i in range(NUM_WORKERS):
+            _spawn_worker(f"analysis-worker-{i}")
+        _recover_jobs()
+        # registered after multiprocessing's own exit hook so it runs first
+        # and the workers get their sentinel instead of being joined blindly
+        atexit.register(stop_workers)
+
+
+def _start_listener():
+    """
+    Create the event queue and its listener thread, once; call with
+    _workers_lock held.
+    """
+    global _event_queue
+    if _event_queue is None:
+        _event_queue = mp.get_context("spawn").Queue()
+        threading.Thread(
+            target=_listen_for_events, args=(_event_queue,),
+            name="analysis-events", daemon=True,
+        ).start()
+
+
+def stop_workers(timeout: float = 5.0):
+    """
+    Ask idle workers to exit; busy ones get SIGTERM after `timeout`, which
+    `_exit_on_sigterm` turns into a clean exit that stops their decoders.
+    """
+    global _stopping, _rerender_executor
+    with _workers_lock:
+        _stopping = True
+        for _, task_queue in _workers.values():
+            task_queue.put(None)
+        for proc, _ in _workers.values():
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.kill()
+        _workers.clear()
+        _free_workers.clear()
+        _busy.clear()
+        if _rerender_executor is not None:
+            _rerender_executor.shutdown(wait=False, cancel_futures=True)
+            _rerender_executor = None
+
+
+def snapshot_jobs() -> dict:
+    """
+    Copy of the job store that is safe to iterate or serialize while other
+    threads keep updating it.
+    """
+    with jobs_lock:
+        return {job_id: dict(info) for job_id, info in jobs.items()}
+
+
+def get_job(job_id):
+    with jobs_lock:
+        info = jobs.get(job_id)
+        return dict(info) if info else None
+
+
+def health() -> dict:
+    statuses = [w["status"] for w in list(workers_state.values())]
+    if not statuses:
+        analysis = "stopped"
+    elif "ready" in statuses:
+        analysis = "ready"
+    elif all(s == "idle" for s in statuses):
+        analysis = "idle"
+    elif all(s == "error" for s in statuses):
+        analysis = "error"
+    else:
+        analysis = "loading"
+    job_statuses = [info["status"] for info in snapshot_jobs().values()]
+    return {
+        "status": "ok",
+        "analysis": analysis,
+        "workers": dict(workers_state),
+        "jobs_running": job_statuses.count("running"),
+        "jobs_queued": job_statuses.count("queued"),
+        "backlog_seconds": round(backlog_seconds()),
+    }
+
+
+def parse_position(value):
+    """
+    Parse a start/end position: a frame number (int, or a string of digits)
+    or a timestamp -- "90.5s", "mm:ss" or "hh:mm:ss[.fff]" -- returned as
+    float seconds. None stays None. Raises ValueError otherwise.
+    """
+    if value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+        if isinstance(value, (int, float)) and value < 0:
+            raise ValueError("positions must not be negative")
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"invalid position: {value!r}")
+    text = value.strip()
+    if text.isdigit():
+        return int(text)
+    if text.endswith("s") and ":" not in text:
+        seconds = float(text[:-1])
+    else:
+        parts = text.split(":")
+        if not 2 <= len(parts) <= 3:
+            raise ValueError(f"invalid position: {value!r}")
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError("positions must not be negative")
+    return seconds
+
+
+class JobRejected(Exception):
+    """
+    Raised by `submit_job` when admission control turns a job away.
+    `retry_after` is the suggested wait in seconds; `quota` is True when a
+    per-client quota was hit (rather than the global backlog limit).
+    """
+
+    def __init__(self, message, retry_after, quota=False):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after))
+        self.quota = quota
+
+
+def _window_frames(start, end, fps, total_frames):
+    """
+    Number of frames in a start/end window (see foot/utils/video_utils.py
+    resolve_window, which the worker applies).
+    """
+    def to_frame(position, default):
+        if position is None:
+            return default
+        if isinstance(position, float):
+            position = round(position * fps)
+        return min(max(int(position), 0), total_frames)
+
+    return max(to_frame(end, total_frames) - to_frame(start, 0), 0)
+
+
+def _upload_info(filename) -> dict:
+    """
+    Size, frame rate and frame count of an upload, from the video index, or
+    estimated from the file size (UNPROBED_BITRATE) while the index probes
+    it in the background.
+    """
+    info = video_index.info("uploads", filename)
+    if info is None or info["total_frames"] is None:
+        path = UPLOAD_FOLDER / filename
+        if not path.is_file():
+            raise ValueError("no such uploaded file")
+        video_index.touch("uploads", filename)
+        seconds = path.stat().st_size * 8 / UNPROBED_BITRATE
+        info = {"width": 1920, "height": 1080, "fps": 25, "total_frames": max(int(seconds * 25), 1)}
+    return info
+
+
+def estimate_cost(filename, outputs, start=None, end=None) -> float:
+    """
+    Estimated worker-seconds of an analysis job on an uploaded video:
+    frames in the window x pixels relative to 1080p x COST_WEIGHTS of the
+    pass and its outputs, at ANALYSIS_HD_FPS.
+    """
+    info = _upload_info(filename)
+    frames = _window_frames(start, end, info["fps"] or 25, info["total_frames"])
+    pixels = (info["width"] * info["height"]) / (1920 * 1080)
+    weight = COST_WEIGHTS["detection"] + sum(COST_WEIGHTS[kind] for kind in set(outputs))
+    return frames * pixels * weight / ANALYSIS_HD_FPS
+
+
+def estimate_output_bytes(filename, outputs, start=None, end=None) -> int:
+    """
+    Estimated size of an analysis job's output videos (OUTPUT_BYTES_PER_PIXEL).
+    """
+    info = _upload_info(filename)
+    frames = _window_frames(start, end, info["fps"] or 25, info["total_frames"])
+    return int(frames * info["width"] * info["height"] * OUTPUT_BYTES_PER_PIXEL * len(set(outputs)))
+
+
+def _unfinished_jobs():
+    with jobs_lock:
+        # a batch's cost is that of its videos
+        return [dict(info) for info in jobs.values()
+                if info["status"] in ("queued", "running", "cancelling")
+                and not info.get("live") and not info.get("children")]
+
+
+def backlog_seconds() -> float:
+    """
+    Estimated time for the workers to get through the unfinished jobs.
+    """
+    return sum(info.get("cost_seconds", 0.0) for info in _unfinished_jobs()) / max(NUM_WORKERS, 1)
+
+
+def _admit(client, cost_seconds, output_bytes=0):
+    """
+    Raise JobRejected if a job of this cost from this client cannot be
+    queued now, or its outputs would not fit on disk even after evicting
+    outputs (storage.make_room); caller holds _admission_lock.
+    """
+    unfinished = _unfinished_jobs()
+    mine = [info for info in unfinished if info.get("client") == client]
+    mine_cost = sum(info.get("cost_seconds", 0.0) for info in mine)
+    if mine and len(mine) >= CLIENT_MAX_JOBS:
+        raise JobRejected(f"client already has {len(mine)} unfinished jobs (limit {CLIENT_MAX_JOBS})",
+                          retry_after=min(info.get("cost_seconds", 0.0) for info in mine), quota=True)
+    if mine and mine_cost + cost_seconds > CLIENT_MAX_BACKLOG_SECONDS:
+        raise JobRejected("client's queued work exceeds its quota",
+                          retry_after=mine_cost + cost_seconds - CLIENT_MAX_BACKLOG_SECONDS, quota=True)
+    workers = max(NUM_WORKERS, 1)
+    backlog = sum(info.get("cost_seconds", 0.0) for info in unfinished) / workers
+    if unfinished and backlog + cost_seconds / workers > MAX_BACKLOG_SECONDS:
+        raise JobRejected("analysis backlog is full",
+                          retry_after=backlog + cost_seconds / workers - MAX_BACKLOG_SECONDS)
+    # room for the outputs of this job and of the unfinished ones (counted
+    # in full, though running jobs have written part of theirs already)
+    needed = output_bytes + sum(info.get("output_bytes", 0) for info in unfinished)
+    if not storage.make_room(needed):
+        raise JobRejected("not enough disk space for the job's outputs",
+                          retry_after=max(backlog, STORAGE_SWEEP_INTERVAL))
+
+
+_admission_lock = threading.Lock()
+
+
+def submit_job(filename, outputs, pipeline_name="analysis", client=None, **options):
+    """
+    Register a job for an already-uploaded file and queue it for the workers.
+    `outputs` lists the output kinds (keys of OUTPUT_PREFIXES) to write; they
+    are all produced from a single detection pass. Extra keyword `options`
+    are passed on to the pipeline (e.g. use_cache, start/end from
+    `parse_position`). Returns the job id.
+
+    The job's cost is estimated first (`estimate_cost`); raises JobRejected
+    if `client` is over its quota or the backlog is full. Queued jobs are
+    started in fair-share order (see `_next_task`).
+    """
+    _check_outputs(outputs)
+    start_workers()
+    window = options.get("start"), options.get("end")
+    cost_seconds = estimate_cost(filename, outputs, *window)
+    output_bytes = estimate_output_bytes(filename, outputs, *window)
+    task = _new_task(filename, outputs, pipeline_name, options)
+    job_id = task[0]
+
+    # register job, unless admission control turns it away
+    with _admission_lock:
+        _admit(client, cost_seconds, output_bytes)
+        with jobs_lock:
+            jobs[job_id] = _job_entry(filename, client, cost_seconds, output_bytes=output_bytes)
+    _remember_source(task)
+    if pipeline_name == "analysis":
+        _save_task(task)
+
+    # hand the job to the worker processes (non-blocking)
+    with _workers_lock:
+        if pipeline_name == "analysis":
+            _tasks[job_id] = task
+        _pending.append(task)
+        _dispatch()
+    return job_id
+
+
+def submit_batch(filenames, outputs, client=None, **options):
+    """
+    Register one analysis job per uploaded file and queue them as a single
+    batch: one worker analyses several of them at once, with frames of
+    different videos sharing model calls (foot/pipelines/batch_pipelines.py).
+    Each video is still a job of its own -- own outputs, status, cancel and
+    resume (a resumed video runs on its own). `options` apply to every
+    video. Admission control takes the batch as a whole.
+    Returns (batch id, {filename: job id}).
+    """
+    _check_outputs(outputs)
+    if not filenames or len(set(filenames)) != len(filenames):
+        raise ValueError("filenames must be a non-empty list without duplicates")
+    start_workers()
+    window = options.get("start"), options.get("end")
+    costs = [estimate_cost(name, outputs, *window) for name in filenames]
+    sizes = [estimate_output_bytes(name, outputs, *window) for name in filenames]
+    tasks = [_new_task(name, outputs, "analysis", dict(options)) for name in filenames]
+    batch_id = str(uuid.uuid4())
+
+    with _admission_lock:
+        _admit(client, sum(costs), sum(sizes))
+        with jobs_lock:
+            for name, task, cost, size in zip(filenames, tasks, costs, sizes):
+                jobs[task[0]] = _job_entry(name, client, cost, batch=batch_id, output_bytes=size)
+            jobs[batch_id] = _job_entry(None, client, sum(costs), children=[task[0] for task in tasks])
+    for task in tasks:
+        _remember_source(task)
+        _save_task(task)
+
+    with _workers_lock:
+        for task in tasks:
+            _tasks[task[0]] = task
+        _pending.append((batch_id, "batch", None, {}, {"tasks": tasks}))
+        _dispatch()
+    return batch_id, {name: task[0] for name, task in zip(filenames, tasks)}
+
+
+def _check_outputs(outputs):
+    unknown = set(outputs) - set(OUTPUT_PREFIXES)
+    if not outputs or unknown:
+        raise ValueError(f"outputs must be a non-empty subset of {sorted(OUTPUT_PREFIXES)}")
+
+
+def _new_task(filename, outputs, pipeline_name, options):
+    """
+    Task of a new job on an uploaded file: a fresh job id, the output
+    filenames and, for analysis jobs, where the pipeline keeps its tracks,
+    metrics, heatmaps, position stream and control directory.
+    """
+    job_id = str(uuid.uuid4())
+    # prefix outputs so we don't overwrite: <prefix>_<original name>, plus
+    # the job id for a window of the video
+    windowed = options.get("start") is not None or options.get("end") is not None
+    tag = f"{job_id[:8]}_" if windowed else ""
+    output_paths = {
+        kind: str(OUTPUT_FOLDER / f"{OUTPUT_PREFIXES[kind]}_{tag}{filename}")
+        for kind in dict.fromkeys(outputs)
+    }
+    if pipeline_name == "analysis":
+        options["tracks_dir"] = str(TRACKS_FOLDER / job_id)
+        options["metrics_path"] = str(METRICS_FOLDER / f"{job_id}.json")
+        options["heatmaps_path"] = str(HEATMAPS_FOLDER / f"{job_id}.npz")
+        options["job_dir"] = str(JOBS_FOLDER / job_id)
+        if "players" in output_paths:
+            options["positions_dir"] = str(POSITIONS_FOLDER / job_id)
+    return (job_id, pipeline_name, str(UPLOAD_FOLDER / filename), output_paths, options)
+
+
+def _job_entry(filename, client, cost_seconds, **extra):
+    return {
+        "status": "queued",
+        "input": filename,
+        "output": None,
+        "outputs": {},
+        "error": None,
+        "client": client,
+        "cost_seconds": round(cost_seconds, 1),
+        "submitted": time.time(),
+        **extra,
+    }
+
+
+def _remember_source(task):
+    """
+    Note what the outputs of a job on an uploaded file can be rebuilt from:
+    its stored tracks, re-rendered in the layout it was written in.
+    """
+    job_id, _, input_path, _, options = task
+    _sources[job_id] = (Path(input_path).name, options.get("tracks_dir"),
+                        {"layout": options.get("layout", "both")})
+
+
+def _save_task(task):
+    job_dir = JOBS_FOLDER / task[0]
+    job_dir.mkdir(parents=True, exist_ok=True)
+    tmp = job_dir / "task.json.tmp"
+    tmp.write_text(json.dumps(task))
+    os.replace(tmp, job_dir / "task.json")
+
+
+def _recover_jobs():
+    """
+    Queue the analysis jobs a previous server process left unfinished (their
+    task is still in JOBS_FOLDER); caller holds _workers_lock.
+    """
+    for task_file in sorted(JOBS_FOLDER.glob("*/task.json"), key=lambda p: p.stat().st_mtime):
+        try:
+            task = tuple(json.loads(task_file.read_text()))
+        except (OSError, ValueError):
+            continue
+        job_id = task[0]
+        with jobs_lock:
+            if job_id in jobs:
+                continue
+            jobs[job_id] = {
+                "status": "queued",
+                "input": Path(task[2]).name,
+                "output": None,
+                "outputs": {},
+                "error": None,
+                "recovered": True,
+            }
+        (JOBS_FOLDER / job_id / "cancel").unlink(missing_ok=True)
+        _remember_source(task)
+        _tasks[job_id] = task
+        _pending.append(task)
+
+
+def _has_checkpoint(job_id) -> bool:
+    return (JOBS_FOLDER / job_id / "checkpoint.pkl").exists()
+
+
+def _job_ended(job_id, update):
+    """
+    Forget the task of a job that will not be resumed, and note whether an
+    interrupted one can be.
+    """
+    status = update.get("status")
+    if status in ("done", "cancelled"):
+        with _workers_lock:
+            _tasks.pop(job_id, None)
+        shutil.rmtree(JOBS_FOLDER / job_id, ignore_errors=True)
+    elif status in ("error", "preempted"):
+        update["resumable"] = job_id in _tasks and _has_checkpoint(job_id)
+
+
+def cancel_job(job_id, preempt=False):
+    """
+    Cancel a job: a queued one is dropped from the queue, a running one
+    stops at its next frame (analysis and re-render jobs poll their
+    JOBS_FOLDER/<id>/cancel file, see foot/utils/job_control.py) and a live
+    one is stopped as by `stop_live`.
+
+    With `preempt`, an analysis job keeps its last checkpoint and can be
+    continued with `resume_job`, e.g. to make room for an urgent job.
+    Cancelling a batch cancels each of its videos.
+    Returns the job's new status, or None for an unknown job. Raises
+    ValueError if the job has already ended.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return None
+    if job["status"] in ("done", "error", "cancelled", "preempted"):
+        raise ValueError(f"job already {job['status']}")
+
+    with _workers_lock:
+        removed = _unqueue(job_id)
+    for removed_id in removed:
+        update = {"status": "preempted" if preempt and removed_id in _tasks else "cancelled"}
+        _job_ended(removed_id, update)
+        with jobs_lock:
+            jobs[removed_id].update(update)
+    if removed:
+        return get_job(job_id)["status"]
+
+    if job.get("children"):
+        for child in job["children"]:
+            try:
+                cancel_job(child, preempt)
+            except ValueError:
+                pass    # that video has already ended
+        return "cancelling"
+    preempt = preempt and job_id in _tasks
+    if job.get("live"):
+        stop_live(job_id)
+        return "stopping"
+    future = _futures.get(job_id)
+    if future is not None and future.cancel():
+        return "cancelled"  # _rerender_done records it
+
+    job_dir = JOBS_FOLDER / job_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    (job_dir / "cancel").write_text("preempt" if preempt else "cancel")
+    with jobs_lock:
+        if jobs[job_id]["status"] in ("queued", "running"):
+            jobs[job_id]["status"] = "cancelling"
+    return "cancelling"
+
+
+def _unqueue(job_id):
+    """
+    Take a queued job out of the queue: its own task, or its entry in a
+    queued batch (the batch goes too once it has none left). Returns the
+    ids of the jobs removed; caller holds _workers_lock.
+    """
+    for task in list(_pending):
+        children = task[4]["tasks"] if task[1] == "batch" else []
+        if task[0] == job_id:
+            _pending.remove(task)
+            return [job_id] + [child[0] for child in children]
+        child = next((c for c in children if c[0] == job_id), None)
+        if child is not None:
+            children.remove(child)
+            if children:
+                return [job_id]
+            _pending.remove(task)
+            return [job_id, task[0]]
+    return []
+
+
+def resume_job(job_id):
+    """
+    Queue a preempted or failed analysis job again; it continues from its
+    last checkpoint (or from the start if it has none). Returns False for
+    an unknown job; raises ValueError if the job cannot be resumed.
+    """
+    job = get_job(job_id)
+    if job is None:
+        return False
+    with _workers_lock:
+        task = _tasks.get(job_id)
+        if task is None or job["status"] not in ("preempted", "error"):
+            raise ValueError(f"a {job['status']} job cannot be resumed")
+        (JOBS_FOLDER / job_id / "cancel").unlink(missing_ok=True)
+        with jobs_lock:
+            jobs[job_id].update(status="queued", error=None, resumable=False)
+        _pending.append(task)
+        _dispatch()
+    return True
+
+
+LIVE_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https", "udp", "tcp", "srt")
+
+
+def submit_live(source, outputs, record=True, **options):
+    """
+    Start a live job on an analysis worker. `source` is a stream URL (see
+    LIVE_SCHEMES) or the name of an uploaded file, which is played back at
+    real-time pace. The job runs until the stream ends or `stop_live` is
+    called; with `record` the published frames are also saved to
+    OUTPUT_FOLDER. Returns the job id.
+    """
+    unknown = set(outputs) - set(OUTPUT_PREFIXES)
+    if not outputs or unknown:
+        raise ValueError(f"outputs must be a non-empty subset of {sorted(OUTPUT_PREFIXES)}")
+    if "://" in source:
+        if source.split("://", 1)[0].lower() not in LIVE_SCHEMES:
+            raise ValueError(f"stream URL scheme must be one of {LIVE_SCHEMES}")
+        input_path = source
+    else:
+        input_path = UPLOAD_FOLDER / Path(source).name
+        if not input_path.is_file():
+            raise LookupError("no such uploaded file")
+        input_path = str(input_path)
+
+    start_workers()
+    job_id = str(uuid.uuid4())
+    output_paths = {
+        kind: str(OUTPUT_FOLDER / f"live_{OUTPUT_PREFIXES[kind]}_{job_id[:8]}.mp4") if record else None
+        for kind in dict.fromkeys(outputs)
+    }
+    options["live_dir"] = str(LIVE_FOLDER / job_id)
+
+    with jobs_lock:
+        jobs[job_id] = {
+            "status": "queued",
+            "input": source,
+            "live": True,
+            "output": None,
+            "outputs": {},
+            "error": None,
+        }
+    with _workers_lock:
+        _pending.append((job_id, "live", input_path, output_paths, options))
+        _dispatch()
+    return job_id
+
+
+def stop_live(job_id) -> bool:
+    """
+    Ask a live job to finish; it stops at its next frame.
+    """
+    job = get_job(job_id)
+    if not job or not job.get("live"):
+        return False
+    live_dir = LIVE_FOLDER / job_id
+    live_dir.mkdir(parents=True, exist_ok=True)
+    (live_dir / "stop").touch()
+    return True
+
+
+def _rerender_done(job_id, future):
+    _futures.pop(job_id, None)
+    try:
+        names = future.result()
+        update = {"status": "done", "output": next(iter(names.values())), "outputs": names}
+    except CancelledError:
+        update = {"status": "cancelled"}
+    except Exception as e:
+        # JobCancelled from foot/utils/job_control.py (not imported here)
+        if type(e).__name__ == "JobCancelled":
+            update = {"status": "cancelled"}
+        else:
+            update = {"status": "error", "error": traceback.format_exc()}
+    shutil.rmtree(JOBS_FOLDER / job_id, ignore_errors=True)
+    with jobs_lock:
+        jobs[job_id].update(update)
+    _record_outputs(job_id, update)
+
+
+def _light_executor():
+    """
+    The re-render pool, created on first use. Its processes report the
+    re-render jobs they start on the event queue.
+    """
+    global _rerender_executor
+    with _workers_lock:
+        if _rerender_executor is None:
+            _start_listener()
+            _rerender_executor = ProcessPoolExecutor(
+                max_workers=NUM_RERENDER_WORKERS,
+                mp_context=mp.get_context("spawn"),
+                initializer=_init_light_worker,
+                initargs=(_event_queue,),
+            )
+        return _rerender_executor
+
+
+def _cached_artifact(source, target, task, *args):
+    """
+    Return `target`, (re)building it with `task` in the re-render pool
+    when it is missing or older than `source`. None if there is nothing
+    to build it from.
+    """
+    if not source.exists():
+        return None
+    if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        return target
+    result = submit_light_task(task, str(source), *args, str(target)).result(timeout=120)
+    return Path(result) if result else None
+
+
+def submit_light_task(fn, *args):
+    """
+    Run a short model-free task (module-level function) in the re-render
+    pool; returns its Future.
+    """
+    return _light_executor().submit(fn, *args)
+
+
+def _record_outputs(job_id, update):
+    """
+    Hand the outputs of a finished job to the storage manager, with what
+    they can be rebuilt from.
+    """
+    if update.get("status") not in ("done", "cancelled"):
+        return      # an interrupted job may still be resumed
+    upload, tracks_dir, render = _sources.pop(job_id, (None, None, None))
+    if update["status"] == "done":
+        if upload is None:
+            upload = (get_job(job_id) or {}).get("input")
+        storage.add_outputs(job_id, upload, update.get("outputs") or {}, tracks_dir, render)
+
+
+def _sweep_storage():
+    """
+    Quotas and proxies (storage.sweep), sparing the uploads of unfinished jobs.
+    """
+    with jobs_lock:
+        busy = {info["input"] for info in jobs.values()
+                if info["status"] in ("queued", "running", "cancelling", "preempted") and info.get("input")}
+    try:
+        storage.sweep(busy)
+    except Exception:
+        traceback.print_exc()
+
+
+def heatmap_file(job_id, team=None, player=None, fmt="png"):
+    """
+    Path of a job's heatmap for one team or one tracker id, as a PNG image
+    or a JSON grid; rendered once, then served from disk.
+    """
+    who = f"team{team}" if player is None else f"player{player}"
+    return _cached_artifact(
+        HEATMAPS_FOLDER / f"{job_id}.npz",
+        HEATMAPS_FOLDER / f"{job_id}_{who}.{fmt}",
+        _run_heatmap, team, player,
+    )
+
+
+def pass_network_file(job_id):
+    return _cached_artifact(
+        HEATMAPS_FOLDER / f"{job_id}.npz",
+        HEATMAPS_FOLDER / f"{job_id}_passes.json",
+        _run_pass_network,
+    )
+
+
+def submit_rerender(source_job_id, outputs, **options):
+    """
+    Queue a re-render of a finished analysis job's stored tracks on the
+    re-render pool. `options` are passed to run_rerender_pipeline (layout,
+    start, end, scale, style). Returns the new job id.
+    Raises LookupError if the source job has no stored tracks.
+    """
+    source = get_job(source_job_id)
+    tracks_dir = TRACKS_FOLDER / source_job_id
+    if not source or source["status"] != "done" or not (tracks_dir / "meta.json").exists():
+        raise LookupError("source job has no stored tracks")
+    unknown = set(outputs) - set(OUTPUT_PREFIXES)
+    if not outputs or unknown:
+        raise ValueError(f"outputs must be a non-empty subset of {sorted(OUTPUT_PREFIXES)}")
+
+    job_id = str(uuid.uuid4())
+    layout = options.get("layout", "both")
+    output_paths = {
+        kind: str(OUTPUT_FOLDER / f"{OUTPUT_PREFIXES[kind]}_{layout}_{job_id[:8]}_{source['input']}")
+        for kind in dict.fromkeys(outputs)
+    }
+    return _queue_rerender(job_id, source["input"], tracks_dir, output_paths, options,
+                           source_job=source_job_id)
+
+
+def regenerate_output(name):
+    """
+    Queue the re-render of an output the storage manager evicted, written
+    under its old name. Returns the new job id; raises LookupError if the
+    output was not evicted or can no longer be rebuilt.
+    """
+    source = storage.evicted(name)
+    if source is None:
+        raise LookupError("output was not evicted or cannot be rebuilt")
+    with jobs_lock:
+        for job_id, info in jobs.items():
+            if info.get("regenerates") == name and info["status"] in ("queued", "running"):
+                return job_id
+    return _queue_rerender(str(uuid.uuid4()), source["upload"], Path(source["tracks_dir"]),
+                           {source["kind"]: str(OUTPUT_FOLDER / name)}, dict(source["render"]),
+                           source_job=source["job_id"], regenerates=name)
+
+
+def _queue_rerender(job_id, upload, tracks_dir, output_paths, options, **entry):
+    with jobs_lock:
+        jobs[job_id] = {
+            "status": "queued",
+            "input": upload,
+            "output": None,
+            "outputs": {},
+            "error": None,
+            **entry,
+        }
+    _sources[job_id] = (upload, str(tracks_dir), {k: v for k, v in options.items() if k != "job_dir"})
+
+    options["job_dir"] = str(JOBS_FOLDER / job_id)
+    future = _light_executor().submit(_run_rerender, job_id, str(tracks_dir), output_paths, options)
+    _futures[job_id] = future
+    future.add_done_callback(lambda f: _rerender_done(job_id, f))
+    return job_id
+
+
+# Metadata index of the upload/output folders, probed in the re-render pool
+video_index = VideoIndex(
+    BASE_DIR / "video_index.sqlite3",
+    {"uploads": UPLOAD_FOLDER, "outputs": OUTPUT_FOLDER},
+    submit_light_task,
+    THUMBNAILS_FOLDER,
+)
+
+# Owner of the upload/output folders: provenance, quotas, eviction, proxies
+storage = StorageManager(
+    BASE_DIR / "storage.sqlite3",
+    {"uploads": UPLOAD_FOLDER, "outputs": OUTPUT_FOLDER},
+    video_index,
+    submit_light_task,
+    output_quota=STORAGE_OUTPUT_QUOTA,
+    upload_quota=STORAGE_UPLOAD_QUOTA,
+    min_free=STORAGE_MIN_FREE,
+    proxy_after=STORAGE_PROXY_DAYS * 86400,
+    proxy_crf=STORAGE_PROXY_CRF,
+)
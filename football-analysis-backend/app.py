@@ -4,21 +4,28 @@ import os
 import mimetypes
 import requests
 
+from http_cache import init_app as init_http_cache, cache_control, TTLCache
+
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": [
     "http://127.0.0.1:5500",
     "http://localhost:5500"
 ]}})
+init_http_cache(app)
 
-UPLOAD_FOLDER = os.path.join(os.getcwd(), "uploaded_videos")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-
-OUTPUT_FOLDER = r"C:\Users\Soham Harip\OneDrive\Desktop\football-analysis-backend\output_videos"
+# Both video folders are owned by analysis_service's storage manager
+# (storage.py): next to this file, whatever the working directory.
+from analysis_service import UPLOAD_FOLDER, OUTPUT_FOLDER, storage, regenerate_output
 
 API_FOOTBALL_KEY = "dbf1b460d823dcb022ec3549a0f3977a"
 API_BASE = "https://v3.football.api-sports.io"
 
+# Seconds an upstream answer is reused by the server, and cached by clients
+STANDINGS_TTL = 600
+FIXTURES_TTL = 300
+PLAYER_DATA_TTL = 3600
+upstream_cache = TTLCache()
+
 LEAGUE_CODE_MAP = {
     "EPL": 39,
     "LL": 140,
@@ -36,12 +43,28 @@ LEAGUE_CODE_MAP = {
 def api_headers():
     return {"x-apisports-key": API_FOOTBALL_KEY}
 
-def proxy_get(path, params):
+def upstream_get(path, params, ttl):
+    """
+    (status code, JSON) of an API-Football GET; answers without errors are
+    kept for `ttl` seconds. Raises like requests.get.
+    """
+    key = (path, tuple(sorted(params.items())))
+    data = upstream_cache.get(key)
+    if data is not None:
+        return 200, data
+    r = requests.get(f"{API_BASE}{path}", params=params, headers=api_headers(), timeout=12)
+    data = r.json()
+    # API-Football reports quota and parameter errors with a 200 and "errors"
+    if r.status_code == 200 and not data.get("errors"):
+        upstream_cache.put(key, data, ttl)
+    return r.status_code, data
+
+def proxy_get(path, params, ttl=PLAYER_DATA_TTL):
     try:
-        r = requests.get(f"{API_BASE}{path}", params=params, headers=api_headers(), timeout=12)
-        if r.status_code != 200:
-            return jsonify({"error": "upstream_error", "status": r.status_code, "data": r.json()}), r.status_code
-        return jsonify(r.json())
+        status, data = upstream_get(path, params, ttl)
+        if status != 200:
+            return jsonify({"error": "upstream_error", "status": status, "data": data}), status
+        return jsonify(data)
     except requests.Timeout:
         return jsonify({"error": "timeout"}), 504
     except Exception as e:
@@ -56,17 +79,48 @@ def upload_video():
     if file.filename == "":
         return jsonify({"error": "No selected file"}), 400
     filename = file.filename
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    if not storage.make_room(request.content_length or 0, "uploads"):
+        return jsonify({"error": "not enough storage for the upload", "storage": storage.usage()}), 507
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
     file.save(file_path)
+    storage.uploaded(filename)
     return jsonify({"message": "Video uploaded successfully", "filename": filename, "video_url": f"/videos/{filename}"}), 200
 
+def _video_listing(key, thumb_prefix):
+    """
+    Paginated, sorted listing of an indexed folder.
+    Query: sort=name|mtime|size|duration, order=asc|desc, page (from 1),
+    per_page (default 100, max 500).
+    """
+    sort = request.args.get("sort", "name")
+    order = request.args.get("order", "asc")
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 100, type=int)
+    if sort not in SORT_COLUMNS or order not in ("asc", "desc") or page < 1 or not 0 < per_page <= 500:
+        return jsonify({"error": "invalid listing parameters", "sort": list(SORT_COLUMNS)}), 400
+    items, total = video_index.list(key, sort=sort, descending=order == "desc",
+                                    page=page, per_page=per_page)
+    for item in items:
+        thumb = item.pop("thumbnail")
+        item["thumbnail_url"] = f"/thumbnails/{thumb_prefix}/{thumb}" if thumb else None
+    return jsonify({
+        "videos": [item["name"] for item in items],
+        "items": items,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+    }), 200
+
 @app.route("/videos", methods=["GET"])
 def list_videos():
-    try:
-        videos = sorted(os.listdir(app.config["UPLOAD_FOLDER"]))
-        return jsonify({"videos": videos}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return _video_listing("uploads", "uploads")
+
+@app.route("/thumbnails/<key>/<path:filename>", methods=["GET"])
+@cache_control("no-cache")   # named after the video, not its content
+def video_thumbnail(key, filename):
+    if key not in ("uploads", "outputs"):
+        return jsonify({"error": "File not found"}), 404
+    return send_from_directory(str(THUMBNAILS_FOLDER / key), filename)
 
 def _partial_response(path, start, end, total, mime):
     length = end - start + 1
@@ -81,14 +135,15 @@ def _partial_response(path, start, end, total, mime):
 
 @app.route("/videos/<path:filename>", methods=["GET"])
 def get_video(filename):
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+    file_path = os.path.join(UPLOAD_FOLDER, filename)
     if not os.path.isfile(file_path):
         return jsonify({"error": "File not found"}), 404
+    storage.accessed("uploads", filename)
     total_size = os.path.getsize(file_path)
     mime = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
     range_header = request.headers.get('Range', None)
     if range_header is None:
-        resp = send_from_directory(app.config["UPLOAD_FOLDER"], filename, mimetype=mime, as_attachment=False)
+        resp = send_from_directory(UPLOAD_FOLDER, filename, mimetype=mime, as_attachment=False)
         resp.headers.add('Accept-Ranges', 'bytes')
         resp.headers.add('Content-Length', str(total_size))
         return resp
@@ -108,15 +163,14 @@ def get_video(filename):
 
 @app.route("/videos/<path:filename>", methods=["DELETE"])
 def delete_video(filename):
-    file_path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    if storage.delete("uploads", filename):
         return jsonify({"message": f"{filename} deleted successfully"}), 200
     else:
         return jsonify({"error": "File not found"}), 404
 
 # ---------------------- Standings Endpoint ----------------------
 @app.route("/api/get_standings", methods=["GET"])
+@cache_control(f"public, max-age={STANDINGS_TTL}")
 def get_standings():
     league = request.args.get("league", "")
     season = request.args.get("season", "")
@@ -130,10 +184,9 @@ def get_standings():
         if not league_id:
             return jsonify({"error": "Invalid league code"}), 400
         params = {"league": league_id, "season": season}
-        r = requests.get(f"{API_BASE}/standings", params=params, headers=api_headers(), timeout=12)
-        if r.status_code != 200:
-            return jsonify({"error": "API-Football error", "status": r.status_code, "data": r.json()}), r.status_code
-        api_data = r.json()
+        status, api_data = upstream_get("/standings", params, STANDINGS_TTL)
+        if status != 200:
+            return jsonify({"error": "API-Football error", "status": status, "data": api_data}), status
         standings = []
         if api_data.get("response"):
             try:
@@ -146,6 +199,7 @@ def get_standings():
 
 # ---------------------- Fixtures Endpoint ----------------------
 @app.route("/api/get_fixtures", methods=["GET"])
+@cache_control(f"public, max-age={FIXTURES_TTL}")
 def get_fixtures():
     league = request.args.get("league", "")
     season = request.args.get("season", "")
@@ -160,10 +214,9 @@ def get_fixtures():
         if not league_id:
             return jsonify({"error": "Invalid league code"}), 400
         params = {"league": league_id, "season": season, "timezone": timezone}
-        r = requests.get(f"{API_BASE}/fixtures", params=params, headers=api_headers(), timeout=12)
-        if r.status_code != 200:
-            return jsonify({"error": "API-Football error", "status": r.status_code, "data": r.json()}), r.status_code
-        api_data = r.json()
+        status, api_data = upstream_get("/fixtures", params, FIXTURES_TTL)
+        if status != 200:
+            return jsonify({"error": "API-Football error", "status": status, "data": api_data}), status
         fixtures = []
         if api_data.get("response"):
             fixtures = api_data["response"]
@@ -173,36 +226,43 @@ def get_fixtures():
 
 # ---------------------- API-FOOTBALL PLAYER/TEAM DATA PROXIES ----------------------
 @app.route("/api/players/topscorers", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_topscorers():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/players/topscorers", params)
 
 @app.route("/api/players/topassists", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_topassists():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/players/topassists", params)
 
 @app.route("/api/players/topyellowcards", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_top_yellowcards():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/players/topyellowcards", params)
 
 @app.route("/api/players/topredcards", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_top_redcards():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/players/topredcards", params)
 
 @app.route("/api/players", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_players():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/players", params)
 
 @app.route("/api/players/squads", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_players_squads():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/players/squads", params)
 
 @app.route("/api/coachs", methods=["GET"])
+@cache_control(f"public, max-age={PLAYER_DATA_TTL}")
 def api_coachs():
     params = {k: v for k, v in request.args.items()}
     return proxy_get("/coachs", params)
@@ -211,17 +271,14 @@ def api_coachs():
 
 @app.route("/output_videos", methods=["GET"])
 def list_output_videos():
-    try:
-        videos = sorted(os.listdir(OUTPUT_FOLDER))
-        return jsonify({"videos": videos}), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return _video_listing("outputs", "outputs")
 
 @app.route("/output_videos_download/<path:filename>", methods=["GET"])
 def download_output_video(filename):
     file_path = os.path.join(OUTPUT_FOLDER, filename)
     if not os.path.isfile(file_path):
-        return jsonify({"error": "File not found"}), 404
+        return _missing_output(filename)
+    storage.accessed("outputs", filename)
     total_size = os.path.getsize(file_path)
     mime = mimetypes.guess_type(file_path)[0] or "video/mp4"
     range_header = request.headers.get('Range', None)
@@ -254,134 +311,269 @@ def download_output_video(filename):
 
 @app.route("/output_videos/<path:filename>", methods=["DELETE"])
 def delete_output_video(filename):
-    file_path = os.path.join(OUTPUT_FOLDER, filename)
-    if os.path.isfile(file_path):
-        os.remove(file_path)
+    if storage.delete("outputs", filename):
         return jsonify({"message": f"{filename} deleted from output_videos"}), 200
     else:
         return jsonify({"error": "File not found"}), 404
 
 #------------------------------------------------------------ xxxxx------------------------------------------------
-# analysis_service.py
-import os
-import uuid 
-import traceback
-from flask import Flask, request, jsonify, send_from_directory, current_app
-from concurrent.futures import ThreadPoolExecutor
-from pathlib import Path
-from functools import partial
-from foot.pipelines.ball_tracking_pipelines import run_ball_tracking_pipeline
-from foot.pipelines.players_field_pipelines import run_player_field_pipeline
-import os
-import sys
-from tqdm import tqdm
-import numpy as np
-import cv2
-
-# Make project root importable
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-
-import supervision as sv
-from sports.annotators.soccer import draw_pitch, draw_points_on_pitch
-
-from config import (
-    BALL_ID, GOALKEEPER_ID, PLAYER_ID, REFEREE_ID,
-    CONFIDENCE_THRESHOLD, NMS_THRESHOLD, CONFIG
+# analysis routes -- the analysis layer itself lives in analysis_service.py and
+# runs in separate worker processes fed through a local queue.
+from analysis_service import (
+    submit_job, submit_batch, start_workers, health,
+    snapshot_jobs, get_job, OUTPUT_PREFIXES, submit_rerender, METRICS_FOLDER, parse_position,
+    heatmap_file, pass_network_file, video_index, THUMBNAILS_FOLDER,
+    submit_live, stop_live, LIVE_FOLDER, cancel_job, resume_job, JobRejected,
+    POSITIONS_FOLDER,
 )
+import json
+import time
+from video_index import SORT_COLUMNS
 
-from models.player_detection import load_player_detection_model
-from models.field_detection import load_field_detection_model
-from models.team_classifier import fit_team_classifier_from_video
-from models.view_transformer import ViewTransformer
-from utils.resolve_goalkeepers import resolve_goalkeepers_team_id
-from utils.draw_utils import (
-    create_ellipse_annotator,
-    create_label_annotator,
-    create_triangle_annotator,
-)
-from utils.video_utils import get_first_frame, create_side_by_side_writer
-
-# --- CONFIG: adjust to your backend paths ---
-BASE_DIR = Path(__file__).resolve().parent
-UPLOAD_FOLDER = BASE_DIR / "uploaded_videos"        # where uploaded videos are stored
-OUTPUT_FOLDER = BASE_DIR / "output_videos"         # where model outputs should go
-OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
-UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
-# ------------------------------------------------
-
-# Simple in-memory job store (job_id -> {status, input, output, error})
-# For production use Redis/DB to persist across restarts.
-jobs = {}
-
-# Thread pool for running model jobs in background
-executor = ThreadPoolExecutor(max_workers=2)  # tune number of workers
-
-# ---- Replace / adapt this wrapper to call your model ----
-# I expect your model code to provide a callable like `analyze_video(input_path, output_path)`
-# If your model code currently reads a hard-coded path, create a wrapper function that accepts paths.
-def analyze_video_wrapper(input_path: str, output_path: str):
+@app.before_request
+def ensure_analysis_workers():
     """
-    Call your real model here. This wrapper's contract:
-    - input_path: path to input video file (string)
-    - output_path: where to save the analyzed/annotated output video.
+    Startup hook for deployments: under a WSGI server (gunicorn, waitress...)
+    `__main__` below never runs, so the first request -- typically the load
+    balancer's /health probe -- starts the workers and their warmup. A no-op
+    afterwards. To start even earlier, call `analysis_service.start_workers()`
+    from the server's post-fork hook.
     """
-    # Example placeholder - replace with your real model call.
-    run_player_field_pipeline(input_path, output_path)
+    start_workers()
 
-    # END placeholder
-# ---------------------------------------------------------
-
-def run_job(job_id, input_path, output_path):
-    jobs[job_id]["status"] = "running"
-    try:
-        # call the model (replace with your real model call)
-        analyze_video_wrapper(str(input_path), str(output_path))
-
-        # After successful completion:
-        jobs[job_id]["status"] = "done"
-        jobs[job_id]["output"] = output_path.name
-    except Exception as e:
-        jobs[job_id]["status"] = "error"
-        jobs[job_id]["error"] = traceback.format_exc()
+@app.route("/health", methods=["GET"])
+@cache_control("no-store")
+def health_check():
+    """
+    Always answers immediately; `analysis` is "ready" once at least one
+    worker has loaded the pipelines and models (see `workers` for each one).
+    """
+    return jsonify(health())
 
 @app.route("/start_analysis", methods=["POST"])
 def start_analysis():
     """
     Request body example (JSON):
-    { "filename": "match_1.mp4" }
-    where filename is the name of the already-uploaded file in UPLOAD_FOLDER.
+    { "filename": "match_1.mp4", "outputs": ["players", "ball"] }
+    where filename is the name of the already-uploaded file in UPLOAD_FOLDER
+    and outputs (default ["players"]) picks the videos to write -- all of
+    them come from a single detection pass over the video.
+    Optional "use_cache": false forces the detectors to run again even if
+    the video's raw detections are already cached.
+    Optional "start"/"end" analyse only part of the video: a frame number
+    (750) or a timestamp ("30s", "12:30", "1:02:03.5").
+    Optional "radar": "client" leaves the radar out of the players video;
+    the frontend draws it from the job's position stream (/positions).
+    Jobs over the caller's quota get 429, and 503 when the backlog is full,
+    both with a Retry-After header (see analysis_service.submit_job).
     """
     data = request.get_json(force=True)
     filename = data.get("filename")
     if not filename:
         return jsonify({"error": "filename is required"}), 400
+    outputs = data.get("outputs") or ["players"]
+    if not isinstance(outputs, list) or not all(o in OUTPUT_PREFIXES for o in outputs):
+        return jsonify({"error": "outputs must be a list of output kinds",
+                        "allowed": sorted(OUTPUT_PREFIXES)}), 400
 
     input_path = UPLOAD_FOLDER / filename
     if not input_path.exists():
         return jsonify({"error": "file not found", "path": str(input_path)}), 404
 
-    # create job id and output filename
-    job_id = str(uuid.uuid4())
-    # prefix output so we don't overwrite: analyzed_<original name>
-    output_name = f"analyzed_{filename}"
-    output_path = OUTPUT_FOLDER / output_name
-
-    # register job
-    jobs[job_id] = {
-        "status": "queued",
-        "input": filename,
-        "output": None,
-        "error": None,
-    }
+    window, error = _parse_window(data)
+    if error:
+        return error
+    radar = data.get("radar", "server")
+    if radar not in ("server", "client"):
+        return jsonify({"error": "radar must be 'server' or 'client'"}), 400
+    layout = "camera" if radar == "client" else "both"
 
-    # submit the job to thread pool (non-blocking)
-    executor.submit(partial(run_job, job_id, input_path, output_path))
+    job_id, error = _submit(filename, outputs, use_cache=bool(data.get("use_cache", True)),
+                            layout=layout, **window)
+    if error:
+        return error
 
     return jsonify({"job_id": job_id, "status_url": f"/status/{job_id}"}), 202
 
+def _client_id():
+    """
+    Who a job is accounted to for the per-client quotas: the X-Client-Id
+    header if the frontend/proxy sets one, else the caller's address.
+    """
+    return request.headers.get("X-Client-Id") or request.remote_addr
+
+def _submit(inputs, outputs, submit=submit_job, **options):
+    """
+    submit_job (or submit_batch) for the analysis routes: (its result,
+    None), or (None, error response) -- 429/503 with Retry-After when
+    admission control rejects it.
+    """
+    try:
+        return submit(inputs, outputs, client=_client_id(), **options), None
+    except JobRejected as e:
+        response = jsonify({"error": str(e), "retry_after": e.retry_after})
+        response.status_code = 429 if e.quota else 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return None, response
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+def _parse_window(data):
+    """
+    ({"start": .., "end": ..}, None) from a request body, or (None, error
+    response) if a position is malformed.
+    """
+    try:
+        return {key: parse_position(data.get(key)) for key in ("start", "end")}, None
+    except ValueError as e:
+        return None, (jsonify({"error": f"start/end: {e}"}), 400)
+
+@app.route("/rerender", methods=["POST"])
+def rerender():
+    """
+    Request body example (JSON):
+    { "job_id": "<finished analysis job>", "outputs": ["players"],
+      "layout": "radar", "start": 250, "end": 750, "scale": 0.5,
+      "style": {"palette": ["#FF0000", "#0000FF", "#FFFF00"], "labels": false} }
+    Re-draws the outputs from the tracks the analysis job stored; no model
+    is loaded, so this is much faster than running the analysis again.
+    layout is "both" (default), "camera" or "radar"; start/end are frame
+    numbers of the original video.
+    """
+    data = request.get_json(force=True)
+    source_job = data.get("job_id")
+    if not source_job:
+        return jsonify({"error": "job_id is required"}), 400
+    outputs = data.get("outputs") or ["players"]
+    if not isinstance(outputs, list) or not all(o in OUTPUT_PREFIXES for o in outputs):
+        return jsonify({"error": "outputs must be a list of output kinds",
+                        "allowed": sorted(OUTPUT_PREFIXES)}), 400
+    layout = data.get("layout", "both")
+    if layout not in ("both", "camera", "radar"):
+        return jsonify({"error": "layout must be 'both', 'camera' or 'radar'"}), 400
+    try:
+        start = int(data.get("start", 0))
+        end = int(data["end"]) if data.get("end") is not None else None
+        scale = float(data.get("scale", 1.0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "start/end must be integers and scale a number"}), 400
+    if start < 0 or (end is not None and end <= start) or not 0 < scale <= 1:
+        return jsonify({"error": "need 0 <= start < end and 0 < scale <= 1"}), 400
+    style = data.get("style")
+    if style is not None and not isinstance(style, dict):
+        return jsonify({"error": "style must be an object"}), 400
+
+    try:
+        job_id = submit_rerender(source_job, outputs, layout=layout, start=start,
+                                 end=end, scale=scale, style=style)
+    except LookupError:
+        return jsonify({"error": "job not found or has no stored tracks"}), 404
+
+    return jsonify({"job_id": job_id, "status_url": f"/status/{job_id}"}), 202
+
+@app.route("/live/start", methods=["POST"])
+def start_live():
+    """
+    Request body example (JSON):
+    { "source": "rtsp://camera.local/stream", "outputs": ["players"],
+      "latency_budget": 0.5, "record": true }
+    source is a stream URL or the name of an uploaded file (played back in
+    real time). The job publishes until the stream ends or
+    POST /live/<job_id>/stop.
+    """
+    data = request.get_json(force=True)
+    source = data.get("source")
+    if not source:
+        return jsonify({"error": "source is required"}), 400
+    outputs = data.get("outputs") or ["players"]
+    if not isinstance(outputs, list) or not all(o in OUTPUT_PREFIXES for o in outputs):
+        return jsonify({"error": "outputs must be a list of output kinds",
+                        "allowed": sorted(OUTPUT_PREFIXES)}), 400
+    options = {}
+    if data.get("latency_budget") is not None:
+        try:
+            options["latency_budget"] = float(data["latency_budget"])
+        except (TypeError, ValueError):
+            return jsonify({"error": "latency_budget must be a number of seconds"}), 400
+    try:
+        job_id = submit_live(source, outputs, record=bool(data.get("record", True)), **options)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LookupError:
+        return jsonify({"error": "file not found"}), 404
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/status/{job_id}",
+        "streams": {kind: f"/live/{job_id}/{kind}.mjpg" for kind in outputs},
+        "tracks_url": f"/live/{job_id}/tracks",
+        "live_status_url": f"/live/{job_id}/status",
+    }), 202
+
+@app.route("/live/<job_id>/stop", methods=["POST"])
+def live_stop(job_id):
+    if not stop_live(job_id):
+        return jsonify({"error": "live job not found"}), 404
+    return jsonify({"job_id": job_id, "status": "stopping"}), 202
+
+def _live_running(job_id):
+    info = get_job(job_id)
+    return bool(info) and info["status"] in ("queued", "running")
+
+@app.route("/live/<job_id>/<kind>.mjpg", methods=["GET"])
+def live_mjpeg(job_id, kind):
+    """
+    MJPEG stream of a live job's latest published frames (plays in an
+    <img> tag). Ends when the job does.
+    """
+    if kind not in OUTPUT_PREFIXES or not get_job(job_id):
+        return jsonify({"error": "live stream not found"}), 404
+    jpeg_path = LIVE_FOLDER / job_id / f"{kind}.jpg"
+
+    def frames():
+        last = None
+        while _live_running(job_id):
+            try:
+                stamp = jpeg_path.stat().st_mtime_ns
+                if stamp != last:
+                    data = jpeg_path.read_bytes()
+                    last = stamp
+                    yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + data + b"\r\n"
+            except FileNotFoundError:
+                pass
+            time.sleep(0.02)
+
+    return Response(frames(), mimetype="multipart/x-mixed-replace; boundary=frame")
+
+@app.route("/live/<job_id>/tracks", methods=["GET"])
+@cache_control("no-store")
+def live_tracks(job_id):
+    """
+    Pitch positions published since byte `offset` (default 0): returns the
+    new per-frame records and the offset to ask for next.
+    """
+    path = LIVE_FOLDER / job_id / "tracks.jsonl"
+    if not path.is_file():
+        return jsonify({"error": "no live tracks for this job"}), 404
+    offset = request.args.get("offset", 0, type=int)
+    with open(path, "rb") as f:
+        f.seek(max(offset, 0))
+        chunk = f.read(4 << 20)
+    complete = chunk[:chunk.rfind(b"\n") + 1]       # never hand out a half-written line
+    frames = [json.loads(line) for line in complete.splitlines() if line]
+    return jsonify({"frames": frames, "next_offset": offset + len(complete),
+                    "running": _live_running(job_id)})
+
+@app.route("/live/<job_id>/status", methods=["GET"])
+@cache_control("no-store")
+def live_status(job_id):
+    path = LIVE_FOLDER / job_id / "status.json"
+    if not path.is_file():
+        return jsonify({"error": "no live status for this job"}), 404
+    return send_from_directory(str(path.parent), path.name, mimetype="application/json")
+
 @app.route("/status/<job_id>", methods=["GET"])
 def job_status(job_id):
-    info = jobs.get(job_id)
+    info = get_job(job_id)
     if not info:
         return jsonify({"error": "job not found"}), 404
     # If done, include URL to output file
@@ -393,38 +585,201 @@ def job_status(job_id):
     if info.get("output"):
         response["output_filename"] = info["output"]
         response["output_url"] = f"/output_videos/{info['output']}"
+    if info.get("outputs"):
+        response["outputs"] = {
+            kind: {"filename": name, "url": f"/output_videos/{name}"}
+            for kind, name in info["outputs"].items()
+        }
     if info.get("error"):
         response["error"] = info["error"]
+    if info.get("resumable"):
+        response["resume_url"] = f"/jobs/{job_id}/resume"
+    if (METRICS_FOLDER / f"{job_id}.json").exists():
+        response["metrics_url"] = f"/metrics/{job_id}"
+    if (POSITIONS_FOLDER / job_id / "meta.json").exists():
+        response["positions_url"] = f"/positions/{job_id}"
+    if info.get("batch"):
+        response["batch_id"] = info["batch"]
+    if info.get("children"):
+        response["jobs"] = [
+            {"job_id": child, "input": (get_job(child) or {}).get("input"),
+             "status": (get_job(child) or {}).get("status"), "status_url": f"/status/{child}"}
+            for child in info["children"]
+        ]
     return jsonify(response)
 
+@app.route("/metrics/<job_id>", methods=["GET"])
+def job_metrics(job_id):
+    """
+    Match metrics summary of an analysis job (distance, top speed and
+    sprints per tracked player; possession, centroid and width per team).
+    Only jobs that tracked players have one.
+    """
+    if not (METRICS_FOLDER / f"{job_id}.json").exists():
+        return jsonify({"error": "no metrics for this job"}), 404
+    return send_from_directory(str(METRICS_FOLDER), f"{job_id}.json", mimetype="application/json")
+
+@app.route("/heatmap/<job_id>", methods=["GET"])
+def job_heatmap(job_id):
+    """
+    Occupancy heatmap of an analysis job.
+    Query: team=0|1 or player=<tracker id>; format=png (default) or json
+    (the raw grid, HEATMAP_CELL cm per cell).
+    """
+    team = request.args.get("team", type=int)
+    player = request.args.get("player", type=int)
+    fmt = request.args.get("format", "png")
+    if (team is None) == (player is None) or fmt not in ("png", "json"):
+        return jsonify({"error": "give exactly one of team or player; format is png or json"}), 400
+    path = heatmap_file(job_id, team=team, player=player, fmt=fmt)
+    if path is None:
+        return jsonify({"error": "no heatmap for this job/team/player"}), 404
+    return send_from_directory(str(path.parent), path.name)
+
+@app.route("/pass_network/<job_id>", methods=["GET"])
+def job_pass_network(job_id):
+    """
+    Pass network of an analysis job: nodes are tracker ids (team, average
+    position, passes made/received), edges are passes between them.
+    """
+    path = pass_network_file(job_id)
+    if path is None:
+        return jsonify({"error": "no pass network for this job"}), 404
+    return send_from_directory(str(path.parent), path.name, mimetype="application/json")
+
+@app.route("/positions/<job_id>", methods=["GET"])
+def job_positions(job_id):
+    """
+    Meta of an analysis job's position stream (fps, frames, chunk size,
+    units, pitch size, colours); the chunks are at /positions/<job_id>/<n>.bin.
+    Encoding: foot/utils/position_stream.py, decoder: frontend js/radar.js.
+    """
+    if not (POSITIONS_FOLDER / job_id / "meta.json").exists():
+        return jsonify({"error": "no position stream for this job"}), 404
+    return send_from_directory(str(POSITIONS_FOLDER / job_id), "meta.json", mimetype="application/json")
+
+@app.route("/positions/<job_id>/<int:chunk>.bin", methods=["GET"])
+@cache_control("private, max-age=86400")   # a job's chunks never change
+def job_positions_chunk(job_id, chunk):
+    directory = POSITIONS_FOLDER / job_id
+    if not (directory / f"{chunk}.bin").exists():
+        return jsonify({"error": "no such chunk"}), 404
+    return send_from_directory(str(directory), f"{chunk}.bin", mimetype="application/octet-stream")
+
 @app.route("/output_videos/<path:filename>", methods=["GET"])
 def serve_output(filename):
     # Serves result videos from OUTPUT_FOLDER
+    if not (OUTPUT_FOLDER / filename).is_file():
+        return _missing_output(filename)
+    storage.accessed("outputs", filename)
     return send_from_directory(str(OUTPUT_FOLDER), filename, as_attachment=False)
 
+def _missing_output(filename):
+    if storage.evicted(filename) is None:
+        return jsonify({"error": "File not found"}), 404
+    return jsonify({"error": "output was evicted to free disk space; regenerate it",
+                    "regenerate_url": f"/output_videos/{filename}/regenerate"}), 404
+
+@app.route("/output_videos/<path:filename>/regenerate", methods=["POST"])
+def regenerate(filename):
+    """
+    Rebuild an output the storage manager evicted from its job's stored
+    tracks, under the same name; poll status_url, then fetch it again.
+    """
+    try:
+        job_id = regenerate_output(filename)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify({"job_id": job_id, "status_url": f"/status/{job_id}"}), 202
+
+@app.route("/storage", methods=["GET"])
+def storage_usage():
+    """
+    Bytes used and quotas of the upload and output folders, free disk space,
+    evicted outputs and proxied uploads.
+    """
+    return jsonify(storage.usage())
+
 # -- minimal health endpoint
 @app.route("/jobs", methods=["GET"])
 def list_jobs():
-    return jsonify(jobs)
+    return jsonify(snapshot_jobs())
 
-#---------------------------------------------------------------xx------------------------------
-def run_ball_tracking_job(job_id, input_path, output_path):
-    jobs[job_id]["status"] = "running"
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def delete_job(job_id):
+    """
+    Cancel a job; a running one stops at its next frame. With ?preempt=1 an
+    analysis job keeps its checkpoint and can be resumed later with
+    POST /jobs/<job_id>/resume.
+    """
+    preempt = request.args.get("preempt", "0").lower() in ("1", "true", "yes")
     try:
-        # Run ball tracking pipeline only!
-        run_ball_tracking_pipeline(str(input_path), str(output_path))
-        jobs[job_id]["status"] = "done"
-        jobs[job_id]["output"] = output_path.name
-    except Exception as e:
-        jobs[job_id]["status"] = "error"
-        jobs[job_id]["error"] = traceback.format_exc()
+        status = cancel_job(job_id, preempt=preempt)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    if status is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify({"job_id": job_id, "status": status}), 202
+
+@app.route("/jobs/<job_id>/resume", methods=["POST"])
+def resume(job_id):
+    try:
+        if not resume_job(job_id):
+            return jsonify({"error": "job not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": f"/status/{job_id}"}), 202
+
+@app.route("/start_batch", methods=["POST"])
+def start_batch():
+    """
+    Request body example (JSON):
+    { "filenames": ["clip_1.mp4", "clip_2.mp4", "clip_3.mp4"], "outputs": ["players"] }
+    Analyses several uploaded files together on one worker, frames of
+    different videos sharing the model calls. Every file still becomes its
+    own job (outputs, /status, cancel, resume); /status/<batch_id> lists
+    them. outputs, use_cache, start/end and radar work as for
+    /start_analysis and apply to every file.
+    """
+    data = request.get_json(force=True)
+    filenames = data.get("filenames")
+    if not isinstance(filenames, list) or not filenames or not all(isinstance(f, str) for f in filenames):
+        return jsonify({"error": "filenames must be a non-empty list of uploaded file names"}), 400
+    outputs = data.get("outputs") or ["players"]
+    if not isinstance(outputs, list) or not all(o in OUTPUT_PREFIXES for o in outputs):
+        return jsonify({"error": "outputs must be a list of output kinds",
+                        "allowed": sorted(OUTPUT_PREFIXES)}), 400
+    missing = [f for f in filenames if not (UPLOAD_FOLDER / f).exists()]
+    if missing:
+        return jsonify({"error": "file not found", "missing": missing}), 404
+
+    window, error = _parse_window(data)
+    if error:
+        return error
+    radar = data.get("radar", "server")
+    if radar not in ("server", "client"):
+        return jsonify({"error": "radar must be 'server' or 'client'"}), 400
+    layout = "camera" if radar == "client" else "both"
+
+    result, error = _submit(filenames, outputs, submit=submit_batch,
+                            use_cache=bool(data.get("use_cache", True)), layout=layout, **window)
+    if error:
+        return error
+    batch_id, job_ids = result
+    return jsonify({
+        "batch_id": batch_id,
+        "status_url": f"/status/{batch_id}",
+        "jobs": {name: {"job_id": job_id, "status_url": f"/status/{job_id}"} for name, job_id in job_ids.items()},
+    }), 202
 
+#---------------------------------------------------------------xx------------------------------
 @app.route("/start_ball_tracking", methods=["POST"])
 def start_ball_tracking():
     """
     Request body (JSON):
-    { "filename": "your_video.mp4" }
-    Where filename is the name of the uploaded file in UPLOAD_FOLDER.
+    { "filename": "your_video.mp4", "start": "45:00", "end": "90:00" }
+    Where filename is the name of the uploaded file in UPLOAD_FOLDER;
+    start/end (optional) work as for /start_analysis.
     """
     data = request.get_json(force=True)
     filename = data.get("filename")
@@ -435,24 +790,23 @@ def start_ball_tracking():
     if not input_path.exists():
         return jsonify({"error": "file not found", "path": str(input_path)}), 404
 
-    # Create job id and output filename
-    job_id = str(uuid.uuid4())
-    output_name = f"tracked_{filename}"  # Prefix to avoid clash
-    output_path = OUTPUT_FOLDER / output_name
-
-    # Register job
-    jobs[job_id] = {
-        "status": "queued",
-        "input": filename,
-        "output": None,
-        "error": None,
-    }
+    window, error = _parse_window(data)
+    if error:
+        return error
 
-    # Run pipeline in the background
-    executor.submit(partial(run_ball_tracking_job, job_id, input_path, output_path))
+    # Run pipeline in the background; output is prefixed with tracked_
+    job_id, error = _submit(filename, ["ball"], **window)
+    if error:
+        return error
 
     return jsonify({"job_id": job_id, "status_url": f"/status/{job_id}"}), 202
 
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000, host='0.0.0.0')
+    debug = True
+    # Start the analysis workers (they load pipelines/models on their own);
+    # the routes above are served immediately and /health reports when
+    # analysis is ready. (Skipped in the debug reloader's parent process.)
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_workers()
+    app.run(debug=debug, port=5000, host='0.0.0.0')
@@ -12,6 +12,25 @@ ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY", "dro9YlvSFRxKF5JmiKsS")
 PLAYER_DETECTION_MODEL_ID = "football-players-detection-3zvbc/11"
 FIELD_DETECTION_MODEL_ID = "football-field-detection-f07vi/14"
 
+# Inference backend for the two detection models:
+# - "roboflow": the inference SDK, weights fetched by model id
+# - "onnx": local YOLOv8 ONNX exports of the same models run directly by
+#   ONNX Runtime on CPU (models/onnx_backend.py), with explicit thread
+#   counts and optionally INT8 weights; compare the two with
+#   `python -m models.backend_benchmark <video>` from foot/
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "roboflow")
+ONNX_MODEL_DIR = os.path.join(os.path.dirname(__file__), "models", "onnx")
+ONNX_PLAYER_MODEL = os.path.join(ONNX_MODEL_DIR, "player_detection.onnx")
+ONNX_FIELD_MODEL = os.path.join(ONNX_MODEL_DIR, "field_detection.onnx")
+ONNX_PLAYER_INPUT = (1280, 1280)   # (h, w), used if the export has a dynamic input
+ONNX_FIELD_INPUT = (640, 640)
+ONNX_PROVIDERS = ("CPUExecutionProvider",)
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = ONNX Runtime default
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "1"))
+ONNX_INT8 = os.getenv("ONNX_INT8", "0") == "1"  # dynamically quantized copy, made on first load
+PLAYER_CLASSES = ("ball", "goalkeeper", "player", "referee")   # class id order
+FIELD_CLASSES = ("pitch",)
+
 # ================================
 # Class IDs (same as in your notebook)
 # ================================
@@ -26,11 +45,96 @@ REFEREE_ID = 3
 FPS = 25
 CONFIDENCE_THRESHOLD = 0.3
 NMS_THRESHOLD = 0.5
+KEYPOINT_CONFIDENCE_THRESHOLD = 0.5
+
+# Team classifier training: a reservoir of at most TEAM_CROP_BUDGET player
+# crops, resized to the embedding input size; sampling stops once the team
+# colour clusters agree on TEAM_STABLE_AGREEMENT of the crops for
+# TEAM_STABLE_CHECKS checks (one every TEAM_STABILITY_CHECK sampled frames).
+TEAM_CROP_BUDGET = 512
+TEAM_CROP_SIZE = 224
+TEAM_STABILITY_CHECK = 10
+TEAM_STABLE_AGREEMENT = 0.98
+TEAM_STABLE_CHECKS = 3
+TEAM_MIN_SAMPLE_FRAMES = 50     # frames sampled at least, even in a short window
+
+# Raw detection cache: detectors run at this lower confidence and every box is
+# stored, so CONFIDENCE_THRESHOLD/NMS_THRESHOLD can be changed and the job
+# re-run from the cache without calling the models again.
+RAW_CONFIDENCE_FLOOR = 0.2
+DETECTION_CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache", "detections")
+DETECTION_CACHE_CHUNK = 256  # frames per chunk file
+
+# Analysis jobs save a checkpoint every this many chunks of frames, so a job
+# that was preempted or whose worker died resumes from there.
+CHECKPOINT_CHUNKS = 4
+
+# Decode frames in a helper process and hand them over through shared memory.
+# Off by default: it only pays off when decoding is a real share of the frame
+# time (high-resolution input on CPU-bound workers) -- measure before enabling.
+SHARED_FRAME_DECODE = False
+SHARED_FRAME_SLOTS = 8
+
+# Batch jobs (pipelines/batch_pipelines.py): up to BATCH_MAX_VIDEOS videos
+# are analysed at once in one worker, their model calls gathered into
+# batches of up to INFERENCE_MAX_BATCH images (models/batching.py). Each
+# video in flight holds its own team classifier (an embedding model).
+BATCH_MAX_VIDEOS = 4
+INFERENCE_MAX_BATCH = 8
+INFERENCE_BATCH_WAIT = 0.05     # s a call waits for a batch to fill before running
+
+# Live mode (pipelines/live_pipelines.py)
+LIVE_LATENCY_BUDGET = 0.5       # s from capture to published frame; older frames are dropped
+LIVE_TEAM_MIN_CROPS = 200       # crops collected from the stream before teams are fitted
+LIVE_TEAM_SAMPLE_EVERY = 10     # collect crops from every n-th analysed frame
+LIVE_JPEG_QUALITY = 80
+
+# Shot filter (utils/shot_filter.py): a colour histogram of a tiny copy of
+# each frame finds camera cuts (the tracker and homography restart there) and
+# frames showing too little pitch (replays' graphics, crowd, close-ups), which
+# skip the detectors altogether.
+SHOT_FILTER_ENABLED = True
+SHOT_FILTER_SIZE = (64, 36)             # (w, h) the frame is reduced to
+SHOT_CUT_THRESHOLD = 0.4                # Bhattacharyya distance between consecutive hue/saturation histograms
+SHOT_MIN_PITCH_RATIO = 0.25             # share of grass-green pixels for a pitch view
+PITCH_HSV_LOW = (35, 40, 40)            # OpenCV HSV range of grass
+PITCH_HSV_HIGH = (85, 255, 255)
+
+# Pitch homography (models/homography.py); distances are in pitch units (cm)
+HOMOGRAPHY_RANSAC_THRESHOLD = 100.0
+HOMOGRAPHY_MAX_REPROJECTION_ERROR = 60.0  # mean over inliers, else the fit is rejected
+HOMOGRAPHY_REUSE_PIXELS = 2.0             # keypoint motion below which the last fit is reused
+HOMOGRAPHY_SMOOTHING = 0.4                # weight of the new fit (1 = no smoothing)
+HOMOGRAPHY_MAX_HOLD = 12                  # frames the last fit survives without a new one
 
 # Ball tracking
-MAXLEN = 5
 MAX_DISTANCE_THRESHOLD = 500
 
+# Ball ROI stage (models/ball_roi.py): when the full-frame detector misses
+# the ball, look again in one or two BALL_ROI_SIZE crops around where it
+# should be, or scan the frame tile by tile once it has been lost.
+BALL_ROI_ENABLED = True
+BALL_ROI_SIZE = 640             # px, crop side (about the detector input size)
+BALL_ROI_MAX_MISSES = 8         # frames without the ball before scanning the frame
+BALL_ROI_SCAN_TILES = 2         # tiles searched per frame while scanning
+BALL_ROI_HISTORY = 5            # ball positions kept for the prediction
+
+# Match metrics (utils/match_metrics.py); speeds in m/s, distances in cm
+METRICS_SPEED_SMOOTHING = 0.3   # EMA weight of the newest speed sample
+METRICS_MAX_SPEED = 12.0        # faster steps are projection glitches, not running
+METRICS_SPRINT_SPEED = 7.0      # ~25 km/h
+METRICS_MAX_GAP = 5             # frames a track may vanish and still count as moving
+POSSESSION_RADIUS = 150         # nearest player within this of the ball has it
+
+# Heatmaps and pass network (utils/heatmaps.py)
+HEATMAP_CELL = 100              # cm per grid cell -> 120 x 70 cells
+PASS_MIN_HOLD = 3               # frames a player must keep the ball to count as its owner
+HEATMAP_COMPACT_EVERY = 50000   # player positions buffered before merging into the sparse counts
+
+# Position stream for the client-side radar (utils/position_stream.py)
+POSITION_STREAM_CHUNK = 250     # frames per chunk file the frontend fetches
+POSITION_STREAM_UNIT = 10       # cm per stored unit (positions are integers)
+
 # ================================
 # Soccer Pitch Config
 # ================================
@@ -0,0 +1,138 @@
+# models/backend_benchmark.py
+"""
+Compare inference backends on frames of a video: throughput of the player
+and field models, and agreement with the first backend listed (the
+reference, normally the current "roboflow" backend).
+
+    python -m models.backend_benchmark videos/sample1.mp4 --frames 100
+    python -m models.backend_benchmark clip.mp4 --backends roboflow,onnx,onnx-int8 --threads 4
+
+Accuracy is reported relative to the reference: precision/recall of boxes
+matched per class at IoU >= 0.5, and the mean distance (px) between
+keypoints both backends are confident about.
+"""
+import argparse
+import time
+
+import numpy as np
+import supervision as sv
+
+from config import (
+    CONFIDENCE_THRESHOLD, KEYPOINT_CONFIDENCE_THRESHOLD,
+    ONNX_PLAYER_MODEL, ONNX_FIELD_MODEL, ONNX_PLAYER_INPUT, ONNX_FIELD_INPUT,
+    PLAYER_CLASSES, FIELD_CLASSES, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS,
+)
+from models.player_detection import load_player_detection_model
+from models.field_detection import load_field_detection_model
+
+
+def load_backend(name: str, intra_op_threads: int, inter_op_threads: int):
+    """
+    (player model, field model) for "roboflow", "onnx" or "onnx-int8".
+    """
+    if name == "roboflow":
+        return load_player_detection_model("roboflow"), load_field_detection_model("roboflow")
+    if name not in ("onnx", "onnx-int8"):
+        raise ValueError(f"unknown backend: {name}")
+    from models.onnx_backend import OnnxModel
+    options = dict(int8=name == "onnx-int8", intra_op_threads=intra_op_threads,
+                   inter_op_threads=inter_op_threads)
+    return (
+        OnnxModel(ONNX_PLAYER_MODEL, PLAYER_CLASSES, input_size=ONNX_PLAYER_INPUT, **options),
+        OnnxModel(ONNX_FIELD_MODEL, FIELD_CLASSES, input_size=ONNX_FIELD_INPUT, **options),
+    )
+
+
+def sample_frames(video: str, count: int):
+    total = sv.VideoInfo.from_video_path(video).total_frames
+    stride = max(1, total // count)
+    frames = sv.get_video_frames_generator(video, stride=stride)
+    return [frame for _, frame in zip(range(count), frames)]
+
+
+def run_backend(player_model, field_model, frames):
+    """
+    Detections and keypoints per frame, and seconds per model.
+    """
+    player_model.infer(frames[0], confidence=CONFIDENCE_THRESHOLD)    # warm up
+    field_model.infer(frames[0], confidence=CONFIDENCE_THRESHOLD)
+    detections, keypoints = [], []
+    player_seconds = field_seconds = 0.0
+    for frame in frames:
+        started = time.perf_counter()
+        result = player_model.infer(frame, confidence=CONFIDENCE_THRESHOLD)[0]
+        player_seconds += time.perf_counter() - started
+        detections.append(sv.Detections.from_inference(result))
+
+        started = time.perf_counter()
+        result = field_model.infer(frame, confidence=CONFIDENCE_THRESHOLD)[0]
+        field_seconds += time.perf_counter() - started
+        keypoints.append(sv.KeyPoints.from_inference(result))
+    return detections, keypoints, player_seconds, field_seconds
+
+
+def box_agreement(reference, detections, iou_threshold=0.5):
+    """
+    (precision, recall) of `detections` against `reference`, greedy
+    one-to-one matching per class.
+    """
+    matched = ref_total = det_total = 0
+    for ref, det in zip(reference, detections):
+        ref_total += len(ref)
+        det_total += len(det)
+        for class_id in np.unique(np.concatenate([ref.class_id, det.class_id])):
+            r, d = ref[ref.class_id == class_id], det[det.class_id == class_id]
+            if not len(r) or not len(d):
+                continue
+            iou = sv.box_iou_batch(r.xyxy, d.xyxy)
+            while iou.size and iou.max() >= iou_threshold:
+                i, j = np.unravel_index(iou.argmax(), iou.shape)
+                matched += 1
+                iou[i, :] = 0
+                iou[:, j] = 0
+    precision = matched / det_total if det_total else 1.0
+    recall = matched / ref_total if ref_total else 1.0
+    return precision, recall
+
+
+def keypoint_error(reference, keypoints):
+    errors = []
+    for ref, kp in zip(reference, keypoints):
+        if not len(ref) or not len(kp) or ref.xy.shape != kp.xy.shape:
+            continue
+        both = ((ref.confidence[0] >= KEYPOINT_CONFIDENCE_THRESHOLD)
+                & (kp.confidence[0] >= KEYPOINT_CONFIDENCE_THRESHOLD))
+        errors.extend(np.linalg.norm(ref.xy[0][both] - kp.xy[0][both], axis=1))
+    return float(np.mean(errors)) if errors else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--backends", default="roboflow,onnx,onnx-int8",
+                        help="comma separated; the first one is the accuracy reference")
+    parser.add_argument("--threads", type=int, default=ONNX_INTRA_OP_THREADS,
+                        help="ONNX Runtime intra-op threads (0 = default)")
+    parser.add_argument("--inter-threads", type=int, default=ONNX_INTER_OP_THREADS)
+    args = parser.parse_args()
+
+    frames = sample_frames(args.video, args.frames)
+    print(f"{len(frames)} frames of {args.video}")
+    reference = None
+    print(f"{'backend':<12}{'player fps':>12}{'field fps':>12}{'total fps':>12}"
+          f"{'precision':>11}{'recall':>9}{'kp err px':>11}")
+    for name in args.backends.split(","):
+        player_model, field_model = load_backend(name, args.threads, args.inter_threads)
+        detections, keypoints, player_s, field_s = run_backend(player_model, field_model, frames)
+        if reference is None:
+            reference = (detections, keypoints)
+        precision, recall = box_agreement(reference[0], detections)
+        kp_error = keypoint_error(reference[1], keypoints)
+        n = len(frames)
+        print(f"{name:<12}{n / player_s:>12.2f}{n / field_s:>12.2f}{n / (player_s + field_s):>12.2f}"
+              f"{precision:>11.3f}{recall:>9.3f}{kp_error:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# models/ball_roi.py
+
+from collections import deque
+
+import numpy as np
+import supervision as sv
+
+from config import (
+    BALL_ID, CONFIDENCE_THRESHOLD, NMS_THRESHOLD, RAW_CONFIDENCE_FLOOR,
+    BALL_ROI_SIZE, BALL_ROI_MAX_MISSES, BALL_ROI_SCAN_TILES, BALL_ROI_HISTORY,
+)
+
+
+def _center(xyxy):
+    return np.array([(xyxy[0] + xyxy[2]) / 2, (xyxy[1] + xyxy[3]) / 2])
+
+
+class BallROIDetector:
+    """
+    Second look for the ball on the frames where the full-frame detector
+    missed it. At broadcast resolution the ball is a few pixels across once
+    the frame is scaled down to the detector's input; a BALL_ROI_SIZE crop
+    is scaled far less, so the ball stays visible.
+
+    - predict: constant-velocity extrapolation of the last ball positions
+      (image coordinates), one crop around the prediction, and a second one
+      around the last sighting when the two are far apart
+    - scan: after BALL_ROI_MAX_MISSES frames without the ball the prediction
+      is stale; BALL_ROI_SCAN_TILES tiles of a grid covering the frame are
+      searched per frame instead, round-robin, until the ball is found
+
+    So a frame costs at most two extra (small) inferences, instead of the
+    whole grid that tiling every frame would.
+    One instance per video pass, fed every frame in order.
+    """
+
+    def __init__(self, roi_size: int = BALL_ROI_SIZE, max_misses: int = BALL_ROI_MAX_MISSES,
+                 scan_tiles: int = BALL_ROI_SCAN_TILES):
+        self.roi_size = roi_size
+        self.max_misses = max_misses
+        self.scan_tiles = scan_tiles
+        self.history = deque(maxlen=BALL_ROI_HISTORY)   # (frame index, center)
+        self.frame_index = -1
+        self.misses = 0
+        self._next_tile = 0
+
+    def reset(self):
+        """
+        Forget the ball's positions (camera cut): scan for it from the next
+        miss on.
+        """
+        self.history.clear()
+        self.misses = 0
+
+    def _crop_at(self, center, width, height):
+        size = self.roi_size
+        x0 = int(np.clip(center[0] - size / 2, 0, max(width - size, 0)))
+        y0 = int(np.clip(center[1] - size / 2, 0, max(height - size, 0)))
+        return x0, y0, min(x0 + size, width), min(y0 + size, height)
+
+    def _predicted_regions(self, width, height):
+        frame, last = self.history[-1]
+        predicted = last
+        if len(self.history) >= 2:
+            prev_frame, prev = self.history[-2]
+            velocity = (last - prev) / (frame - prev_frame)
+            predicted = last + velocity * (self.frame_index - frame)
+        regions = [self._crop_at(predicted, width, height)]
+        if np.linalg.norm(predicted - last) > self.roi_size / 2:
+            regions.append(self._crop_at(last, width, height))
+        return regions
+
+    def _scan_regions(self, width, height):
+        size = self.roi_size
+        xs = list(range(0, width - size, size)) + [max(width - size, 0)]
+        ys = list(range(0, height - size, size)) + [max(height - size, 0)]
+        tiles = [(x, y) for y in ys for x in xs]
+        regions = []
+        for _ in range(min(self.scan_tiles, len(tiles))):
+            x, y = tiles[self._next_tile % len(tiles)]
+            regions.append((x, y, min(x + size, width), min(y + size, height)))
+            self._next_tile += 1
+        return regions
+
+    def _record(self, ball: sv.Detections):
+        best = int(np.argmax(ball.confidence))
+        self.history.append((self.frame_index, _center(ball.xyxy[best])))
+        self.misses = 0
+
+    def update(self, frame, player_model, detections: sv.Detections) -> sv.Detections:
+        """
+        Take the full-frame raw detections of the next frame and return them
+        with the ball boxes found in the crops added (team_id -1).
+        """
+        self.frame_index += 1
+        ball = detections[(detections.class_id == BALL_ID)
+                          & (detections.confidence >= CONFIDENCE_THRESHOLD)]
+        if len(ball):
+            self._record(ball)
+            return detections
+
+        height, width = frame.shape[:2]
+        if width <= self.roi_size and height <= self.roi_size:
+            return detections      # a crop would be the whole frame again
+        if self.history and self.misses < self.max_misses:
+            regions = self._predicted_regions(width, height)
+        else:
+            regions = self._scan_regions(width, height)
+
+        found = []
+        for x0, y0, x1, y1 in regions:
+            result = player_model.infer(frame[y0:y1, x0:x1], confidence=RAW_CONFIDENCE_FLOOR)[0]
+            crop_det = sv.Detections.from_inference(result)
+            crop_det = crop_det[crop_det.class_id == BALL_ID]
+            if len(crop_det):
+                crop_det.xyxy = crop_det.xyxy + np.array([x0, y0, x0, y0], dtype=crop_det.xyxy.dtype)
+                crop_det.data["team_id"] = np.full(len(crop_det), -1, dtype=int)
+                found.append(crop_det)
+
+        if not found:
+            self.misses += 1
+            return detections
+        found = sv.Detections.merge(found).with_nms(threshold=NMS_THRESHOLD)
+        confident = found[found.confidence >= CONFIDENCE_THRESHOLD]
+        if len(confident):
+            self._record(confident)
+        else:
+            self.misses += 1
+        return sv.Detections.merge([detections, found])
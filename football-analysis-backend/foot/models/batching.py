@@ -0,0 +1,142 @@
+# models/batching.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+from config import INFERENCE_MAX_BATCH, INFERENCE_BATCH_WAIT
+
+
+class _Request:
+    __slots__ = ("image", "result", "error", "done")
+
+    def __init__(self, image):
+        self.image = image
+        self.result = None
+        self.error = None
+        self.done = False
+
+
+class InferenceBatcher:
+    """
+    Gathers single-image `infer` calls made by several threads (one per
+    video, see pipelines/batch_pipelines.py) into batched model calls.
+
+    A call blocks until its image has been through the model. A batch runs
+    as soon as one of these holds:
+
+    - INFERENCE_MAX_BATCH images wait for the same model and confidence
+    - every member thread is waiting on the batcher, so no more images can
+      arrive
+    - the call has waited INFERENCE_BATCH_WAIT (a member busy elsewhere,
+      e.g. fitting its team classifier, does not stall the others)
+
+    The batch runs on the thread that completed it; only one runs at a
+    time, so the models never see concurrent calls. Threads take part with
+    `with batcher.member():`.
+    """
+
+    def __init__(self, max_batch: int = INFERENCE_MAX_BATCH, max_wait: float = INFERENCE_BATCH_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._members = 0
+        self._waiting = 0
+        self._busy = False
+        self._queues = {}   # (model id, confidence) -> (model, confidence, [requests])
+        self.batches = 0
+        self.images = 0
+
+    @contextmanager
+    def member(self):
+        with self._cond:
+            self._members += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._members -= 1
+                self._cond.notify_all()
+
+    def _take(self, own_key, expired):
+        """
+        The batch to run now, or None; caller holds the condition.
+        """
+        if self._busy or not self._queues:
+            return None
+        full = [key for key, (_, _, requests) in self._queues.items() if len(requests) >= self.max_batch]
+        if full:
+            key = full[0]
+        elif self._waiting >= self._members:
+            key = max(self._queues, key=lambda k: len(self._queues[k][2]))
+        elif expired and own_key in self._queues:
+            key = own_key
+        else:
+            return None
+        model, confidence, requests = self._queues.pop(key)
+        if len(requests) > self.max_batch:
+            self._queues[key] = (model, confidence, requests[self.max_batch:])
+            requests = requests[:self.max_batch]
+        return model, confidence, requests
+
+    def _run(self, model, confidence, requests):
+        try:
+            results = model.infer([r.image for r in requests], confidence=confidence)
+            for request, result in zip(requests, results):
+                request.result = result
+        except Exception as e:
+            for request in requests:
+                request.error = e
+        self.batches += 1
+        self.images += len(requests)
+
+    def infer(self, model, image, confidence: float):
+        """
+        Result of `model.infer([image], confidence=confidence)[0]`, computed
+        in a batch with other members' images.
+        """
+        request = _Request(image)
+        key = (id(model), confidence)
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            self._queues.setdefault(key, (model, confidence, []))[2].append(request)
+            self._waiting += 1
+            try:
+                while not request.done:
+                    remaining = deadline - time.monotonic()
+                    batch = self._take(key, remaining <= 0)
+                    if batch is None:
+                        self._cond.wait(timeout=remaining if remaining > 0 else None)
+                        continue
+                    self._busy = True
+                    self._cond.release()
+                    try:
+                        self._run(*batch)
+                    finally:
+                        self._cond.acquire()
+                        for finished in batch[2]:
+                            finished.done = True
+                        self._busy = False
+                        self._cond.notify_all()
+            finally:
+                self._waiting -= 1
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+
+class BatchedModel:
+    """
+    A model whose single-image `infer` calls go through an InferenceBatcher;
+    same interface as the model itself. A list of images is passed to the
+    model directly.
+    """
+
+    def __init__(self, model, batcher: InferenceBatcher):
+        self.model = model
+        self.batcher = batcher
+
+    def infer(self, image, confidence: float = 0.5, **kwargs):
+        if isinstance(image, list) or kwargs:
+            return self.model.infer(image, confidence=confidence, **kwargs)
+        return [self.batcher.infer(self.model, image, confidence)]
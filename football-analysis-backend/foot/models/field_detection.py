@@ -1,12 +1,23 @@
 # models/field_detection.py
 
-from inference import get_model
-from config import ROBOFLOW_API_KEY, FIELD_DETECTION_MODEL_ID
+from config import (
+    ROBOFLOW_API_KEY, FIELD_DETECTION_MODEL_ID, INFERENCE_BACKEND,
+    ONNX_FIELD_MODEL, ONNX_FIELD_INPUT, FIELD_CLASSES,
+)
 
-def load_field_detection_model():
+def load_field_detection_model(backend=INFERENCE_BACKEND):
     """
-    Load the Roboflow football field keypoint detection model.
+    Load the football field keypoint detection model with the configured
+    backend: the Roboflow inference SDK, or a local ONNX export.
     """
+    if backend == "onnx":
+        from models.onnx_backend import OnnxModel
+        return OnnxModel(ONNX_FIELD_MODEL, FIELD_CLASSES, input_size=ONNX_FIELD_INPUT)
+    if backend != "roboflow":
+        raise ValueError(f"unknown INFERENCE_BACKEND: {backend!r}")
+
+    from inference import get_model
+
     if ROBOFLOW_API_KEY == "YOUR_API_KEY_HERE":
         raise RuntimeError("Set ROBOFLOW_API_KEY in config.py or environment variable.")
 
@@ -14,4 +25,4 @@ def load_field_detection_model():
         model_id=FIELD_DETECTION_MODEL_ID,
         api_key=ROBOFLOW_API_KEY
     )
-    return model
\ No newline at end of file
+    return model
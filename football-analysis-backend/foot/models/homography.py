@@ -0,0 +1,136 @@
+# models/homography.py
+
+import cv2
+import numpy as np
+
+from config import (
+    CONFIG,
+    KEYPOINT_CONFIDENCE_THRESHOLD,
+    HOMOGRAPHY_RANSAC_THRESHOLD,
+    HOMOGRAPHY_MAX_REPROJECTION_ERROR,
+    HOMOGRAPHY_REUSE_PIXELS,
+    HOMOGRAPHY_SMOOTHING,
+    HOMOGRAPHY_MAX_HOLD,
+)
+
+
+def _project(m, xy):
+    xy = np.asarray(xy, dtype=np.float32).reshape(-1, 1, 2)
+    if len(xy) == 0:
+        return np.empty((0, 2), dtype=np.float32)
+    return cv2.perspectiveTransform(xy, m).reshape(-1, 2)
+
+
+class HomographyEstimator:
+    """
+    Image -> pitch homography for one video, updated frame by frame from the
+    field keypoints.
+
+    - fit: RANSAC over the confident keypoints, rejected when the mean
+      reprojection error of the inliers (in pitch units) is too large
+    - reuse: no new fit while the keypoints stay within
+      HOMOGRAPHY_REUSE_PIXELS of those of the last fit, once the smoothed
+      matrix has caught up with that fit (within the same distance, in
+      image pixels); until then every frame is refitted and blended in, so
+      a camera that stops after a pan ends up at the raw fit
+    - smoothing: exponential moving average of where the old and new
+      homographies send the corners of the keypoints' bounding box, which
+      is a proper parameter space (averaging raw 3x3 matrices is not)
+    - hold: the last estimate is kept for up to HOMOGRAPHY_MAX_HOLD frames
+      when a frame has no usable fit
+
+    One instance per video pass; use `project` to map all entities in one
+    call.
+    """
+
+    def __init__(self, target_vertices=None, smoothing: float = HOMOGRAPHY_SMOOTHING):
+        vertices = CONFIG.vertices if target_vertices is None else target_vertices
+        self.vertices = np.asarray(vertices, dtype=np.float32)
+        self.smoothing = smoothing
+        self.m = None
+        self._fit_xy = None      # keypoints (all vertices, NaN if missing) of the last converged fit
+        self._missed = 0
+
+    def reset(self):
+        self.m = None
+        self._fit_xy = None
+        self._missed = 0
+
+    def _barely_moved(self, xy, mask):
+        if self._fit_xy is None:
+            return False
+        common = mask & ~np.isnan(self._fit_xy[:, 0])
+        if common.sum() < 4:
+            return False
+        shift = np.linalg.norm(xy[common] - self._fit_xy[common], axis=1)
+        return float(shift.max()) <= HOMOGRAPHY_REUSE_PIXELS
+
+    def _fit(self, src, tgt):
+        m, inliers = cv2.findHomography(src, tgt, cv2.RANSAC, HOMOGRAPHY_RANSAC_THRESHOLD)
+        if m is None:
+            return None
+        inliers = inliers.ravel().astype(bool)
+        if inliers.sum() < 4:
+            return None
+        error = np.linalg.norm(_project(m, src[inliers]) - tgt[inliers], axis=1).mean()
+        if error > HOMOGRAPHY_MAX_REPROJECTION_ERROR:
+            return None
+        return m
+
+    def _blend(self, m, src):
+        if self.m is None or self.smoothing >= 1:
+            return m
+        x0, y0 = src.min(axis=0)
+        x1, y1 = src.max(axis=0)
+        if x1 - x0 < 1 or y1 - y0 < 1:
+            return m
+        corners = np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], dtype=np.float32)
+        blended = self.smoothing * _project(m, corners) + (1 - self.smoothing) * _project(self.m, corners)
+        return cv2.getPerspectiveTransform(corners, blended.astype(np.float32))
+
+    def _lag(self, m, src):
+        """Image-pixel distance between src and where self.m puts m's images of it."""
+        back = _project(np.linalg.inv(self.m), _project(m, src))
+        return float(np.linalg.norm(back - src, axis=1).max())
+
+    def update(self, kp_xy, kp_conf):
+        """
+        Feed one frame's keypoints; returns the current 3x3 matrix, or None
+        when there is no usable estimate.
+        """
+        xy = np.asarray(kp_xy, dtype=np.float32).reshape(-1, 2)
+        mask = np.asarray(kp_conf) > KEYPOINT_CONFIDENCE_THRESHOLD
+
+        if self.m is not None and self._barely_moved(xy, mask):
+            self._missed = 0
+            return self.m
+
+        m = None
+        if mask.sum() >= 4:
+            m = self._fit(xy[mask], self.vertices[mask])
+
+        if m is None:
+            self._missed += 1
+            if self._missed > HOMOGRAPHY_MAX_HOLD:
+                self.reset()
+            return self.m
+
+        self.m = self._blend(m, xy[mask])
+        if self._lag(m, xy[mask]) <= HOMOGRAPHY_REUSE_PIXELS:
+            self._fit_xy = np.where(mask[:, None], xy, np.nan)
+        else:
+            self._fit_xy = None
+        self._missed = 0
+        return self.m
+
+    def project(self, groups: dict):
+        """
+        Map {name: (N, 2) image points} to pitch coordinates with a single
+        perspectiveTransform call; None without an estimate.
+        """
+        if self.m is None:
+            return None
+        arrays = [np.asarray(xy, dtype=np.float32).reshape(-1, 2) for xy in groups.values()]
+        projected = _project(self.m, np.concatenate(arrays))
+        bounds = np.cumsum([len(a) for a in arrays])[:-1]
+        return dict(zip(groups, np.split(projected, bounds)))
@@ -0,0 +1,164 @@
+# models/onnx_backend.py
+
+import os
+
+import cv2
+import numpy as np
+
+from config import (
+    ONNX_PROVIDERS, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS,
+    ONNX_INT8, NMS_THRESHOLD,
+)
+
+
+def int8_path(model_path: str) -> str:
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.int8{ext}"
+
+
+def quantize_int8(model_path: str) -> str:
+    """
+    Write a dynamically quantized (INT8 weights) copy of an ONNX model next
+    to it, once; returns its path.
+    """
+    target = int8_path(model_path)
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(model_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        tmp = target + ".tmp.onnx"
+        quantize_dynamic(model_path, tmp, weight_type=QuantType.QUInt8)
+        os.replace(tmp, target)
+    return target
+
+
+def create_session(model_path: str, int8: bool = ONNX_INT8,
+                   intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+                   inter_op_threads: int = ONNX_INTER_OP_THREADS):
+    """
+    ONNX Runtime session with the thread counts from config.py (0 leaves
+    the choice to ONNX Runtime). Every analysis worker has its own session,
+    so on a shared CPU node set the intra-op threads to about
+    cores / ANALYSIS_WORKERS.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    path = quantize_int8(model_path) if int8 else model_path
+    return ort.InferenceSession(path, sess_options=options, providers=list(ONNX_PROVIDERS))
+
+
+def letterbox(image, size):
+    """
+    Resize keeping the aspect ratio and pad to `size` (h, w), as the YOLO
+    exports expect; returns the NCHW float input, the scale and the padding.
+    """
+    height, width = image.shape[:2]
+    scale = min(size[0] / height, size[1] / width)
+    new_h, new_w = round(height * scale), round(width * scale)
+    pad_y, pad_x = (size[0] - new_h) // 2, (size[1] - new_w) // 2
+    canvas = np.full((size[0], size[1], 3), 114, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+        image, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+    )
+    blob = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1)[None]
+    return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, scale, (pad_x, pad_y)
+
+
+def decode_yolo(output, confidence, scale, pad, num_classes, nms_threshold=NMS_THRESHOLD):
+    """
+    Decode a YOLOv8 export's output (1, 4 + classes [+ keypoints * 3], N):
+    returns (xywh in image pixels, confidence, class id, keypoints as
+    (n, K, 3) in image pixels or None), after confidence filtering and
+    per-class NMS, sorted by confidence.
+    """
+    rows = output[0].T
+    scores = rows[:, 4:4 + num_classes]
+    class_id = scores.argmax(axis=1)
+    conf = scores[np.arange(len(rows)), class_id]
+    keep = conf >= confidence
+    rows, conf, class_id = rows[keep], conf[keep], class_id[keep]
+
+    xywh = rows[:, :4].copy()
+    xywh[:, 0] = (xywh[:, 0] - pad[0]) / scale
+    xywh[:, 1] = (xywh[:, 1] - pad[1]) / scale
+    xywh[:, 2:] /= scale
+    if len(xywh):
+        corner = np.column_stack((xywh[:, 0] - xywh[:, 2] / 2, xywh[:, 1] - xywh[:, 3] / 2, xywh[:, 2:]))
+        keep = cv2.dnn.NMSBoxesBatched(corner.tolist(), conf.tolist(), class_id.tolist(),
+                                       confidence, nms_threshold)
+        keep = np.asarray(keep, dtype=int).reshape(-1)
+    else:
+        keep = np.empty(0, dtype=int)
+    keep = keep[np.argsort(-conf[keep])]
+
+    keypoints = None
+    if rows.shape[1] > 4 + num_classes:
+        keypoints = rows[keep, 4 + num_classes:].reshape(len(keep), -1, 3).copy()
+        keypoints[:, :, 0] = (keypoints[:, :, 0] - pad[0]) / scale
+        keypoints[:, :, 1] = (keypoints[:, :, 1] - pad[1]) / scale
+    return xywh[keep], conf[keep], class_id[keep], keypoints
+
+
+class OnnxModel:
+    """
+    A local YOLOv8 ONNX export behind the same `infer(image, confidence)`
+    interface as the inference SDK's models: returns a one-element list with
+    a Roboflow-style result dict, so `sv.Detections.from_inference` and
+    `sv.KeyPoints.from_inference` work unchanged.
+
+    class_names: names of the model's classes, in class id order
+    input_size: (h, w) used when the export has a dynamic input shape
+
+    `infer` also takes a list of images (batch jobs, models/batching.py):
+    one session run for all of them if the export has a dynamic batch
+    axis, else one run per image.
+    """
+
+    def __init__(self, model_path: str, class_names, input_size=(640, 640), **session_options):
+        if not os.path.exists(model_path):
+            raise RuntimeError(f"ONNX model not found: {model_path} (see ONNX_MODEL_DIR in config.py)")
+        self.model_path = model_path
+        self.session = create_session(model_path, **session_options)
+        self.class_names = list(class_names)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        shape = model_input.shape[2:4]
+        self.input_size = tuple(shape) if all(isinstance(d, int) for d in shape) else tuple(input_size)
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+    def infer(self, image, confidence: float = 0.5, **kwargs):
+        images = image if isinstance(image, list) else [image]
+        inputs = [letterbox(img, self.input_size) for img in images]
+        if self.dynamic_batch and len(inputs) > 1:
+            outputs = self.session.run(None, {self.input_name: np.concatenate([b for b, _, _ in inputs])})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: b})[0] for b, _, _ in inputs])
+        return [
+            self._result(img, output[None], confidence, scale, pad)
+            for img, output, (_, scale, pad) in zip(images, outputs, inputs)
+        ]
+
+    def _result(self, image, output, confidence, scale, pad):
+        xywh, conf, class_id, keypoints = decode_yolo(
+            output, confidence, scale, pad, len(self.class_names)
+        )
+        predictions = []
+        for i in range(len(xywh)):
+            prediction = {
+                "x": float(xywh[i, 0]), "y": float(xywh[i, 1]),
+                "width": float(xywh[i, 2]), "height": float(xywh[i, 3]),
+                "confidence": float(conf[i]),
+                "class_id": int(class_id[i]),
+                "class": self.class_names[class_id[i]],
+            }
+            if keypoints is not None:
+                prediction["keypoints"] = [
+                    {"x": float(x), "y": float(y), "confidence": float(c), "class_id": k}
+                    for k, (x, y, c) in enumerate(keypoints[i])
+                ]
+            predictions.append(prediction)
+        height, width = image.shape[:2]
+        return {"image": {"width": width, "height": height}, "predictions": predictions}
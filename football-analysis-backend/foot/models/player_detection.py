@@ -1,13 +1,24 @@
 # models/player_detection.py
 
 import os
-from inference import get_model
-from config import ROBOFLOW_API_KEY, PLAYER_DETECTION_MODEL_ID
+from config import (
+    ROBOFLOW_API_KEY, PLAYER_DETECTION_MODEL_ID, INFERENCE_BACKEND,
+    ONNX_PLAYER_MODEL, ONNX_PLAYER_INPUT, PLAYER_CLASSES,
+)
 
-def load_player_detection_model():
+def load_player_detection_model(backend=INFERENCE_BACKEND):
     """
-    Load the Roboflow player (and ball/referee) detection model.
+    Load the player (and ball/referee) detection model with the configured
+    backend: the Roboflow inference SDK, or a local ONNX export.
     """
+    if backend == "onnx":
+        from models.onnx_backend import OnnxModel
+        return OnnxModel(ONNX_PLAYER_MODEL, PLAYER_CLASSES, input_size=ONNX_PLAYER_INPUT)
+    if backend != "roboflow":
+        raise ValueError(f"unknown INFERENCE_BACKEND: {backend!r}")
+
+    from inference import get_model
+
     # Use GPU if available via ONNX Runtime
     os.environ.setdefault(
         "ONNXRUNTIME_EXECUTION_PROVIDERS",
@@ -21,4 +32,4 @@ def load_player_detection_model():
         model_id=PLAYER_DETECTION_MODEL_ID,
         api_key=ROBOFLOW_API_KEY
     )
-    return model
\ No newline at end of file
+    return model
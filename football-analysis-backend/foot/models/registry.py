@@ -0,0 +1,51 @@
+# models/registry.py
+
+import threading
+
+
+def _load_player():
+    from models.player_detection import load_player_detection_model
+    return load_player_detection_model()
+
+
+def _load_field():
+    from models.field_detection import load_field_detection_model
+    return load_field_detection_model()
+
+
+# The loaders import the inference SDK lazily, so modules that only need the
+# registry's names (e.g. re-render jobs) never pull it in.
+_LOADERS = {
+    "player": _load_player,
+    "field": _load_field,
+}
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_model(name: str):
+    """
+    Return the shared instance of a detection model, loading it on first use.
+    Every job in the process reuses the same instance instead of reloading it.
+    """
+    with _lock:
+        if name not in _models:
+            _models[name] = _LOADERS[name]()
+        return _models[name]
+
+
+def get_player_detection_model():
+    return get_model("player")
+
+
+def get_field_detection_model():
+    return get_model("field")
+
+
+def warmup_models():
+    """
+    Load every registered model so the first job does not pay for it.
+    """
+    for name in _LOADERS:
+        get_model(name)
@@ -1,53 +1,201 @@
 # models/team_classifier.py
 
+import cv2
+import numpy as np
 import torch
 import supervision as sv
 from tqdm import tqdm
+from sklearn.cluster import KMeans
 from sports.common.team import TeamClassifier
-from config import PLAYER_ID, CONFIDENCE_THRESHOLD, NMS_THRESHOLD
+from config import (
+    PLAYER_ID, CONFIDENCE_THRESHOLD, NMS_THRESHOLD,
+    TEAM_CROP_BUDGET, TEAM_CROP_SIZE,
+    TEAM_STABILITY_CHECK, TEAM_STABLE_AGREEMENT, TEAM_STABLE_CHECKS,
+    TEAM_MIN_SAMPLE_FRAMES,
+)
 
 
 def _get_device():
     return "cuda" if torch.cuda.is_available() else "cpu"
 
 
-def fit_team_classifier_from_video(
+def _spread_order(n: int):
+    """
+    0..n-1 coarse to fine (0, n/2, n/4, 3n/4, ...), so any prefix of the
+    order is spread evenly over the whole range.
+    """
+    step = 1
+    while step < n:
+        step *= 2
+    seen = np.zeros(n, dtype=bool)
+    while step >= 1:
+        for i in range(0, n, step):
+            if not seen[i]:
+                seen[i] = True
+                yield i
+        step //= 2
+
+
+class CropReservoir:
+    """
+    Fixed-budget uniform sample of player crops (reservoir sampling).
+    Crops are resized to the embedding input size as they arrive, so the
+    buffer is one preallocated uint8 array however long the video is.
+    """
+
+    def __init__(self, budget: int = TEAM_CROP_BUDGET, size: int = TEAM_CROP_SIZE, seed: int = 0):
+        self.crops = np.zeros((budget, size, size, 3), dtype=np.uint8)
+        self.size = size
+        self.filled = 0
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def full(self):
+        return self.filled == len(self.crops)
+
+    def add(self, crop):
+        self.seen += 1
+        if self.filled < len(self.crops):
+            slot = self.filled
+            self.filled += 1
+        else:
+            slot = self.rng.integers(0, self.seen)
+            if slot >= len(self.crops):
+                return
+        self.crops[slot] = cv2.resize(crop, (self.size, self.size), interpolation=cv2.INTER_AREA)
+
+    def sample(self):
+        return list(self.crops[:self.filled])
+
+    def color_features(self):
+        """
+        Mean Lab color of the shirt area of each crop: a cheap stand-in for
+        the embeddings, good enough to tell when the two teams stop moving.
+        """
+        s = self.size
+        torso = self.crops[:self.filled, int(s * 0.15):int(s * 0.5), int(s * 0.25):int(s * 0.75)]
+        lab = np.stack([cv2.cvtColor(c, cv2.COLOR_BGR2LAB) for c in torso])
+        return lab.reshape(len(lab), -1, 3).mean(axis=1)
+
+
+def _clusters_stable(reservoir, previous):
+    """
+    Fit 2-means on the reservoir's colors; returns (model, agreement with
+    the previous model on the same crops, label-swap invariant).
+    """
+    features = reservoir.color_features()
+    model = KMeans(n_clusters=2, n_init=3, random_state=0).fit(features)
+    if previous is None:
+        return model, 0.0
+    same = np.mean(model.labels_ == previous.predict(features))
+    return model, max(same, 1.0 - same)
+
+
+def collect_player_crops(
     source_video_path: str,
     player_detection_model,
-    stride: int = 30
-) -> TeamClassifier:
+    stride: int = 30,
+    budget: int = TEAM_CROP_BUDGET,
+    start: int = 0,
+    end: int = None,
+    check=None,
+):
     """
-    Sample frames from the video, detect players, crop their images,
-    and fit TeamClassifier on those crops.
+    Detect players on every `stride`-th frame of [start, end) -- visited
+    coarse to fine across the window -- and keep a reservoir of at most
+    `budget` crops. Short windows use a smaller stride so that at least
+    TEAM_MIN_SAMPLE_FRAMES frames are sampled. Stops early once the team
+    colour clusters have stayed the same for TEAM_STABLE_CHECKS checks in a
+    row. `check` is called before every sampled frame (job cancellation,
+    see utils/job_control.py).
     """
+    if end is None:
+        end = sv.VideoInfo.from_video_path(source_video_path).total_frames
+    stride = max(1, min(stride, (end - start) // TEAM_MIN_SAMPLE_FRAMES))
+    frame_indices = np.arange(start, end, stride)
+    reservoir = CropReservoir(budget)
+    model, stable, sampled = None, 0, 0
+
+    cap = cv2.VideoCapture(source_video_path)
+    try:
+        for i in tqdm(_spread_order(len(frame_indices)), total=len(frame_indices),
+                      desc="collecting crops for team classifier"):
+            if check is not None:
+                check()
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(frame_indices[i]))
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            result = player_detection_model.infer(
+                frame,
+                confidence=CONFIDENCE_THRESHOLD
+            )[0]
+            detections = sv.Detections.from_inference(result)
+
+            # Optional NMS
+            detections = detections.with_nms(
+                threshold=NMS_THRESHOLD,
+                class_agnostic=True
+            )
+            detections = detections[detections.class_id == PLAYER_ID]
 
-    frame_generator = sv.get_video_frames_generator(
-        source_path=source_video_path,
-        stride=stride
-    )
+            for xyxy in detections.xyxy:
+                crop = sv.crop_image(frame, xyxy)
+                if crop.size:
+                    reservoir.add(crop)
 
-    crops = []
-    for frame in tqdm(frame_generator, desc="collecting crops for team classifier"):
-        result = player_detection_model.infer(
-            frame,
-            confidence=CONFIDENCE_THRESHOLD
-        )[0]
-        detections = sv.Detections.from_inference(result)
+            sampled += 1
+            if reservoir.full and sampled % TEAM_STABILITY_CHECK == 0:
+                model, agreement = _clusters_stable(reservoir, model)
+                stable = stable + 1 if agreement >= TEAM_STABLE_AGREEMENT else 0
+                if stable >= TEAM_STABLE_CHECKS:
+                    print(f"✅ Team clusters stable after {sampled}/{len(frame_indices)} frames")
+                    break
+    finally:
+        cap.release()
 
-        # Optional NMS
-        detections = detections.with_nms(
-            threshold=NMS_THRESHOLD,
-            class_agnostic=True
-        )
-        detections = detections[detections.class_id == PLAYER_ID]
+    return reservoir.sample()
 
-        players_crops = [sv.crop_image(frame, xyxy) for xyxy in detections.xyxy]
-        crops += players_crops
 
+def fit_team_classifier(crops) -> TeamClassifier:
     if len(crops) == 0:
         raise RuntimeError("No player crops collected for team classifier training.")
 
     device = _get_device()
     team_classifier = TeamClassifier(device=device)
     team_classifier.fit(crops)
-    return team_classifier
\ No newline at end of file
+    return team_classifier
+
+
+def fit_team_classifier_from_video(
+    source_video_path: str,
+    player_detection_model,
+    stride: int = 30,
+    start: int = 0,
+    end: int = None,
+    check=None,
+) -> TeamClassifier:
+    """
+    Sample frames from the video (or the window [start, end)), detect
+    players, crop their images, and fit TeamClassifier on a bounded sample
+    of those crops.
+    """
+    crops = collect_player_crops(source_video_path, player_detection_model, stride=stride,
+                                 start=start, end=end, check=check)
+    return fit_team_classifier(crops)
+
+
+def team_classifier_state(team_classifier: TeamClassifier) -> dict:
+    """
+    The fitted part of a classifier (UMAP reducer + KMeans), small enough
+    for a job checkpoint; the embedding model is reloaded on restore.
+    """
+    return {"reducer": team_classifier.reducer, "cluster_model": team_classifier.cluster_model}
+
+
+def restore_team_classifier(state: dict) -> TeamClassifier:
+    team_classifier = TeamClassifier(device=_get_device())
+    team_classifier.reducer = state["reducer"]
+    team_classifier.cluster_model = state["cluster_model"]
+    return team_classifier
@@ -1,24 +1,14 @@
 # pipelines/ball_tracking_pipeline.py
 
-import os
-import sys
-from collections import deque
 import numpy as np
-import cv2
-from tqdm import tqdm
-
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 import supervision as sv
 from sports.annotators.soccer import draw_pitch, draw_paths_on_pitch
 
-from config import (
-    BALL_ID, CONFIDENCE_THRESHOLD,
-    MAXLEN, MAX_DISTANCE_THRESHOLD, CONFIG
-)
-from models.player_detection import load_player_detection_model  
-from models.field_detection import load_field_detection_model
-from models.view_transformer import ViewTransformer
+from config import MAX_DISTANCE_THRESHOLD, CONFIG, FPS
+from pipelines.frame_analysis import run_analysis
+from utils.draw_utils import resolve_style
+from utils.video_utils import LazyVideoWriter, compose_output_frame
 
 # -------------------------------
 # MANUAL PATHS (edit)
@@ -31,112 +21,93 @@ OUTPUT_VIDEO = r"C:\Users\Soham Harip\OneDrive\Desktop\foot\output\sample1_outpu
 # -------------------------------
 
 
-def run_ball_tracking_pipeline(source_video, output_video):
-
-    print("🔄 Loading models...")
-    player_model = load_player_detection_model()
-    field_model = load_field_detection_model()
-
-    video_info = sv.VideoInfo.from_video_path(source_video)
-
-    raw_positions = []
-    homography_history = deque(maxlen=MAXLEN)
-
-    first_frame = next(sv.get_video_frames_generator(source_video))
-    h, w = first_frame.shape[:2]
-
-    writer = cv2.VideoWriter(
-        output_video,
-        cv2.VideoWriter_fourcc(*"mp4v"),
-        video_info.fps,
-        (w * 2, h)
-    )
-
-    for frame in tqdm(
-        sv.get_video_frames_generator(source_video),
-        total=video_info.total_frames
-    ):
-        # 1) BALL detection
-        res = player_model.infer(frame, confidence=CONFIDENCE_THRESHOLD)[0]
-        det = sv.Detections.from_inference(res)
-
-        ball_det = det[det.class_id == BALL_ID]
-        if len(ball_det):
-            ball_det.xyxy = sv.pad_boxes(ball_det.xyxy, 10)
-
-        # 2) FIELD detection
-        f_res = field_model.infer(frame, confidence=CONFIDENCE_THRESHOLD)[0]
-        key_pts = sv.KeyPoints.from_inference(f_res)
-        mask = key_pts.confidence[0] > 0.5
-
-        if not np.any(mask) or len(ball_det) == 0:
-            pitch = draw_pitch(CONFIG)
-            pitch = cv2.resize(pitch, (w, h))
-            combined = np.hstack((frame, pitch))
-            combined = cv2.cvtColor(combined, cv2.COLOR_RGB2BGR)
-            writer.write(combined)
-            continue
-
-        src = key_pts.xy[0][mask]
-        tgt = np.array(CONFIG.vertices)[mask]
-
-        transformer = ViewTransformer(src, tgt)
-
-        homography_history.append(transformer.m)
-        transformer.m = np.mean(np.array(homography_history), axis=0)
-
-        ball_xy = ball_det.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
-        pitch_xy = transformer.transform_points(ball_xy)
-
-        raw_positions.append(pitch_xy)
-
-        # Remove outliers
-        cleaned = []
-        last = None
-        for p in raw_positions:
-            if len(p) == 0:
-                cleaned.append(p)
-                continue
-            if last is None:
-                cleaned.append(p)
-                last = p
-                continue
-            if np.linalg.norm(p - last) > MAX_DISTANCE_THRESHOLD:
-                cleaned.append(np.array([], dtype=np.float32))
-            else:
-                cleaned.append(p)
-                last = p
-
-        final_path = [p.flatten() for p in cleaned]
-
-        # 4) Draw pitch
+class BallPathRenderer:
+    """
+    Writes the camera view next to a radar with the ball's path so far,
+    from the per-frame results of `postprocess_frame` (or stored tracks).
+    layout, scale and style work as for PlayerRadarRenderer. Asks for the
+    ball ROI stage (models/ball_roi.py), which finds the ball on frames
+    where the full-frame detector misses it.
+    """
+
+    needs_teams = False
+    needs_ball_roi = True
+
+    def __init__(self, output_video, fps=FPS, layout="both", scale=1.0, style=None, writer=None):
+        self.output_video = output_video
+        self.layout = layout
+        self.scale = scale
+        self.style = resolve_style(style)
+        self.writer = writer or LazyVideoWriter(output_video, fps=fps)
+
+        # outlier-filtered path, extended one frame at a time
+        self.path = []
+        self.last = None
+        # radar of the path so far, redrawn only when the path grows
+        self._radar = None
+        self._radar_points = -1
+
+    def __getstate__(self):
+        # checkpoints (pipelines/frame_analysis.py): the radar is redrawn
+        state = dict(self.__dict__)
+        state.update(_radar=None, _radar_points=-1)
+        return state
+
+    def _add_position(self, p):
+        """
+        Drop positions that jump more than MAX_DISTANCE_THRESHOLD from the
+        last accepted one.
+        """
+        if len(p) == 0:
+            return
+        if self.last is not None and np.linalg.norm(p - self.last) > MAX_DISTANCE_THRESHOLD:
+            return
+        self.last = p
+        flat = p.flatten()
+        if len(flat) == 2:
+            self.path.append(flat)
+
+    def _radar_view(self):
+        if self._radar is not None and self._radar_points == len(self.path):
+            return self._radar
         pitch = draw_pitch(CONFIG)
-
-        valid_path = [p for p in final_path if len(p) == 2]
-
-        if len(valid_path):
+        if len(self.path):
             temp = draw_paths_on_pitch(
                 config=CONFIG,
-                paths=[valid_path],
-                color=sv.Color.WHITE,
+                paths=[self.path],
+                color=sv.Color.from_hex(self.style["path_color"]),
                 pitch=pitch
             )
             if temp is not None:
                 pitch = temp
+        self._radar, self._radar_points = pitch, len(self.path)
+        return pitch
+
+    def write(self, frame, analysis):
+        # a new camera shot: the ball may legitimately be far from the
+        # last accepted position
+        if analysis.get("cut"):
+            self.last = None
+        # pitch positions come from the temporally smoothed homography
+        # (models/homography.py), or from stored tracks
+        if analysis["pitch"] is not None and len(analysis["ball"]):
+            self._add_position(analysis["pitch"]["ball"])
 
-        pitch = cv2.resize(pitch, (w, h))
+        pitch = self._radar_view() if self.layout != "camera" else None
+        self.writer.write(compose_output_frame(frame, pitch, self.layout, self.scale))
 
-        # 5) Combine
-        combined = np.hstack((frame, pitch))
-        combined = cv2.cvtColor(combined, cv2.COLOR_RGB2BGR)
-        writer.write(combined)
+    def close(self):
+        if self.writer.release():
+            print(f"🎉 Ball tracking video saved at: {self.output_video}")
 
-    writer.release()
-    print(f"🎉 Ball tracking video saved at: {output_video}")
+
+def run_ball_tracking_pipeline(source_video, output_video):
+    video_info = sv.VideoInfo.from_video_path(source_video)
+    run_analysis(source_video, [BallPathRenderer(output_video, fps=video_info.fps)])
 
 
 # --------------------------
-# Run manually
+# Run manually (from foot/: python -m pipelines.ball_tracking_pipelines)
 # --------------------------
 if __name__ == "__main__":
-    run_ball_tracking_pipeline(SOURCE_VIDEO, OUTPUT_VIDEO)
\ No newline at end of file
+    run_ball_tracking_pipeline(SOURCE_VIDEO, OUTPUT_VIDEO)
@@ -0,0 +1,39 @@
+# pipelines/batch_pipelines.py
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config import BATCH_MAX_VIDEOS
+from models.registry import get_player_detection_model, get_field_detection_model
+from models.batching import InferenceBatcher, BatchedModel
+
+
+def run_batch_pipeline(tasks, run_task, max_videos=BATCH_MAX_VIDEOS):
+    """
+    Analyse several videos in this process at once, one thread per video
+    (at most `max_videos` at a time), sharing the registry's models through
+    an InferenceBatcher: frames of different videos go through the
+    detectors together, so many short clips keep the model busy with full
+    batches instead of paying per-clip startup and single-frame calls.
+    Every video still has its own tracker, homography, team classifier,
+    outputs and job control -- each runs the combined pipeline as usual.
+
+    tasks: analysis tasks, (job id, "analysis", input path, outputs, options)
+    run_task(task, models): runs one task with the given (player, field)
+        models and reports its outcome; must not raise
+        (analysis_service._run_task)
+    """
+    batcher = InferenceBatcher()
+    models = (
+        BatchedModel(get_player_detection_model(), batcher),
+        BatchedModel(get_field_detection_model(), batcher),
+    )
+
+    def run(task):
+        with batcher.member():
+            run_task(task, models)
+
+    with ThreadPoolExecutor(max_workers=max_videos, thread_name_prefix="batch-video") as pool:
+        list(pool.map(run, tasks))
+    if batcher.batches:
+        print(f"📦 {len(tasks)} videos: {batcher.images} images in {batcher.batches} model calls "
+              f"({batcher.images / batcher.batches:.1f} per call)")
@@ -0,0 +1,66 @@
+# pipelines/combined_pipelines.py
+
+import supervision as sv
+
+from pipelines.frame_analysis import run_analysis
+from pipelines.players_field_pipelines import PlayerRadarRenderer
+from pipelines.ball_tracking_pipelines import BallPathRenderer
+from utils.match_metrics import MatchMetrics
+from utils.heatmaps import MatchHeatmaps
+from utils.position_stream import PositionStreamWriter
+from utils.job_control import JobControl
+from utils.video_utils import SegmentedVideoWriter
+
+OUTPUT_KINDS = ("players", "ball")
+
+
+def run_combined_pipeline(source_video, outputs: dict, use_cache=True, tracks_dir=None,
+                          metrics_path=None, heatmaps_path=None, start=None, end=None,
+                          job_dir=None, positions_dir=None, layout="both", models=None):
+    """
+    Run detection and homography once per frame and feed every requested
+    renderer from the same results.
+
+    outputs: {"players": path, "ball": path}, or any non-empty subset.
+    use_cache: re-run from the video's detection cache when there is one.
+    tracks_dir: where to store per-frame tracks for `/rerender`.
+    metrics_path, heatmaps_path: where to save the match metrics summary
+        and the heatmaps/pass network; only computed when players are
+        tracked (the "players" output).
+    start, end: analyse only this window -- frame numbers (int) or
+        timestamps in seconds (float).
+    job_dir: the job's control directory (utils/job_control.py): the job
+        can be cancelled, and checkpoints there so that running it again
+        resumes where it stopped.
+    positions_dir: where to write the per-frame pitch positions for the
+        client-side radar (utils/position_stream.py).
+    layout: layout of the "players" video; "camera" leaves the radar to
+        the client.
+    models: (player model, field model) instead of the registry's (batch
+        jobs, see pipelines/batch_pipelines.py).
+    """
+    if not outputs or set(outputs) - set(OUTPUT_KINDS):
+        raise ValueError(f"outputs must be a non-empty subset of {OUTPUT_KINDS}")
+
+    video_info = sv.VideoInfo.from_video_path(source_video)
+    control = JobControl(job_dir) if job_dir else None
+
+    def writer(path):
+        return SegmentedVideoWriter(path, fps=video_info.fps) if control is not None else None
+
+    renderers = []
+    if "players" in outputs:
+        renderers.append(PlayerRadarRenderer(outputs["players"], layout=layout,
+                                             writer=writer(outputs["players"])))
+        if metrics_path:
+            renderers.append(MatchMetrics(metrics_path, fps=video_info.fps))
+        if heatmaps_path:
+            renderers.append(MatchHeatmaps(heatmaps_path, fps=video_info.fps))
+    if "ball" in outputs:
+        renderers.append(BallPathRenderer(outputs["ball"], fps=video_info.fps,
+                                          writer=writer(outputs["ball"])))
+    if positions_dir:
+        renderers.append(PositionStreamWriter(positions_dir, fps=video_info.fps))
+
+    run_analysis(source_video, renderers, use_cache=use_cache, tracks_dir=tracks_dir,
+                 start=start, end=end, control=control, models=models)
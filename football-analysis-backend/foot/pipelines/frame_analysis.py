@@ -0,0 +1,458 @@
+# pipelines/frame_analysis.py
+
+import threading
+from collections import OrderedDict
+
+from tqdm import tqdm
+import numpy as np
+
+import supervision as sv
+
+from config import (
+    PLAYER_ID, CONFIDENCE_THRESHOLD, NMS_THRESHOLD,
+    RAW_CONFIDENCE_FLOOR, CONFIG,
+    DETECTION_CACHE_CHUNK, CHECKPOINT_CHUNKS, BALL_ROI_ENABLED, SHOT_FILTER_ENABLED,
+    BATCH_MAX_VIDEOS,
+)
+
+from models.registry import get_player_detection_model, get_field_detection_model
+from models.homography import HomographyEstimator
+from models.ball_roi import BallROIDetector
+from utils.postprocess import split_raw, nms_keep, route_tracked
+from utils.video_utils import get_frames_generator, resolve_window
+from utils.track_store import TrackStoreWriter
+from utils.job_control import JobCancelled, has_checkpoint
+from utils.shot_filter import ShotFilter, SHOT_CUT, SHOT_OFF_PITCH, shot_filter_key
+from utils.detection_cache import (
+    DetectionCacheWriter,
+    cache_dir_for,
+    load_cache_meta,
+    iter_cached_detections,
+)
+
+
+def detect_frame(frame, player_model, field_model, team_classifier=None, ball_roi=None):
+    """
+    Run the models on one frame and return the raw outputs, unfiltered:
+    (detections, kp_xy, kp_conf). Every box down to RAW_CONFIDENCE_FLOOR is
+    kept; detections.data["team_id"] is the team of each player box (-1 for
+    other classes or without a team classifier). This is what the detection
+    cache stores.
+
+    With a BallROIDetector (models/ball_roi.py), frames where the ball was
+    missed get a second, cropped look for it.
+    """
+    result = player_model.infer(frame, confidence=RAW_CONFIDENCE_FLOOR)[0]
+    detections = sv.Detections.from_inference(result)
+
+    team_id = np.full(len(detections), -1, dtype=int)
+    if team_classifier is not None:
+        is_player = detections.class_id == PLAYER_ID
+        if np.any(is_player):
+            crops = [sv.crop_image(frame, xyxy) for xyxy in detections.xyxy[is_player]]
+            team_id[is_player] = team_classifier.predict(crops)
+    detections.data["team_id"] = team_id
+    if ball_roi is not None:
+        detections = ball_roi.update(frame, player_model, detections)
+
+    field_res = field_model.infer(frame, confidence=RAW_CONFIDENCE_FLOOR)[0]
+    key_points = sv.KeyPoints.from_inference(field_res)
+    num_vertices = len(CONFIG.vertices)
+    if len(key_points):
+        kp_xy, kp_conf = key_points.xy[0], key_points.confidence[0]
+    else:
+        kp_xy = np.zeros((num_vertices, 2), dtype=np.float32)
+        kp_conf = np.zeros(num_vertices, dtype=np.float32)
+
+    return detections, kp_xy, kp_conf
+
+
+def empty_frame_outputs():
+    """
+    What `detect_frame` returns for a frame the detectors skipped (an
+    off-pitch frame): no boxes, no confident keypoints.
+    """
+    detections = sv.Detections.empty()
+    detections.data["team_id"] = np.empty(0, dtype=int)
+    num_vertices = len(CONFIG.vertices)
+    return detections, np.zeros((num_vertices, 2), dtype=np.float32), np.zeros(num_vertices, dtype=np.float32)
+
+
+def reset_tracking(tracker=None, homography=None, ball_roi=None):
+    """
+    Start tracking over at a camera cut: tracks, the homography and the ball
+    ROI prediction of the previous shot do not carry over. New tracks keep
+    counting ids, so an id is never given to two players.
+    """
+    if tracker is not None:
+        tracker.tracked_tracks, tracker.lost_tracks, tracker.removed_tracks = [], [], []
+    if homography is not None:
+        homography.reset()
+    if ball_roi is not None:
+        ball_roi.reset()
+
+
+def empty_analysis():
+    """
+    `postprocess_frame` result of a frame with nothing on it (off-pitch).
+    """
+    return {
+        "ball": sv.Detections.empty(),
+        "players": sv.Detections.empty(),
+        "goalkeepers": sv.Detections.empty(),
+        "referees": sv.Detections.empty(),
+        "combined": sv.Detections.empty(),
+        "labels": [],
+        "homography": None,
+        "pitch": None,
+        "cut": False,
+    }
+
+
+def postprocess_frame(detections, kp_xy, kp_conf, tracker=None, homography=None) -> dict:
+    """
+    CPU-only post-processing of the raw outputs of `detect_frame` (or the
+    detection cache). Returns everything the renderers need:
+
+    - ball: padded ball detections
+    - players, goalkeepers, referees, combined, labels: tracked detections
+      with team ids (only when a tracker is given)
+    - homography: smoothed 3x3 image -> pitch matrix, or None when there
+      is no usable fit
+    - pitch: pitch coordinates of ball, players, goalkeepers and referees
+      (None without a homography)
+    - cut: whether the frame starts a new camera shot (set by run_analysis)
+
+    Pass the same HomographyEstimator for every frame of a video so the
+    homography is smoothed and reused across frames.
+    """
+    ball_det, others = split_raw(detections, CONFIDENCE_THRESHOLD)
+
+    analysis = empty_analysis()
+    analysis["ball"] = ball_det
+    anchors = {}
+
+    if tracker is not None:
+        others = others[nms_keep(others.xyxy, others.confidence, NMS_THRESHOLD)]
+        routed = route_tracked(tracker.update_with_detections(others))
+        anchors = routed.pop("anchors")
+        analysis.update(routed)
+
+    # ------- FIELD -------
+    if homography is None:
+        homography = HomographyEstimator()
+    analysis["homography"] = homography.update(kp_xy, kp_conf)
+    anchors["ball"] = ball_det.get_anchors_coordinates(sv.Position.BOTTOM_CENTER) if len(ball_det) else np.empty((0, 2))
+    analysis["pitch"] = homography.project({
+        key: anchors.get(key, np.empty((0, 2))) for key in ("ball", "players", "goalkeepers", "referees")
+    })
+
+    return analysis
+
+
+# Team classifiers fitted in this worker process, (video key, window) ->
+# classifier, least recently used first. Batch jobs analyse several videos
+# on concurrent threads, so up to BATCH_MAX_VIDEOS are kept (each holds its
+# own embedding model); a video's fit runs once, the other threads that
+# need it wait on its entry in _team_fit_pending.
+_team_fits = OrderedDict()
+_team_fit_pending = {}
+_team_fit_lock = threading.Lock()
+
+
+def _cached_team_fit(key, window):
+    """A fit on the whole video or on the same window; call with the lock held."""
+    for entry in ((key, None), (key, window)):
+        if entry in _team_fits:
+            _team_fits.move_to_end(entry)
+            return _team_fits[entry]
+    return None
+
+
+def _team_classifier_for(source_video, player_model, start, end, total_frames, check=None):
+    """
+    Team classifier for frames [start, end) of the video. A fit on the whole
+    video, or on the same window, from an earlier job in this worker is
+    reused; otherwise crops are sampled inside the window only.
+    """
+    key = cache_dir_for(source_video)
+    window = None if (start, end) == (0, total_frames) else (start, end)
+    with _team_fit_lock:
+        classifier = _cached_team_fit(key, window)
+        if classifier is None:
+            fitting = _team_fit_pending.setdefault((key, window), threading.Lock())
+    if classifier is None:
+        with fitting:
+            with _team_fit_lock:
+                classifier = _cached_team_fit(key, window)
+            if classifier is None:
+                return _fit_team_classifier(source_video, player_model, key, window, start, end, check)
+    print("♻️  Reusing team classifier fitted for this video")
+    return classifier
+
+
+def _fit_team_classifier(source_video, player_model, key, window, start, end, check):
+    """Fit and remember a classifier, holding its _team_fit_pending lock."""
+    # torch/transformers are only imported when a model actually runs
+    from models.team_classifier import fit_team_classifier_from_video
+
+    print("🔄 Training team classifier...")
+    classifier = None
+    try:
+        classifier = fit_team_classifier_from_video(
+            source_video_path=source_video,
+            player_detection_model=player_model,
+            stride=30,
+            start=start,
+            end=end,
+            check=check,
+        )
+    finally:
+        with _team_fit_lock:
+            _team_fit_pending.pop((key, window), None)
+            if classifier is not None:
+                _team_fits[(key, window)] = classifier
+                while len(_team_fits) > BATCH_MAX_VIDEOS:
+                    _team_fits.popitem(last=False)
+    return classifier
+
+
+def _usable_cache(source_video, needs_teams, needs_ball_roi):
+    cache_dir = cache_dir_for(source_video)
+    meta = load_cache_meta(cache_dir)
+    if meta is None or (needs_teams and not meta["has_teams"]):
+        return None
+    if needs_ball_roi and not meta.get("ball_roi"):
+        return None
+    # frames the shot filter skipped are empty in the cache
+    shot_filter = meta.get("shot_filter")
+    if shot_filter and not (SHOT_FILTER_ENABLED and shot_filter == shot_filter_key()):
+        return None
+    return cache_dir
+
+
+def _checkpointable(renderers):
+    """
+    Renderers can only be pickled between two video parts, which needs a
+    SegmentedVideoWriter (anything with `cut()`).
+    """
+    return all(hasattr(r.writer, "cut") for r in renderers if hasattr(r, "writer"))
+
+
+def _resumable_writers(state):
+    writers = [w.store for w in (state["cache_writer"], state["track_writer"]) if w is not None]
+    writers += [r.writer for r in state["renderers"] if hasattr(getattr(r, "writer", None), "rollback")]
+    return writers
+
+
+def _load_checkpoint(control, source_video, window, renderers):
+    """
+    The job's checkpoint, if it was saved for the same video, window and
+    kinds of renderers and its partial outputs are still on disk; rolled
+    back to the point it was saved. None otherwise.
+    """
+    state = control.load_checkpoint()
+    if state is None:
+        return None
+    if (state["source_video"], state["window"]) != (source_video, window):
+        return None
+    if [type(r) for r in state["renderers"]] != [type(r) for r in renderers]:
+        return None
+    if state["cache_dir"] is not None and load_cache_meta(state["cache_dir"]) is None:
+        return None
+    try:
+        for writer in _resumable_writers(state):
+            writer.rollback()
+    except OSError:
+        return None
+    return state
+
+
+def _save_checkpoint(control, state):
+    for renderer in state["renderers"]:
+        if hasattr(renderer, "writer"):
+            renderer.writer.cut()
+    control.save_checkpoint(state)
+
+
+def run_analysis(source_video, renderers, use_cache=True, tracks_dir=None, start=None, end=None,
+                 control=None, models=None):
+    """
+    Drive one pass over the video: every frame is analyzed once and handed
+    to each renderer (see players_field_pipelines.PlayerRadarRenderer and
+    ball_tracking_pipelines.BallPathRenderer), which write their own outputs.
+
+    The raw model outputs are written to the detection cache as the job runs.
+    With use_cache, a complete cache for this video replaces the models, so
+    the pass only costs decoding, post-processing and rendering.
+    Tracking and team assignment only run if a renderer needs teams, and
+    the ball ROI stage (models/ball_roi.py) only if one has `needs_ball_roi`.
+
+    With SHOT_FILTER_ENABLED, every frame first goes through the shot filter
+    (utils/shot_filter.py): off-pitch frames skip the models and
+    post-processing (their analysis is empty), and tracker, homography and
+    ball ROI restart at camera cuts.
+
+    With tracks_dir, the post-processed tracks of every frame are stored
+    there (utils/track_store.py) for model-free re-rendering.
+
+    start/end limit the pass to a window of the video: frame numbers (int)
+    or timestamps in seconds (float). Only the window is decoded, and the
+    team classifier samples inside it. A windowed run reads a complete
+    detection cache but does not write one.
+
+    With a JobControl (utils/job_control.py), the pass raises JobCancelled
+    at the next frame once the job is cancelled, and every CHECKPOINT_CHUNKS
+    chunks it saves a checkpoint: the frame reached, tracker, homography and
+    team classifier, the renderers and the partial stores. Run again with
+    the same control, it resumes from the checkpoint -- the renderers in
+    `renderers` are replaced by the saved ones -- and appends to the partial
+    outputs. Video renderers need a SegmentedVideoWriter for this.
+
+    models: (player model, field model) to use instead of the registry's,
+    e.g. batched ones shared by several videos (pipelines/batch_pipelines.py).
+    """
+    needs_teams = any(r.needs_teams for r in renderers)
+    needs_ball_roi = BALL_ROI_ENABLED and any(getattr(r, "needs_ball_roi", False) for r in renderers)
+    video_info = sv.VideoInfo.from_video_path(source_video)
+    start, end = resolve_window(start, end, video_info.fps, video_info.total_frames)
+    full_video = (start, end) == (0, video_info.total_frames)
+    checkpoints = control is not None and _checkpointable(renderers)
+    check = control.check if control is not None else None
+
+    state = _load_checkpoint(control, source_video, (start, end), renderers) if checkpoints else None
+    if state is not None:
+        print(f"⏯️  Resuming from checkpoint at frame {start + state['done']}")
+        renderers[:] = state["renderers"]
+        cache_dir = state["cache_dir"]
+    else:
+        tracker = None
+        if needs_teams:
+            tracker = sv.ByteTrack()
+            tracker.reset()
+        state = {
+            "source_video": source_video,
+            "window": (start, end),
+            "done": 0,
+            "cache_dir": _usable_cache(source_video, needs_teams, needs_ball_roi) if use_cache else None,
+            "tracker": tracker,
+            "homography": HomographyEstimator(),
+            "team_classifier": None,
+            "ball_roi": None,
+            "shot_filter": ShotFilter() if SHOT_FILTER_ENABLED else None,
+            "cache_writer": None,
+            "track_writer": TrackStoreWriter(tracks_dir) if tracks_dir else None,
+            "renderers": renderers,
+        }
+        cache_dir = state["cache_dir"]
+    tracker, homography = state["tracker"], state["homography"]
+    shot_filter = state.get("shot_filter")
+    track_writer = state["track_writer"]
+    resume_at = start + state["done"]
+
+    complete = False
+    keep = False
+    try:
+        cached = None
+        if cache_dir is not None:
+            print(f"♻️  Re-running from detection cache: {cache_dir}")
+            cached = iter_cached_detections(cache_dir, start=resume_at, end=end)
+        else:
+            print("🔄 Loading models...")
+            player_model, field_model = models or (get_player_detection_model(), get_field_detection_model())
+
+            team_classifier = None
+            if needs_teams:
+                if state["team_classifier"] is not None:
+                    from models.team_classifier import restore_team_classifier
+                    team_classifier = restore_team_classifier(state["team_classifier"])
+                else:
+                    from models.team_classifier import team_classifier_state
+                    team_classifier = _team_classifier_for(
+                        source_video, player_model, start, end, video_info.total_frames, check
+                    )
+                    state["team_classifier"] = team_classifier_state(team_classifier)
+            if needs_ball_roi and state["ball_roi"] is None:
+                state["ball_roi"] = BallROIDetector()
+            ball_roi = state["ball_roi"]
+
+            if full_video and state["done"] == 0:
+                state["cache_writer"] = DetectionCacheWriter(
+                    cache_dir_for(source_video),
+                    confidence_floor=RAW_CONFIDENCE_FLOOR,
+                    has_teams=needs_teams,
+                    ball_roi=needs_ball_roi,
+                    shot_filter=shot_filter_key() if shot_filter is not None else None,
+                )
+        cache_writer = state["cache_writer"]
+        checkpoint_every = CHECKPOINT_CHUNKS * DETECTION_CACHE_CHUNK
+
+        print(f"🎥 Processing video: {source_video} (frames {resume_at}-{end})")
+        for frame in tqdm(
+            get_frames_generator(source_video, start=resume_at, end=end),
+            total=end - resume_at,
+            desc="processing"
+        ):
+            if check is not None:
+                check()
+            shot = shot_filter.update(frame) if shot_filter is not None else 0
+            if shot & SHOT_CUT:
+                reset_tracking(tracker, homography, state["ball_roi"])
+            if cached is not None:
+                raw = next(cached, None)
+                if raw is None:
+                    break
+            else:
+                if shot & SHOT_OFF_PITCH:
+                    raw = empty_frame_outputs()
+                else:
+                    raw = detect_frame(frame, player_model, field_model, team_classifier, ball_roi)
+                if cache_writer is not None:
+                    cache_writer.add(raw[0], raw[0].data["team_id"], raw[1], raw[2])
+
+            if shot & SHOT_OFF_PITCH:
+                analysis = empty_analysis()
+            else:
+                analysis = postprocess_frame(*raw, tracker=tracker, homography=homography)
+                analysis["cut"] = bool(shot & SHOT_CUT)
+            if track_writer is not None:
+                track_writer.add(analysis)
+            for renderer in renderers:
+                renderer.write(frame, analysis)
+
+            # multiples of the chunk size: the stores have just flushed
+            state["done"] += 1
+            if checkpoints and state["done"] % checkpoint_every == 0 and start + state["done"] < end:
+                _save_checkpoint(control, state)
+        complete = True
+        if shot_filter is not None:
+            print(f"🎬 Shot filter: {shot_filter.shots} shots, "
+                  f"{shot_filter.off_pitch_frames} off-pitch frames skipped")
+    except JobCancelled as e:
+        keep = e.preempted and has_checkpoint(control.job_dir)
+        raise
+    except Exception:
+        # a failed job can be resumed from its last checkpoint as well
+        keep = checkpoints and has_checkpoint(control.job_dir)
+        raise
+    finally:
+        if keep:
+            # leave the partial stores and output parts to the resumed job
+            for renderer in renderers:
+                if hasattr(renderer, "writer"):
+                    renderer.writer.cut()
+        else:
+            if state["cache_writer"] is not None:
+                state["cache_writer"].close(complete=complete)
+            if track_writer is not None:
+                track_writer.close(
+                    complete=complete,
+                    source_video=source_video,
+                    fps=video_info.fps,
+                    has_teams=needs_teams,
+                    start_frame=start,
+                )
+            for renderer in renderers:
+                renderer.close()
+            if control is not None:
+                control.clear()
@@ -0,0 +1,167 @@
+# pipelines/live_pipelines.py
+
+import os
+import time
+import threading
+
+import supervision as sv
+
+from config import (
+    PLAYER_ID, CONFIDENCE_THRESHOLD,
+    LIVE_LATENCY_BUDGET, LIVE_TEAM_MIN_CROPS, LIVE_TEAM_SAMPLE_EVERY, SHOT_FILTER_ENABLED,
+)
+from models.registry import get_player_detection_model, get_field_detection_model
+from models.homography import HomographyEstimator
+from pipelines.frame_analysis import detect_frame, postprocess_frame, empty_analysis, reset_tracking
+from pipelines.players_field_pipelines import PlayerRadarRenderer
+from pipelines.ball_tracking_pipelines import BallPathRenderer
+from utils.live_source import LiveFrameSource
+from utils.live_publish import LiveFrameWriter, LiveTrackPublisher
+from utils.shot_filter import ShotFilter, SHOT_CUT, SHOT_OFF_PITCH
+
+RENDERERS = {
+    "players": PlayerRadarRenderer,
+    "ball": BallPathRenderer,
+}
+
+
+class _LiveTeams:
+    """
+    Team classifier for a stream: crops are collected from the analysed
+    frames until there are LIVE_TEAM_MIN_CROPS, then the classifier is fitted
+    on a background thread while the stream keeps running. Players have no
+    team (-1) until it is ready.
+    """
+
+    def __init__(self):
+        # torch/transformers only load when a live job needs teams
+        from models.team_classifier import CropReservoir
+        self.reservoir = CropReservoir()
+        self.classifier = None
+        self.error = None
+        self._thread = None
+
+    def collect(self, frame, detections):
+        if self._thread is not None:
+            return
+        players = detections[(detections.class_id == PLAYER_ID)
+                             & (detections.confidence >= CONFIDENCE_THRESHOLD)]
+        for xyxy in players.xyxy:
+            crop = sv.crop_image(frame, xyxy)
+            if crop.size:
+                self.reservoir.add(crop)
+        if self.reservoir.filled >= LIVE_TEAM_MIN_CROPS:
+            self._thread = threading.Thread(target=self._fit, daemon=True)
+            self._thread.start()
+
+    def _fit(self):
+        from models.team_classifier import fit_team_classifier
+        try:
+            self.classifier = fit_team_classifier(self.reservoir.sample())
+        except Exception as e:
+            self.error = str(e)
+
+
+def run_live_pipeline(source, outputs: dict, live_dir, latency_budget=LIVE_LATENCY_BUDGET,
+                      layout="both", scale=1.0, style=None):
+    """
+    Analyse a live stream (any OpenCV-readable URL, or a local file played
+    back in real time) until it ends or <live_dir>/stop appears.
+
+    Frames older than `latency_budget` seconds when their turn comes are
+    dropped; when detection would push a frame over the budget, the frame
+    is drawn with the previous frame's results instead (detection skipped).
+    The shot filter (utils/shot_filter.py) skips detection on off-pitch
+    frames and restarts tracking at camera cuts, where detection always runs.
+    Published continuously in live_dir: the latest composed frame per output
+    (<kind>.jpg), one line of pitch positions per analysed frame
+    (tracks.jsonl) and counters (status.json).
+
+    outputs: {"players": record_path, "ball": record_path} (a record path of
+        None publishes without recording)
+    """
+    if not outputs or set(outputs) - set(RENDERERS):
+        raise ValueError(f"outputs must be a non-empty subset of {tuple(RENDERERS)}")
+
+    source_stream = LiveFrameSource(source)
+    publisher = LiveTrackPublisher(live_dir)
+    stop_file = os.path.join(live_dir, "stop")
+
+    renderers = [
+        RENDERERS[kind](
+            path, fps=source_stream.fps, layout=layout, scale=scale, style=style,
+            writer=LiveFrameWriter(live_dir, kind, record_path=path, fps=source_stream.fps),
+        )
+        for kind, path in outputs.items()
+    ]
+    needs_teams = any(r.needs_teams for r in renderers)
+
+    player_model = get_player_detection_model()
+    field_model = get_field_detection_model()
+    teams = _LiveTeams() if needs_teams else None
+    tracker = sv.ByteTrack(frame_rate=int(round(source_stream.fps))) if needs_teams else None
+    homography = HomographyEstimator()
+    shot_filter = ShotFilter() if SHOT_FILTER_ENABLED else None
+
+    analysis = None
+    detect_seconds = 0.0          # moving average of detection + post-processing time
+    counts = {"analysed": 0, "skipped": 0, "late": 0, "off_pitch": 0}
+    last_status = 0.0
+
+    print(f"📡 Live analysis of {source} (latency budget {latency_budget}s)")
+    try:
+        while not os.path.exists(stop_file):
+            item = source_stream.read()
+            if item is None:
+                break
+            index, captured, frame = item
+
+            age = time.monotonic() - captured
+            if age > latency_budget:
+                counts["late"] += 1
+                continue
+
+            shot = shot_filter.update(frame) if shot_filter is not None else 0
+            if shot & SHOT_CUT:
+                reset_tracking(tracker, homography)
+            if shot & SHOT_OFF_PITCH:
+                analysis = empty_analysis()
+                publisher.publish(index, captured, analysis)
+                counts["off_pitch"] += 1
+            elif analysis is not None and not shot & SHOT_CUT and age + detect_seconds > latency_budget:
+                counts["skipped"] += 1
+            else:
+                started = time.monotonic()
+                classifier = teams.classifier if teams is not None else None
+                detections, kp_xy, kp_conf = detect_frame(frame, player_model, field_model, classifier)
+                if teams is not None and classifier is None and counts["analysed"] % LIVE_TEAM_SAMPLE_EVERY == 0:
+                    teams.collect(frame, detections)
+                analysis = postprocess_frame(detections, kp_xy, kp_conf,
+                                             tracker=tracker, homography=homography)
+                analysis["cut"] = bool(shot & SHOT_CUT)
+                publisher.publish(index, captured, analysis)
+                counts["analysed"] += 1
+                elapsed = time.monotonic() - started
+                detect_seconds = elapsed if counts["analysed"] == 1 else 0.8 * detect_seconds + 0.2 * elapsed
+
+            for renderer in renderers:
+                renderer.write(frame, analysis)
+
+            now = time.monotonic()
+            if now - last_status >= 1.0:
+                last_status = now
+                publisher.status(
+                    frame=index,
+                    latency=round(now - captured, 3),
+                    detect_seconds=round(detect_seconds, 3),
+                    dropped=source_stream.dropped + counts["late"],
+                    teams_ready=teams is not None and teams.classifier is not None,
+                    teams_error=teams.error if teams is not None else None,
+                    **counts,
+                )
+    finally:
+        source_stream.close()
+        for renderer in renderers:
+            renderer.close()
+        publisher.status(ended=True, dropped=source_stream.dropped + counts["late"], **counts)
+        publisher.close()
@@ -1,33 +1,18 @@
 # pipelines/player_field_pipeline.py
 
-import os
-import sys
-from tqdm import tqdm
-import numpy as np
-import cv2
-
-# Make project root importable
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-
 import supervision as sv
 from sports.annotators.soccer import draw_pitch, draw_points_on_pitch
 
-from config import (
-    BALL_ID, GOALKEEPER_ID, PLAYER_ID, REFEREE_ID,
-    CONFIDENCE_THRESHOLD, NMS_THRESHOLD, CONFIG
-)
+from config import CONFIG, FPS
 
-from models.player_detection import load_player_detection_model
-from models.field_detection import load_field_detection_model
-from models.team_classifier import fit_team_classifier_from_video
-from models.view_transformer import ViewTransformer
-from utils.resolve_goalkeepers import resolve_goalkeepers_team_id
+from pipelines.frame_analysis import run_analysis
 from utils.draw_utils import (
+    resolve_style,
     create_ellipse_annotator,
     create_label_annotator,
     create_triangle_annotator,
 )
-from utils.video_utils import get_first_frame, create_side_by_side_writer
+from utils.video_utils import LazyVideoWriter, compose_output_frame
 
 # --------------------------------------------
 # MANUAL VIDEO PATHS (EDIT THESE)
@@ -37,178 +22,109 @@ OUTPUT_VIDEO = r"C:\Users\Soham Harip\OneDrive\Desktop\foot\output\sample1_outpu
 # --------------------------------------------
 
 
-def run_player_field_pipeline(source_video, output_video):
-
-    print("🔄 Loading models...")
-    player_model = load_player_detection_model()
-    field_model = load_field_detection_model()
-
-    print("🔄 Training team classifier...")
-    team_classifier = fit_team_classifier_from_video(
-        source_video_path=source_video,
-        player_detection_model=player_model,
-        stride=30,
-    )
-
-    ellipse_annotator = create_ellipse_annotator()
-    label_annotator = create_label_annotator()
-    triangle_annotator = create_triangle_annotator()
-
-    tracker = sv.ByteTrack()
-    tracker.reset()
-
-    first_frame = get_first_frame(source_video)
-    height, width = first_frame.shape[:2]
-
-    writer = create_side_by_side_writer(
-        output_path=output_video,
-        frame_width=width,
-        frame_height=height,
-    )
-
-    frame_gen = sv.get_video_frames_generator(source_video)
-
-    print(f"🎥 Processing video: {source_video}")
-    for frame in tqdm(frame_gen, desc="processing"):
-
-        # ------- DETECTIONS -------
-        result = player_model.infer(frame, confidence=CONFIDENCE_THRESHOLD)[0]
-        detections = sv.Detections.from_inference(result)
-
-        ball_det = detections[detections.class_id == BALL_ID]
-        if len(ball_det):
-            ball_det.xyxy = sv.pad_boxes(ball_det.xyxy, 10)
-
-        others = detections[detections.class_id != BALL_ID]
-        others = others.with_nms(NMS_THRESHOLD, class_agnostic=True)
-        others = tracker.update_with_detections(others)
-
-        goalkeepers = others[others.class_id == GOALKEEPER_ID]
-        players = others[others.class_id == PLAYER_ID]
-        referees = others[others.class_id == REFEREE_ID]
-
-        # ------- TEAM ASSIGNMENT -------
-        if len(players):
-            crops = [sv.crop_image(frame, xyxy) for xyxy in players.xyxy]
-            players.class_id = team_classifier.predict(crops)
-
-        if len(goalkeepers) and len(players):
-            goalkeepers.class_id = resolve_goalkeepers_team_id(players, goalkeepers)
-
-        if len(referees):
-            referees.class_id -= 1
-
-        combined_det = sv.Detections.merge([players, goalkeepers, referees])
-
-        labels = [f"#{tid}" for tid in combined_det.tracker_id]
-        if len(combined_det):
-            combined_det.class_id = combined_det.class_id.astype(int)
-
-        # ------- CAMERA VIEW -------
+class PlayerRadarRenderer:
+    """
+    Writes the annotated camera view next to a radar of players, referees
+    and ball, from the per-frame results of `postprocess_frame` (or stored
+    tracks, see utils/track_store.py).
+
+    layout: "both", "camera" or "radar" (radar-only needs no video frame)
+    scale: output resolution factor
+    style: overrides for utils.draw_utils.DEFAULT_STYLE
+    writer: where composed frames go instead of a video file (live mode,
+        see utils/live_publish.py)
+    """
+
+    needs_teams = True
+
+    def __init__(self, output_video, fps=FPS, layout="both", scale=1.0, style=None, writer=None):
+        self.output_video = output_video
+        self.layout = layout
+        self.scale = scale
+        self.style = resolve_style(style)
+        self.writer = writer or LazyVideoWriter(output_video, fps=fps)
+
+        palette = self.style["palette"]
+        self.ellipse_annotator = create_ellipse_annotator(palette)
+        self.label_annotator = create_label_annotator(palette)
+        self.triangle_annotator = create_triangle_annotator(color=self.style["ball_color"])
+
+    def _camera_view(self, frame, analysis):
+        ball_det = analysis["ball"]
+        combined_det = analysis["combined"]
         annotated = frame.copy()
 
         if len(combined_det):
-            annotated = ellipse_annotator.annotate(annotated, combined_det)
-            annotated = label_annotator.annotate(annotated, combined_det, labels)
+            annotated = self.ellipse_annotator.annotate(annotated, combined_det)
+            if self.style["labels"]:
+                annotated = self.label_annotator.annotate(annotated, combined_det, analysis["labels"])
 
         if len(ball_det):
-            annotated = triangle_annotator.annotate(annotated, ball_det)
-
-        # ------- FIELD DETECTION -------
-        field_res = field_model.infer(frame, confidence=CONFIDENCE_THRESHOLD)[0]
-        key_points = sv.KeyPoints.from_inference(field_res)
-        mask = key_points.confidence[0] > 0.5
-
-        if not np.any(mask):
-            pitch_view = draw_pitch(CONFIG)
-
-        else:
-            src_pts = key_points.xy[0][mask]
-            tgt_pts = np.array(CONFIG.vertices)[mask]
-
-            transformer = ViewTransformer(source=src_pts, target=tgt_pts)
-
-            # --- Project objects ---
-            ball_xy = (
-                ball_det.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
-                if len(ball_det) else np.empty((0, 2))
+            annotated = self.triangle_annotator.annotate(annotated, ball_det)
+        return annotated
+
+    def _radar_view(self, analysis):
+        pitch_view = draw_pitch(CONFIG)
+        pitch = analysis["pitch"]
+        if pitch is None:
+            return pitch_view
+
+        palette = self.style["palette"]
+        players = analysis["players"]
+
+        # --- Draw ball ---
+        if len(pitch["ball"]):
+            pitch_view = draw_points_on_pitch(
+                config=CONFIG,
+                xy=pitch["ball"],
+                face_color=sv.Color.from_hex(self.style["radar_ball_color"]),
+                edge_color=sv.Color.BLACK,
+                radius=int(8),
+                pitch=pitch_view
             )
-            pitch_ball = transformer.transform_points(ball_xy)
 
-            players_xy = (
-                players.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
-                if len(players) else np.empty((0, 2))
-            )
-            pitch_players = transformer.transform_points(players_xy)
-
-            refs_xy = (
-                referees.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
-                if len(referees) else np.empty((0, 2))
-            )
-            pitch_refs = transformer.transform_points(refs_xy)
-
-            pitch_view = draw_pitch(CONFIG)
-
-            # --- Draw ball ---
-            if len(pitch_ball):
-                pitch_view = draw_points_on_pitch(
-                    config=CONFIG,
-                    xy=pitch_ball,
-                    face_color=sv.Color.WHITE,
-                    edge_color=sv.Color.BLACK,
-                    radius=int(8),
-                    pitch=pitch_view
-                )
-
-            # --- Draw players ---
-            if len(players):
-                # team 0
-                team0 = pitch_players[players.class_id == 0]
-                if len(team0):
+        # --- Draw players (team 0, team 1) ---
+        if len(players):
+            for team in (0, 1):
+                team_xy = pitch["players"][players.class_id == team]
+                if len(team_xy):
                     pitch_view = draw_points_on_pitch(
                         config=CONFIG,
-                        xy=team0,
-                        face_color=sv.Color.from_hex('00BFFF'),
+                        xy=team_xy,
+                        face_color=sv.Color.from_hex(palette[team]),
                         edge_color=sv.Color.BLACK,
                         radius=int(16),
                         pitch=pitch_view
                     )
 
-                # team 1
-                team1 = pitch_players[players.class_id == 1]
-                if len(team1):
-                    pitch_view = draw_points_on_pitch(
-                        config=CONFIG,
-                        xy=team1,
-                        face_color=sv.Color.from_hex('FF1493'),
-                        edge_color=sv.Color.BLACK,
-                        radius=int(16),
-                        pitch=pitch_view
-                    )
+        # --- Draw referees ---
+        if len(pitch["referees"]):
+            pitch_view = draw_points_on_pitch(
+                config=CONFIG,
+                xy=pitch["referees"],
+                face_color=sv.Color.from_hex(palette[2]),
+                edge_color=sv.Color.BLACK,
+                radius=int(14),
+                pitch=pitch_view
+            )
+        return pitch_view
 
-            # --- Draw referees ---
-            if len(pitch_refs):
-                pitch_view = draw_points_on_pitch(
-                    config=CONFIG,
-                    xy=pitch_refs,
-                    face_color=sv.Color.from_hex('FFD700'),
-                    edge_color=sv.Color.BLACK,
-                    radius=int(14),
-                    pitch=pitch_view
-                )
+    def write(self, frame, analysis):
+        camera = self._camera_view(frame, analysis) if self.layout != "radar" else None
+        radar = self._radar_view(analysis) if self.layout != "camera" else None
+        self.writer.write(compose_output_frame(camera, radar, self.layout, self.scale))
 
-        # ------- COMBINE -------
-        radar = cv2.resize(pitch_view, (width, height))
-        out = np.hstack((annotated, radar))
-        out = cv2.cvtColor(out, cv2.COLOR_RGB2BGR)
-        writer.write(out)
+    def close(self):
+        if self.writer.release():
+            print(f"✅ Done! Saved to: {self.output_video}")
 
-    writer.release()
-    print(f"✅ Done! Saved to: {output_video}")
+
+def run_player_field_pipeline(source_video, output_video):
+    run_analysis(source_video, [PlayerRadarRenderer(output_video)])
 
 
 # ---------------------------
-# RUN PIPELINE
+# RUN PIPELINE (from foot/: python -m pipelines.players_field_pipelines)
 # ---------------------------
 if __name__ == "__main__":
-    run_player_field_pipeline(SOURCE_VIDEO, OUTPUT_VIDEO)
\ No newline at end of file
+    run_player_field_pipeline(SOURCE_VIDEO, OUTPUT_VIDEO)
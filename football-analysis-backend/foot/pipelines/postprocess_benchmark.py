@@ -0,0 +1,189 @@
+# pipelines/postprocess_benchmark.py
+"""
+Check frame_analysis.postprocess_frame against the per-class implementation
+it replaced (kept below as `reference_postprocess`) and time both.
+
+    python -m pipelines.postprocess_benchmark                  # synthetic match, 2000 frames
+    python -m pipelines.postprocess_benchmark videos/match.mp4 # the video's detection cache
+
+Both run on the same frames with their own tracker and homography
+estimator. Every frame must give the same ball, players, goalkeepers,
+referees and combined detections (boxes, confidences, class and tracker
+ids, team ids), labels and pitch coordinates; the first difference is
+reported.
+"""
+import argparse
+import time
+
+import numpy as np
+import supervision as sv
+
+from config import (
+    BALL_ID, GOALKEEPER_ID, PLAYER_ID, REFEREE_ID,
+    CONFIDENCE_THRESHOLD, NMS_THRESHOLD, CONFIG,
+)
+from models.homography import HomographyEstimator
+from pipelines.frame_analysis import postprocess_frame
+from utils.detection_cache import cache_dir_for, load_cache_meta, iter_cached_detections
+
+
+def _reference_goalkeepers_team_id(players, goalkeepers):
+    goalkeepers_xy = goalkeepers.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
+    players_xy = players.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
+    with np.errstate(invalid="ignore"):
+        team_0_centroid = players_xy[players.class_id == 0].mean(axis=0)
+        team_1_centroid = players_xy[players.class_id == 1].mean(axis=0)
+    goalkeepers_team_id = []
+    for goalkeeper_xy in goalkeepers_xy:
+        # (an empty team's NaN distance counts as infinite, as in goalkeeper_teams)
+        dist_0 = np.nan_to_num(np.linalg.norm(goalkeeper_xy - team_0_centroid), nan=np.inf)
+        dist_1 = np.nan_to_num(np.linalg.norm(goalkeeper_xy - team_1_centroid), nan=np.inf)
+        goalkeepers_team_id.append(0 if dist_0 < dist_1 else 1)
+    return np.array(goalkeepers_team_id)
+
+
+def reference_postprocess(detections, kp_xy, kp_conf, tracker, homography) -> dict:
+    """
+    postprocess_frame as it was: a mask copy per class, with_nms, merge.
+    """
+    detections = detections[detections.confidence >= CONFIDENCE_THRESHOLD]
+    ball = detections[detections.class_id == BALL_ID]
+    if len(ball):
+        ball.xyxy = sv.pad_boxes(ball.xyxy, 10)
+
+    others = detections[detections.class_id != BALL_ID]
+    others = others.with_nms(NMS_THRESHOLD, class_agnostic=True)
+    others = tracker.update_with_detections(others)
+    goalkeepers = others[others.class_id == GOALKEEPER_ID]
+    players = others[others.class_id == PLAYER_ID]
+    referees = others[others.class_id == REFEREE_ID]
+    if len(players):
+        players.class_id = players.data["team_id"]
+    if len(goalkeepers) and len(players):
+        goalkeepers.class_id = _reference_goalkeepers_team_id(players, goalkeepers)
+    if len(referees):
+        referees.class_id -= 1
+    combined = sv.Detections.merge([players, goalkeepers, referees])
+    # (the original iterated tracker_id unguarded, which is None when nothing
+    # was tracked: it raised on such frames)
+    labels = [f"#{tid}" for tid in combined.tracker_id] if len(combined) else []
+    if len(combined):
+        combined.class_id = combined.class_id.astype(int)
+
+    analysis = {"ball": ball, "players": players, "goalkeepers": goalkeepers, "referees": referees,
+                "combined": combined, "labels": labels}
+    analysis["homography"] = homography.update(kp_xy, kp_conf)
+    analysis["pitch"] = homography.project({
+        key: analysis[key].get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
+        if len(analysis[key]) else np.empty((0, 2))
+        for key in ("ball", "players", "goalkeepers", "referees")
+    })
+    return analysis
+
+
+def synthetic_frames(count: int, seed: int = 0):
+    """
+    A match-like stream: 22 players in two teams, 2 goalkeepers, 3 referees
+    and a ball moving around a 1920x1080 view, with duplicate boxes (for
+    NMS), low-confidence boxes, dropouts, and keypoints of a fixed camera.
+    """
+    rng = np.random.default_rng(seed)
+    classes = np.array([PLAYER_ID] * 22 + [GOALKEEPER_ID] * 2 + [REFEREE_ID] * 3 + [BALL_ID])
+    teams = np.array([0] * 11 + [1] * 11 + [-1] * 6)
+    sizes = np.where(classes == BALL_ID, 14, 60)[:, None] * np.array([0.5, 1.0])
+    position = rng.uniform([100, 200], [1800, 1000], size=(len(classes), 2))
+
+    vertices = np.asarray(CONFIG.vertices, dtype=np.float32)
+    scale = 1500 / vertices[:, 0].max()
+    kp_xy = vertices * scale + np.array([200, 100], dtype=np.float32)
+    for _ in range(count):
+        position = np.clip(position + rng.normal(0, 4, position.shape), [50, 150], [1850, 1050])
+        present = rng.random(len(classes)) > 0.05
+        xyxy = np.hstack([position - sizes * [1, 2], position + sizes * [1, 0]])[present]
+        confidence = rng.uniform(0.35, 0.95, present.sum())
+        class_id, team_id = classes[present], teams[present]
+
+        duplicates = rng.random(len(xyxy)) < 0.15
+        xyxy = np.vstack([xyxy, xyxy[duplicates] + rng.normal(0, 3, (duplicates.sum(), 4))])
+        confidence = np.concatenate([confidence, rng.uniform(0.2, 0.9, duplicates.sum())])
+        class_id = np.concatenate([class_id, class_id[duplicates]])
+        team_id = np.concatenate([team_id, team_id[duplicates]])
+
+        detections = sv.Detections(xyxy=xyxy.astype(np.float32), confidence=confidence.astype(np.float32),
+                                   class_id=class_id.astype(int), data={"team_id": team_id.astype(int)})
+        kp_conf = (rng.random(len(vertices)) > 0.3).astype(np.float32)
+        yield detections, kp_xy + rng.normal(0, 0.5, kp_xy.shape).astype(np.float32), kp_conf
+
+
+class _TimedTracker:
+    """ByteTrack that adds up the time spent in it."""
+
+    def __init__(self):
+        self.tracker = sv.ByteTrack()
+        self.seconds = 0.0
+
+    def update_with_detections(self, detections):
+        started = time.perf_counter()
+        tracked = self.tracker.update_with_detections(detections)
+        self.seconds += time.perf_counter() - started
+        return tracked
+
+
+def _difference(name, expected, actual):
+    """Description of the first difference between two analyses, or None."""
+    for key in ("ball", "players", "goalkeepers", "referees", "combined"):
+        a, b = expected[key], actual[key]
+        if len(a) != len(b):
+            return f"{name} {key}: {len(a)} vs {len(b)} detections"
+        if not len(a):
+            continue
+        for field in ("xyxy", "confidence", "class_id", "tracker_id"):
+            if not np.array_equal(getattr(a, field), getattr(b, field)):
+                return f"{name} {key}.{field}: {getattr(a, field)} vs {getattr(b, field)}"
+        if not np.array_equal(a.data.get("team_id"), b.data.get("team_id")):
+            return f"{name} {key} team_id differs"
+    if expected["labels"] != actual["labels"]:
+        return f"{name} labels: {expected['labels']} vs {actual['labels']}"
+    if (expected["pitch"] is None) != (actual["pitch"] is None):
+        return f"{name} pitch: one is None"
+    for key, xy in (expected["pitch"] or {}).items():
+        if not np.allclose(xy, actual["pitch"][key], equal_nan=True):
+            return f"{name} pitch[{key}] differs"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video", nargs="?", help="video with a complete detection cache")
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.video:
+        cache_dir = cache_dir_for(args.video)
+        if load_cache_meta(cache_dir) is None:
+            raise SystemExit(f"no complete detection cache for {args.video}; run an analysis job first")
+        frames = list(iter_cached_detections(cache_dir, end=args.frames))
+    else:
+        frames = list(synthetic_frames(args.frames))
+
+    runs, seconds = {}, {}
+    for name, fn in (("reference", reference_postprocess), ("postprocess_frame", postprocess_frame)):
+        tracker, homography = _TimedTracker(), HomographyEstimator()
+        started = time.perf_counter()
+        runs[name] = [fn(*frame, tracker=tracker, homography=homography) for frame in frames]
+        seconds[name] = (time.perf_counter() - started, tracker.seconds)
+
+    for index, (expected, actual) in enumerate(zip(runs["reference"], runs["postprocess_frame"])):
+        difference = _difference(f"frame {index}", expected, actual)
+        if difference:
+            raise SystemExit(f"❌ {difference}")
+    n = len(frames)
+    objects = sum(len(detections) for detections, _, _ in frames) / max(n, 1)
+    print(f"✅ {n} frames ({objects:.1f} raw boxes per frame): identical results")
+    for name, (total, tracking) in seconds.items():
+        print(f"  {name:18s} {total / n * 1e3:.3f} ms/frame, "
+              f"{(total - tracking) / n * 1e3:.3f} ms of it outside the tracker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# pipelines/rerender_pipelines.py
+
+from tqdm import tqdm
+
+import supervision as sv
+
+from pipelines.players_field_pipelines import PlayerRadarRenderer
+from pipelines.ball_tracking_pipelines import BallPathRenderer
+from utils.track_store import load_tracks_meta, iter_tracks
+from utils.job_control import JobControl
+from utils.video_utils import LAYOUTS
+
+RENDERERS = {
+    "players": PlayerRadarRenderer,
+    "ball": BallPathRenderer,
+}
+
+
+def run_rerender_pipeline(tracks_dir, outputs: dict, layout="both", start=0, end=None,
+                          scale=1.0, style=None, job_dir=None):
+    """
+    Write new output videos from the tracks a finished analysis job stored,
+    without loading any model.
+
+    outputs: {"players": path, "ball": path}, or any non-empty subset
+    layout: "both", "camera" or "radar"; radar-only does not even decode
+        the source video
+    start, end: frame window [start, end) of the original video (clipped to
+        the window the analysis job covered); ValueError if nothing is left
+    scale: output resolution factor
+    style: overrides for utils.draw_utils.DEFAULT_STYLE
+    job_dir: control directory through which the job can be cancelled
+        (utils/job_control.py); re-renders are short and not checkpointed
+    """
+    meta = load_tracks_meta(tracks_dir)
+    if meta is None:
+        raise RuntimeError(f"No stored tracks in {tracks_dir}")
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}")
+    if not outputs or set(outputs) - set(RENDERERS):
+        raise ValueError(f"outputs must be a non-empty subset of {tuple(RENDERERS)}")
+    if "players" in outputs and not meta["has_teams"]:
+        raise ValueError("the source job did not track players; only 'ball' can be re-rendered")
+
+    # stored frame i is frame offset + i of the video (windowed analysis)
+    offset = meta.get("start_frame", 0)
+    stored_end = offset + meta["num_frames"]
+    start = max(start, offset)
+    end = stored_end if end is None else min(end, stored_end)
+    if end <= start:
+        raise ValueError(f"the window has no frames in the analysed frames [{offset}, {stored_end})")
+    renderers = [
+        RENDERERS[kind](path, fps=meta["fps"], layout=layout, scale=scale, style=style)
+        for kind, path in outputs.items()
+    ]
+
+    control = JobControl(job_dir) if job_dir else None
+    frames = None
+    if layout != "radar":
+        frames = sv.get_video_frames_generator(meta["source_video"], start=start, end=end)
+
+    try:
+        for analysis in tqdm(
+            iter_tracks(tracks_dir, start=start - offset, end=end - offset),
+            total=max(end - start, 0),
+            desc="re-rendering"
+        ):
+            if control is not None:
+                control.check()
+            frame = next(frames, None) if frames is not None else None
+            if frames is not None and frame is None:
+                break
+            for renderer in renderers:
+                renderer.write(frame, analysis)
+    finally:
+        for renderer in renderers:
+            renderer.close()
+        if control is not None:
+            control.clear()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# the pipeline modules import each other from foot/ (`from config import ...`)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
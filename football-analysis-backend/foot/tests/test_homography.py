@@ -0,0 +1,39 @@
+# tests/test_homography.py
+
+import cv2
+import numpy as np
+
+from models.homography import HomographyEstimator, _project
+
+VERTICES = np.array([(x, y) for x in (0, 1650, 4000, 6000, 8000, 10350, 12000)
+                     for y in (0, 1450, 3500, 5550, 7000)], dtype=np.float32)
+
+
+def _keypoints(shift_x):
+    """Image keypoints of a camera panned by shift_x pixels."""
+    image = np.array([[200, 200], [1700, 150], [1850, 1000], [100, 1050]], dtype=np.float32)
+    pitch = np.array([[0, 0], [12000, 0], [12000, 7000], [0, 7000]], dtype=np.float32)
+    to_image = cv2.getPerspectiveTransform(pitch, (image + [shift_x, 0]).astype(np.float32))
+    return _project(to_image, VERTICES)
+
+
+def test_still_camera_after_pan_converges_to_the_raw_fit():
+    estimator = HomographyEstimator(target_vertices=VERTICES)
+    conf = np.ones(len(VERTICES))
+    for shift_x in np.linspace(0, 300, 30):
+        estimator.update(_keypoints(shift_x), conf)
+
+    xy = _keypoints(300)
+    for _ in range(60):
+        m = estimator.update(xy, conf)
+    raw, _ = cv2.findHomography(xy, VERTICES)
+    back = _project(np.linalg.inv(m), _project(raw, xy))
+    assert np.abs(back - xy).max() <= 2.0
+
+
+def test_reuses_the_fit_of_a_still_camera():
+    estimator = HomographyEstimator(target_vertices=VERTICES)
+    conf = np.ones(len(VERTICES))
+    xy = _keypoints(0)
+    first = estimator.update(xy, conf)
+    assert estimator.update(xy + 0.5, conf) is first
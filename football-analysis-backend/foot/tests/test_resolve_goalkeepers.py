@@ -0,0 +1,24 @@
+# tests/test_resolve_goalkeepers.py
+
+import numpy as np
+
+from utils.resolve_goalkeepers import goalkeeper_teams
+
+GOALKEEPERS_XY = np.array([[0.0, 0.0], [100.0, 0.0]])
+
+
+def test_closest_team_centroid():
+    players_xy = np.array([[10.0, 0.0], [20.0, 0.0], [90.0, 0.0], [80.0, 0.0]])
+    players_team = np.array([0, 0, 1, 1])
+    assert goalkeeper_teams(players_xy, players_team, GOALKEEPERS_XY).tolist() == [0, 1]
+
+
+def test_team_without_players_is_never_closest():
+    players_xy = np.array([[90.0, 0.0], [80.0, 0.0]])
+    assert goalkeeper_teams(players_xy, np.array([0, 0]), GOALKEEPERS_XY).tolist() == [0, 0]
+    assert goalkeeper_teams(players_xy, np.array([1, 1]), GOALKEEPERS_XY).tolist() == [1, 1]
+
+
+def test_no_team_ids():
+    players_xy = np.array([[90.0, 0.0]])
+    assert goalkeeper_teams(players_xy, np.array([-1]), GOALKEEPERS_XY).tolist() == [1, 1]
@@ -0,0 +1,106 @@
+# utils/detection_cache.py
+
+import os
+import hashlib
+
+import numpy as np
+import supervision as sv
+
+from config import (
+    DETECTION_CACHE_DIR, DETECTION_CACHE_CHUNK,
+    PLAYER_DETECTION_MODEL_ID, FIELD_DETECTION_MODEL_ID,
+    INFERENCE_BACKEND, ONNX_INT8,
+)
+from utils.frame_store import FrameStoreWriter, load_store_meta, iter_frame_store
+
+
+def cache_dir_for(source_video: str) -> str:
+    """
+    Cache directory for a video, keyed by name, size and mtime so a replaced
+    upload never reuses stale detections.
+    """
+    stat = os.stat(source_video)
+    key = f"{os.path.abspath(source_video)}:{stat.st_size}:{int(stat.st_mtime)}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(source_video))[0]
+    return os.path.join(DETECTION_CACHE_DIR, f"{stem}-{digest}")
+
+
+def _models_key() -> dict:
+    # the ONNX backend (and its INT8 variant) gives slightly different boxes
+    backend = INFERENCE_BACKEND + ("-int8" if INFERENCE_BACKEND == "onnx" and ONNX_INT8 else "")
+    return {
+        "player_model": PLAYER_DETECTION_MODEL_ID,
+        "field_model": FIELD_DETECTION_MODEL_ID,
+        "backend": backend,
+    }
+
+
+class DetectionCacheWriter:
+    """
+    Stores the raw detector outputs of every frame -- all boxes with
+    confidence, class id and team id, and every field keypoint with its
+    confidence -- in compressed chunks of DETECTION_CACHE_CHUNK frames
+    (see utils/frame_store.py). `ball_roi` records that the ball boxes of the
+    ball ROI stage are included; `shot_filter`, the shot filter settings
+    (utils/shot_filter.py) under which off-pitch frames were left empty.
+    """
+
+    def __init__(self, cache_dir: str, confidence_floor: float, has_teams: bool,
+                 ball_roi: bool = False, shot_filter: dict = None,
+                 chunk_size: int = DETECTION_CACHE_CHUNK):
+        self.confidence_floor = confidence_floor
+        self.has_teams = has_teams
+        self.ball_roi = ball_roi
+        self.shot_filter = shot_filter
+        self.store = FrameStoreWriter(cache_dir, chunk_size=chunk_size)
+
+    def add(self, detections: sv.Detections, team_id: np.ndarray,
+            kp_xy: np.ndarray, kp_conf: np.ndarray):
+        self.store.add(
+            xyxy=detections.xyxy.astype(np.float32).reshape(-1, 4),
+            confidence=detections.confidence.astype(np.float32),
+            class_id=detections.class_id.astype(np.int8),
+            team_id=np.asarray(team_id, dtype=np.int8),
+            kp_xy=kp_xy.astype(np.float32),
+            kp_conf=kp_conf.astype(np.float32),
+        )
+
+    def close(self, complete: bool = True):
+        self.store.close(
+            complete=complete,
+            confidence_floor=self.confidence_floor,
+            has_teams=self.has_teams,
+            ball_roi=self.ball_roi,
+            shot_filter=self.shot_filter,
+            **_models_key(),
+        )
+
+
+def load_cache_meta(cache_dir: str):
+    """
+    Return the cache's meta.json if it is complete and was written by the
+    current models and layout, else None.
+    """
+    meta = load_store_meta(cache_dir)
+    if meta is None:
+        return None
+    if any(meta.get(k) != v for k, v in _models_key().items()):
+        return None
+    return meta
+
+
+def iter_cached_detections(cache_dir: str, start: int = 0, end: int = None):
+    """
+    Yield (detections, kp_xy, kp_conf) per frame in [start, end) from a
+    complete cache. detections.data["team_id"] holds the team of player
+    boxes (-1 otherwise).
+    """
+    for frame in iter_frame_store(cache_dir, start=start, end=end):
+        detections = sv.Detections(
+            xyxy=frame["xyxy"],
+            confidence=frame["confidence"],
+            class_id=frame["class_id"].astype(int),
+            data={"team_id": frame["team_id"].astype(int)},
+        )
+        yield detections, frame["kp_xy"], frame["kp_conf"]
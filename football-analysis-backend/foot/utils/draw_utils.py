@@ -2,25 +2,44 @@
 
 import supervision as sv
 
+# Colours of team 0, team 1 and referees (indexed by class_id after team
+# assignment), and of the ball. Overridable per render through `style`.
+DEFAULT_STYLE = {
+    "palette": ['#00BFFF', '#FF1493', '#FFD700'],
+    "ball_color": '#FFD700',
+    "radar_ball_color": '#FFFFFF',
+    "path_color": '#FFFFFF',
+    "labels": True,
+}
 
-def create_ellipse_annotator():
+
+def resolve_style(style: dict = None) -> dict:
+    """
+    Fill in missing keys of a user-provided style from DEFAULT_STYLE.
+    """
+    resolved = dict(DEFAULT_STYLE)
+    resolved.update({k: v for k, v in (style or {}).items() if k in DEFAULT_STYLE})
+    return resolved
+
+
+def create_ellipse_annotator(palette=None):
     return sv.EllipseAnnotator(
-        color=sv.ColorPalette.from_hex(['#00BFFF', '#FF1493', '#FFD700']),
+        color=sv.ColorPalette.from_hex(palette or DEFAULT_STYLE["palette"]),
         thickness=2
     )
 
 
-def create_label_annotator():
+def create_label_annotator(palette=None):
     return sv.LabelAnnotator(
-        color=sv.ColorPalette.from_hex(['#00BFFF', '#FF1493', '#FFD700']),
+        color=sv.ColorPalette.from_hex(palette or DEFAULT_STYLE["palette"]),
         text_color=sv.Color.from_hex('#000000'),
         text_position=sv.Position.BOTTOM_CENTER
     )
 
 
-def create_triangle_annotator(base: int = 20, height: int = 17):
+def create_triangle_annotator(base: int = 20, height: int = 17, color: str = None):
     return sv.TriangleAnnotator(
-        color=sv.Color.from_hex('#FFD700'),
+        color=sv.Color.from_hex(color or DEFAULT_STYLE["ball_color"]),
         base=base,
         height=height
-    )
\ No newline at end of file
+    )
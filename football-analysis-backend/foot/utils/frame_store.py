@@ -0,0 +1,126 @@
+# utils/frame_store.py
+
+import os
+import json
+import shutil
+
+import numpy as np
+
+# Bump when the chunk layout changes so old stores are ignored.
+STORE_VERSION = 1
+
+
+class FrameStoreWriter:
+    """
+    Append-only store of per-frame numpy arrays, written as compressed chunks
+    of `chunk_size` frames. Every field is ragged along its first axis (one
+    frame may have 3 boxes, the next 25), kept as one concatenated array plus
+    offsets per chunk.
+
+    Chunks go to a private partial directory that replaces `directory` only
+    once `close(complete=True)` wrote meta.json, so an interrupted or
+    concurrent run never leaves a half-written store behind.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 256):
+        self.final_dir = directory
+        self.directory = f"{directory}.partial-{os.getpid()}-{id(self)}"
+        self.chunk_size = chunk_size
+        self.num_frames = 0
+        self.num_chunks = 0
+        self._chunk = {}
+        self._chunk_frames = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def add(self, **arrays):
+        for name, array in arrays.items():
+            self._chunk.setdefault(name, []).append(np.asarray(array))
+        self._chunk_frames += 1
+        self.num_frames += 1
+        if self._chunk_frames == self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._chunk_frames:
+            return
+        payload = {}
+        for name, arrays in self._chunk.items():
+            counts = [len(a) for a in arrays]
+            payload[name] = np.concatenate(arrays)
+            payload[f"{name}__offsets"] = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        path = os.path.join(self.directory, f"chunk_{self.num_chunks:05d}.npz")
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **payload)
+        os.replace(tmp_path, path)
+        self.num_chunks += 1
+        self._chunk = {}
+        self._chunk_frames = 0
+
+    def rollback(self):
+        """
+        Delete chunks written after this writer's state was saved (a job
+        checkpoint pickles the writer right after a chunk was flushed), so
+        a resumed job appends to the partial store from that point.
+        """
+        for name in os.listdir(self.directory):
+            if name.startswith("chunk_") and int(name[6:11]) >= self.num_chunks:
+                os.remove(os.path.join(self.directory, name))
+
+    def close(self, complete: bool = True, **meta):
+        """
+        Finish the store; extra keyword arguments are saved in meta.json.
+        """
+        self._flush()
+        if not complete:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return
+        meta.update(
+            version=STORE_VERSION,
+            num_frames=self.num_frames,
+            num_chunks=self.num_chunks,
+            chunk_size=self.chunk_size,
+        )
+        with open(os.path.join(self.directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        shutil.rmtree(self.final_dir, ignore_errors=True)
+        os.replace(self.directory, self.final_dir)
+
+
+def load_store_meta(directory: str):
+    """
+    Return meta.json of a complete store, or None.
+    """
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != STORE_VERSION:
+        return None
+    return meta
+
+
+def iter_frame_store(directory: str, start: int = 0, end: int = None):
+    """
+    Yield one {field: array} dict per stored frame in [start, end).
+    Chunks entirely before `start` are not even opened.
+    """
+    meta = load_store_meta(directory)
+    if meta is None:
+        raise RuntimeError(f"No complete frame store in {directory}")
+    end = meta["num_frames"] if end is None else min(end, meta["num_frames"])
+    chunk_size = meta["chunk_size"]
+    for chunk in range(start // chunk_size, meta["num_chunks"]):
+        first = chunk * chunk_size
+        if first >= end:
+            break
+        with np.load(os.path.join(directory, f"chunk_{chunk:05d}.npz")) as data:
+            arrays = {k: data[k] for k in data.files}
+        fields = [k for k in arrays if not k.endswith("__offsets")]
+        num = len(arrays[f"{fields[0]}__offsets"]) - 1 if fields else 0
+        for i in range(max(start - first, 0), min(num, end - first)):
+            frame = {}
+            for name in fields:
+                offsets = arrays[f"{name}__offsets"]
+                frame[name] = arrays[name][offsets[i]:offsets[i + 1]]
+            yield frame
@@ -0,0 +1,226 @@
+# utils/heatmaps.py
+
+import os
+
+import numpy as np
+
+from config import CONFIG, FPS, HEATMAP_CELL, HEATMAP_COMPACT_EVERY, PASS_MIN_HOLD
+from utils.match_metrics import ball_owner
+
+_TEAMS = 2
+
+
+def grid_shape():
+    """(cells along the pitch length, cells along its width)"""
+    return (int(np.ceil(CONFIG.length / HEATMAP_CELL)), int(np.ceil(CONFIG.width / HEATMAP_CELL)))
+
+
+class MatchHeatmaps:
+    """
+    Occupancy heatmaps per team and per tracker id, and a pass network,
+    accumulated frame by frame from the pitch coordinates of
+    `postprocess_frame`.
+
+    - heatmaps: positions are binned into HEATMAP_CELL-sized cells of the
+      CONFIG pitch, with one np.add.at call per frame for the teams; per
+      tracker id only the (id, cell) pairs visited are counted, merged
+      every HEATMAP_COMPACT_EVERY positions, so memory (and checkpoints)
+      do not grow with the number of ids a match goes through
+    - passes: the ball owner (see match_metrics.ball_owner) must keep the
+      ball for PASS_MIN_HOLD frames; a change of owner within a team counts
+      as a pass between the two tracker ids
+
+    Used like a renderer (write/close); close() saves everything to one
+    compressed npz that `load_heatmaps` reads back.
+    """
+
+    needs_teams = True
+
+    def __init__(self, output_path=None, fps=FPS):
+        self.output_path = output_path
+        self.fps = fps
+        self.shape = grid_shape()
+        self.team_grid = np.zeros((_TEAMS,) + self.shape, dtype=np.uint32)
+        # per tracker id, sparse: ids come and go over a match, and most of
+        # a player's cells stay empty
+        self.player_team = {}            # tracker id -> last team seen
+        self._rows = {}                  # tracker id -> row of its cell keys
+        self._keys = np.empty(0, dtype=np.int64)      # row * cells + cell, unique
+        self._counts = np.empty(0, dtype=np.uint32)
+        self._pending = []               # keys of the frames since the last _compact
+        self._pending_size = 0
+        self.passes = {}                 # (from_id, to_id) -> count
+
+        self.owner = -1                  # tracker id holding the ball
+        self.candidate = -1
+        self.candidate_frames = 0
+        self.candidate_team = -1
+        self.owner_team = -1
+
+    def _compact(self):
+        if not self._pending:
+            return
+        keys = np.concatenate([self._keys] + self._pending)
+        counts = np.concatenate([self._counts, np.ones(self._pending_size, dtype=np.uint32)])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        self._counts = np.bincount(inverse, weights=counts, minlength=len(self._keys)).astype(np.uint32)
+        self._pending, self._pending_size = [], 0
+
+    def _cells(self, xy):
+        gx = np.clip((xy[:, 0] // HEATMAP_CELL).astype(int), 0, self.shape[0] - 1)
+        gy = np.clip((xy[:, 1] // HEATMAP_CELL).astype(int), 0, self.shape[1] - 1)
+        return gx, gy
+
+    def _track_owner(self, tracker_id, team):
+        if tracker_id != self.candidate:
+            self.candidate, self.candidate_team, self.candidate_frames = tracker_id, team, 0
+        self.candidate_frames += 1
+        if self.candidate_frames < PASS_MIN_HOLD or tracker_id == self.owner:
+            return
+        if self.owner >= 0 and team == self.owner_team:
+            key = (self.owner, tracker_id)
+            self.passes[key] = self.passes.get(key, 0) + 1
+        self.owner, self.owner_team = tracker_id, team
+
+    def update(self, analysis):
+        pitch = analysis["pitch"]
+        if pitch is None:
+            return
+        players, goalkeepers = analysis["players"], analysis["goalkeepers"]
+        if not len(players) and not len(goalkeepers):
+            return
+
+        ids = np.concatenate([
+            np.asarray(d.tracker_id if len(d) else [], dtype=int) for d in (players, goalkeepers)
+        ])
+        team = np.concatenate([
+            np.asarray(d.class_id if len(d) else [], dtype=int) for d in (players, goalkeepers)
+        ])
+        xy = np.concatenate([pitch["players"], pitch["goalkeepers"]]).astype(float)
+        gx, gy = self._cells(xy)
+
+        rows = np.array([self._rows.setdefault(tid, len(self._rows)) for tid in ids.tolist()], dtype=np.int64)
+        self._pending.append((rows * self.shape[0] + gx) * self.shape[1] + gy)
+        self._pending_size += len(rows)
+        if self._pending_size >= HEATMAP_COMPACT_EVERY:
+            self._compact()
+        self.player_team.update(zip(ids.tolist(), team.tolist()))
+        in_team = (team >= 0) & (team < _TEAMS)
+        np.add.at(self.team_grid, (team[in_team], gx[in_team], gy[in_team]), 1)
+
+        owner = ball_owner(xy, pitch["ball"])
+        if owner >= 0:
+            self._track_owner(int(ids[owner]), int(team[owner]))
+
+    # renderer interface (see frame_analysis.run_analysis)
+    def write(self, frame, analysis):
+        self.update(analysis)
+
+    def close(self):
+        if not self.output_path:
+            return
+        self._compact()
+        seen = np.array(sorted(self._rows), dtype=np.int32)
+        rank = np.empty(len(seen), dtype=np.int64)          # row -> index in seen
+        rank[np.array([self._rows[tid] for tid in seen.tolist()], dtype=np.int64)] = np.arange(len(seen))
+        cells = self.shape[0] * self.shape[1]
+        player_grid = np.zeros((len(seen), cells), dtype=np.uint32)
+        player_grid[rank[self._keys // cells], self._keys % cells] = self._counts
+        edges = np.array([(a, b, n) for (a, b), n in self.passes.items()], dtype=np.int32).reshape(-1, 3)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        tmp = self.output_path + ".tmp.npz"
+        np.savez_compressed(
+            tmp,
+            cell=np.array(HEATMAP_CELL),
+            fps=np.array(self.fps),
+            team_grid=self.team_grid,
+            player_ids=seen,
+            player_grid=player_grid.reshape((len(seen),) + self.shape),
+            player_team=np.array([self.player_team[tid] for tid in seen.tolist()], dtype=np.int8).reshape(-1),
+            pass_edges=edges,
+        )
+        os.replace(tmp, self.output_path)
+        print(f"🔥 Heatmaps saved at: {self.output_path}")
+
+
+def load_heatmaps(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def heatmap_grid(data, team=None, player=None):
+    """
+    The (length cells, width cells) occupancy grid of one team or one
+    tracker id, or None if there is none.
+    """
+    if player is not None:
+        match = np.flatnonzero(data["player_ids"] == player)
+        return data["player_grid"][match[0]] if len(match) else None
+    if team is not None and 0 <= team < len(data["team_grid"]):
+        return data["team_grid"][team]
+    return None
+
+
+def pass_network(data) -> dict:
+    """
+    JSON-ready pass network: nodes are tracker ids with their team, average
+    position (m) and pass counts; edges are (from, to, count).
+    """
+    cell_m = float(data["cell"]) / 100.0
+    gx, gy = np.meshgrid(
+        (np.arange(data["player_grid"].shape[1]) + 0.5) * cell_m,
+        (np.arange(data["player_grid"].shape[2]) + 0.5) * cell_m,
+        indexing="ij",
+    )
+    edges = data["pass_edges"]
+    made = {}
+    received = {}
+    for a, b, n in edges:
+        made[int(a)] = made.get(int(a), 0) + int(n)
+        received[int(b)] = received.get(int(b), 0) + int(n)
+
+    nodes = []
+    for tid, grid, team in zip(data["player_ids"], data["player_grid"], data["player_team"]):
+        total = grid.sum()
+        tid = int(tid)
+        nodes.append({
+            "tracker_id": tid,
+            "team": int(team),
+            "avg_position_m": [round(float((grid * gx).sum() / total), 1),
+                               round(float((grid * gy).sum() / total), 1)],
+            "seconds": round(float(total) / float(data["fps"]), 1),
+            "passes_made": made.get(tid, 0),
+            "passes_received": received.get(tid, 0),
+        })
+    return {
+        "nodes": nodes,
+        "edges": [{"from": int(a), "to": int(b), "count": int(n)} for a, b, n in edges],
+    }
+
+
+def render_heatmap(grid, output_path, scale=0.1, padding=50):
+    """
+    Draw an occupancy grid over the pitch and save it as an image.
+    """
+    import cv2
+    from sports.annotators.soccer import draw_pitch
+
+    pitch = draw_pitch(CONFIG, scale=scale, padding=padding)
+    height = int(CONFIG.width * scale)
+    width = int(CONFIG.length * scale)
+
+    density = grid.T.astype(np.float32)                  # rows along the pitch width
+    density = cv2.GaussianBlur(density, (0, 0), sigmaX=1.5)
+    if density.max() > 0:
+        density /= density.max()
+    density = cv2.resize(density, (width, height), interpolation=cv2.INTER_LINEAR)
+    colored = cv2.applyColorMap((density * 255).astype(np.uint8), cv2.COLORMAP_JET)
+
+    area = pitch[padding:padding + height, padding:padding + width]
+    alpha = (np.clip(density * 1.5, 0, 1) * 0.7)[..., None]
+    pitch[padding:padding + height, padding:padding + width] = (
+        area * (1 - alpha) + colored * alpha
+    ).astype(np.uint8)
+
+    cv2.imwrite(output_path, pitch)
+    return output_path
@@ -0,0 +1,75 @@
+# utils/job_control.py
+
+import os
+import pickle
+import shutil
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a pipeline when its job was cancelled. With `preempted`
+    the job's checkpoint is kept so it can be resumed later.
+    """
+
+    def __init__(self, preempted: bool = False):
+        super().__init__("preempted" if preempted else "cancelled")
+        self.preempted = preempted
+
+    def __reduce__(self):
+        # keep `preempted` across processes (re-render pool)
+        return JobCancelled, (self.preempted,)
+
+
+class JobControl:
+    """
+    Per-job control directory shared by the web process and the worker:
+
+    - cancel: written by the web process (analysis_service.cancel_job),
+      containing "cancel" or "preempt"; the pipeline polls it with
+      `check()` and stops at the next frame
+    - checkpoint.pkl: pipeline state saved every few chunks, so a restarted
+      job resumes instead of starting over
+    """
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        self.cancel_file = os.path.join(job_dir, "cancel")
+        self.checkpoint_file = os.path.join(job_dir, "checkpoint.pkl")
+        os.makedirs(job_dir, exist_ok=True)
+
+    def check(self):
+        """
+        Raise JobCancelled if the job was cancelled or preempted. Called once
+        per frame: a single stat() of a file that normally does not exist.
+        """
+        if not os.path.exists(self.cancel_file):
+            return
+        try:
+            with open(self.cancel_file) as f:
+                preempted = f.read().strip() == "preempt"
+        except OSError:
+            preempted = False
+        raise JobCancelled(preempted)
+
+    def save_checkpoint(self, state: dict):
+        tmp = self.checkpoint_file + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.checkpoint_file)
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+
+    def clear(self):
+        """
+        Remove the control directory once the job has ended for good.
+        """
+        shutil.rmtree(self.job_dir, ignore_errors=True)
+
+
+def has_checkpoint(job_dir: str) -> bool:
+    return os.path.exists(os.path.join(job_dir, "checkpoint.pkl"))
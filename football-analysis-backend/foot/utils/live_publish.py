@@ -0,0 +1,78 @@
+# utils/live_publish.py
+
+import os
+import json
+
+import cv2
+import numpy as np
+
+from config import FPS, LIVE_JPEG_QUALITY
+from utils.video_utils import LazyVideoWriter
+
+
+def _write_atomic(path, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class LiveFrameWriter:
+    """
+    Stands in for a renderer's video writer in live mode: every frame
+    replaces <live_dir>/<kind>.jpg (what /live/<job>/<kind>.mjpg streams)
+    and is optionally recorded to a video file as well.
+    """
+
+    def __init__(self, live_dir: str, kind: str, record_path=None, fps: float = FPS):
+        self.jpeg_path = os.path.join(live_dir, f"{kind}.jpg")
+        self.recorder = LazyVideoWriter(record_path, fps=fps) if record_path else None
+
+    def write(self, frame):
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, LIVE_JPEG_QUALITY])
+        if ok:
+            _write_atomic(self.jpeg_path, jpeg.tobytes())
+        if self.recorder is not None:
+            self.recorder.write(frame)
+
+    def release(self) -> bool:
+        return self.recorder.release() if self.recorder is not None else False
+
+
+def _rows(detections, xy):
+    if not len(detections):
+        return []
+    return [
+        [int(tid), int(cls), round(float(x)), round(float(y))]
+        for tid, cls, (x, y) in zip(detections.tracker_id, detections.class_id, xy)
+    ]
+
+
+class LiveTrackPublisher:
+    """
+    Appends one JSON line per analysed frame to <live_dir>/tracks.jsonl:
+    {"frame", "t", "ball": [x, y] | null, "players"/"goalkeepers"/"referees":
+    [[tracker_id, team, x, y], ...]} in pitch coordinates (cm), and keeps
+    <live_dir>/status.json up to date.
+    """
+
+    def __init__(self, live_dir: str):
+        os.makedirs(live_dir, exist_ok=True)
+        self.live_dir = live_dir
+        self.tracks = open(os.path.join(live_dir, "tracks.jsonl"), "a", buffering=1)
+
+    def publish(self, frame_index: int, timestamp: float, analysis: dict):
+        pitch = analysis["pitch"]
+        record = {"frame": frame_index, "t": round(timestamp, 3), "ball": None}
+        if pitch is not None:
+            if len(pitch["ball"]):
+                record["ball"] = [round(float(v)) for v in np.asarray(pitch["ball"])[0]]
+            for key in ("players", "goalkeepers", "referees"):
+                record[key] = _rows(analysis[key], pitch[key])
+        self.tracks.write(json.dumps(record) + "\n")
+
+    def status(self, **fields):
+        _write_atomic(os.path.join(self.live_dir, "status.json"), json.dumps(fields).encode())
+
+    def close(self):
+        self.tracks.close()
@@ -0,0 +1,78 @@
+# utils/live_source.py
+
+import os
+import time
+import threading
+
+import cv2
+
+from config import FPS
+
+
+class LiveFrameSource:
+    """
+    Reads a stream (any URL OpenCV can open) on a background thread and
+    keeps only the newest frame: a consumer that falls behind gets the
+    latest frame instead of a growing queue, and the frames it missed are
+    counted in `dropped`.
+
+    A local file is played back at its own frame rate as a stand-in for a
+    live feed (realtime=None picks this automatically for files).
+    """
+
+    def __init__(self, source: str, realtime=None):
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open stream: {source}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or FPS
+        self.realtime = os.path.isfile(source) if realtime is None else realtime
+
+        self.dropped = 0
+        self.ended = False
+        self._latest = None          # (frame index, capture time, frame)
+        self._consumed = True
+        self._stop = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        started = time.monotonic()
+        index = 0
+        while not self._stop:
+            ok, frame = self.cap.read()
+            if not ok:
+                break
+            if self.realtime:
+                delay = started + index / self.fps - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with self._cond:
+                if not self._consumed:
+                    self.dropped += 1
+                self._latest = (index, time.monotonic(), frame)
+                self._consumed = False
+                self._cond.notify()
+            index += 1
+        with self._cond:
+            self.ended = True
+            self._cond.notify()
+
+    def read(self, timeout: float = 10.0):
+        """
+        Wait for a frame newer than the last one returned; returns
+        (index, capture time on time.monotonic(), frame), or None once the
+        stream has ended or stalled for `timeout` seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: not self._consumed or self.ended, timeout):
+                return None
+            if self._consumed:
+                return None
+            self._consumed = True
+            return self._latest
+
+    def close(self):
+        self._stop = True
+        self._thread.join(timeout=5)
+        self.cap.release()
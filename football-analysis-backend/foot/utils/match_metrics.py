@@ -0,0 +1,204 @@
+# utils/match_metrics.py
+
+import json
+import os
+
+import numpy as np
+
+from config import (
+    FPS,
+    METRICS_SPEED_SMOOTHING,
+    METRICS_MAX_SPEED,
+    METRICS_SPRINT_SPEED,
+    METRICS_MAX_GAP,
+    POSSESSION_RADIUS,
+)
+
+_CM_PER_M = 100.0
+_TEAMS = 2
+
+
+def ball_owner(xy, ball_xy):
+    """
+    Index of the player in possession -- the nearest one within
+    POSSESSION_RADIUS of the ball -- or -1. xy and ball_xy are pitch
+    coordinates (cm).
+    """
+    if not len(xy) or not len(ball_xy):
+        return -1
+    dist = np.linalg.norm(np.asarray(xy, dtype=float) - ball_xy[0], axis=1)
+    nearest = int(np.argmin(dist))
+    return nearest if dist[nearest] <= POSSESSION_RADIUS else -1
+
+
+class MatchMetrics:
+    """
+    Streaming physical metrics from the per-frame results of
+    `postprocess_frame`: distance covered, top speed and sprints per tracker
+    id, team centroid and width, and ball possession.
+
+    Per-player state lives in arrays indexed by tracker id, so each frame is
+    a handful of NumPy operations over all players at once. Used like a
+    renderer (write/close); close() saves the summary as JSON.
+    """
+
+    needs_teams = True
+
+    def __init__(self, summary_path=None, fps=FPS):
+        self.summary_path = summary_path
+        self.fps = fps
+        self.frame_index = -1
+
+        size = 64
+        self.distance = np.zeros(size)              # metres
+        self.speed = np.zeros(size)                 # smoothed, m/s
+        self.top_speed = np.zeros(size)
+        self.sprints = np.zeros(size, dtype=int)
+        self.sprinting = np.zeros(size, dtype=bool)
+        self.frames = np.zeros(size, dtype=int)
+        self.possession_frames = np.zeros(size, dtype=int)
+        self.team = np.full(size, -1, dtype=int)
+        self.last_xy = np.zeros((size, 2))
+        self.last_frame = np.full(size, -1, dtype=int)
+
+        self.team_frames = np.zeros(_TEAMS, dtype=int)
+        self.team_centroid_sum = np.zeros((_TEAMS, 2))
+        self.team_width_sum = np.zeros(_TEAMS)
+        self.team_possession = np.zeros(_TEAMS, dtype=int)
+        self.ball_frames = 0
+
+    def _grow(self, max_id):
+        size = len(self.distance)
+        if max_id < size:
+            return
+        new_size = max(size * 2, max_id + 1)
+        for name in ("distance", "speed", "top_speed", "sprints", "sprinting",
+                     "frames", "possession_frames"):
+            old = getattr(self, name)
+            grown = np.zeros(new_size, dtype=old.dtype)
+            grown[:size] = old
+            setattr(self, name, grown)
+        self.team = np.concatenate([self.team, np.full(new_size - size, -1, dtype=int)])
+        self.last_frame = np.concatenate([self.last_frame, np.full(new_size - size, -1, dtype=int)])
+        self.last_xy = np.concatenate([self.last_xy, np.zeros((new_size - size, 2))])
+
+    def update(self, analysis):
+        self.frame_index += 1
+        pitch = analysis["pitch"]
+        if pitch is None:
+            return
+
+        players, goalkeepers = analysis["players"], analysis["goalkeepers"]
+        if not len(players) and not len(goalkeepers):
+            return
+        ids = np.concatenate([
+            np.asarray(d.tracker_id if len(d) else [], dtype=int) for d in (players, goalkeepers)
+        ])
+        team = np.concatenate([
+            np.asarray(d.class_id if len(d) else [], dtype=int) for d in (players, goalkeepers)
+        ])
+        xy = np.concatenate([pitch["players"], pitch["goalkeepers"]]).astype(float) / _CM_PER_M
+        self._grow(int(ids.max()))
+
+        # ------- distance, speed, sprints -------
+        gap = self.frame_index - self.last_frame[ids]
+        seen = (self.last_frame[ids] >= 0) & (gap <= METRICS_MAX_GAP)
+        step = np.linalg.norm(xy - self.last_xy[ids], axis=1)
+        speed = np.where(seen, step * self.fps / np.maximum(gap, 1), 0.0)
+        valid = seen & (speed <= METRICS_MAX_SPEED)   # reject projection glitches
+
+        smoothed = np.where(
+            valid,
+            METRICS_SPEED_SMOOTHING * speed + (1 - METRICS_SPEED_SMOOTHING) * self.speed[ids],
+            self.speed[ids],
+        )
+        sprinting = smoothed >= METRICS_SPRINT_SPEED
+
+        self.distance[ids] += np.where(valid, step, 0.0)
+        self.speed[ids] = smoothed
+        self.top_speed[ids] = np.maximum(self.top_speed[ids], smoothed)
+        self.sprints[ids] += sprinting & ~self.sprinting[ids]
+        self.sprinting[ids] = sprinting
+        self.frames[ids] += 1
+        self.team[ids] = team
+        self.last_xy[ids] = xy
+        self.last_frame[ids] = self.frame_index
+
+        # ------- team shape (outfield players only) -------
+        n_players = len(players)
+        if n_players:
+            p_team, p_xy = team[:n_players], xy[:n_players]
+            in_team = (p_team >= 0) & (p_team < _TEAMS)
+            p_team, p_xy = p_team[in_team], p_xy[in_team]
+            counts = np.bincount(p_team, minlength=_TEAMS)
+            present = counts > 0
+            sums = np.stack([
+                np.bincount(p_team, weights=p_xy[:, 0], minlength=_TEAMS),
+                np.bincount(p_team, weights=p_xy[:, 1], minlength=_TEAMS),
+            ], axis=1)
+            y_max = np.full(_TEAMS, -np.inf)
+            y_min = np.full(_TEAMS, np.inf)
+            np.maximum.at(y_max, p_team, p_xy[:, 1])
+            np.minimum.at(y_min, p_team, p_xy[:, 1])
+
+            self.team_frames += present
+            self.team_centroid_sum[present] += sums[present] / counts[present, None]
+            self.team_width_sum[present] += (y_max - y_min)[present]
+
+        # ------- possession: nearest player to the ball -------
+        ball_xy = pitch["ball"]
+        if len(ball_xy):
+            self.ball_frames += 1
+            owner = ball_owner(xy * _CM_PER_M, ball_xy)
+            if owner >= 0 and 0 <= team[owner] < _TEAMS:
+                self.possession_frames[ids[owner]] += 1
+                self.team_possession[team[owner]] += 1
+
+    def summary(self) -> dict:
+        tracked = np.flatnonzero(self.frames >= self.fps)   # seen for at least a second
+        players = [
+            {
+                "tracker_id": int(tid),
+                "team": int(self.team[tid]),
+                "distance_m": round(float(self.distance[tid]), 1),
+                "top_speed_kmh": round(float(self.top_speed[tid]) * 3.6, 1),
+                "sprints": int(self.sprints[tid]),
+                "possession_s": round(self.possession_frames[tid] / self.fps, 1),
+                "seconds_tracked": round(self.frames[tid] / self.fps, 1),
+            }
+            for tid in tracked
+        ]
+        players.sort(key=lambda p: p["distance_m"], reverse=True)
+
+        owned = int(self.team_possession.sum())
+        teams = {}
+        for t in range(_TEAMS):
+            n = max(int(self.team_frames[t]), 1)
+            teams[str(t)] = {
+                "possession_pct": round(100.0 * self.team_possession[t] / owned, 1) if owned else None,
+                "avg_centroid_m": [round(float(v) / n, 1) for v in self.team_centroid_sum[t]],
+                "avg_width_m": round(float(self.team_width_sum[t]) / n, 1),
+                "distance_m": round(float(self.distance[tracked][self.team[tracked] == t].sum()), 1),
+            }
+
+        return {
+            "fps": self.fps,
+            "frames": self.frame_index + 1,
+            "ball_visible_frames": self.ball_frames,
+            "players": players,
+            "teams": teams,
+        }
+
+    # renderer interface (see frame_analysis.run_analysis)
+    def write(self, frame, analysis):
+        self.update(analysis)
+
+    def close(self):
+        if not self.summary_path:
+            return
+        os.makedirs(os.path.dirname(self.summary_path) or ".", exist_ok=True)
+        tmp = self.summary_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.summary(), f)
+        os.replace(tmp, self.summary_path)
+        print(f"📊 Match metrics saved at: {self.summary_path}")
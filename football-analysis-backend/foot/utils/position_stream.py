@@ -0,0 +1,196 @@
+# utils/position_stream.py
+
+import json
+import os
+
+import numpy as np
+
+from config import CONFIG, FPS, POSITION_STREAM_CHUNK, POSITION_STREAM_UNIT
+from utils.draw_utils import resolve_style
+
+FORMAT_VERSION = 1
+FLAG_PITCH, FLAG_BALL = 1, 2
+# entity kinds, as in utils/track_store.py
+_KINDS = (("players", 0), ("goalkeepers", 1), ("referees", 2))
+
+
+def _varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(out: bytearray, value: int):
+    _varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+
+class PositionStreamWriter:
+    """
+    Per-frame pitch positions for drawing the radar in the browser instead
+    of rendering it into the video: a few bytes per player per frame
+    instead of a second video stream. Used like a renderer (write/close).
+
+    output_dir gets meta.json and one `<n>.bin` per POSITION_STREAM_CHUNK
+    frames; every chunk decodes on its own, so the frontend fetches only
+    the chunks around the playback position. Frame numbers count from the
+    first frame of the output video. Chunk layout (unsigned LEB128 varints,
+    zigzag for signed values, positions in POSITION_STREAM_UNIT cm):
+
+        first frame, frame count
+        per frame:
+            flags (1 = pitch positions, 2 = ball)
+            [ball] dx, dy from the previous ball of the chunk
+            [pitch] entity count, then per entity, by ascending tracker id:
+                tracker id - previous id of the frame
+                kind * 4 + team + 1 (kind 0 player, 1 goalkeeper, 2 referee;
+                    team -1 unknown, 2 referee)
+                dx, dy from this tracker's previous position in the chunk
+
+    Deltas start from 0 at each chunk.
+    """
+
+    needs_teams = True
+
+    def __init__(self, output_dir, fps=FPS, chunk_frames=POSITION_STREAM_CHUNK,
+                 unit=POSITION_STREAM_UNIT, style=None):
+        self.output_dir = output_dir
+        self.fps = fps
+        self.chunk_frames = chunk_frames
+        self.unit = unit
+        self.style = resolve_style(style)
+        os.makedirs(output_dir, exist_ok=True)
+        self.frames = 0
+        self.chunks = 0
+        self._new_chunk()
+
+    def _new_chunk(self):
+        self._body = bytearray()
+        self._chunk_start = self.frames
+        self._last_ball = (0, 0)
+        self._last_xy = {}
+
+    def _units(self, xy):
+        return np.rint(np.asarray(xy, dtype=float).reshape(-1, 2) / self.unit)
+
+    def write(self, frame, analysis):
+        pitch = analysis["pitch"]
+        body = self._body
+        ball = self._units(pitch["ball"]) if pitch is not None else np.empty((0, 2))
+        ball = ball[np.isfinite(ball).all(axis=1)]
+        flags = (FLAG_PITCH if pitch is not None else 0) | (FLAG_BALL if len(ball) else 0)
+        _varint(body, flags)
+        if len(ball):
+            x, y = int(ball[0, 0]), int(ball[0, 1])
+            _zigzag(body, x - self._last_ball[0])
+            _zigzag(body, y - self._last_ball[1])
+            self._last_ball = (x, y)
+
+        if pitch is not None:
+            entities = []
+            for key, kind in _KINDS:
+                det = analysis[key]
+                if not len(det) or det.tracker_id is None:
+                    continue
+                xy = self._units(pitch[key])
+                for tracker_id, team, (x, y) in zip(det.tracker_id, det.class_id, xy):
+                    if np.isfinite(x) and np.isfinite(y):
+                        entities.append((int(tracker_id), kind * 4 + int(team) + 1, int(x), int(y)))
+            entities.sort()
+            _varint(body, len(entities))
+            previous_id = 0
+            for tracker_id, code, x, y in entities:
+                last_x, last_y = self._last_xy.get(tracker_id, (0, 0))
+                _varint(body, tracker_id - previous_id)
+                body.append(code)
+                _zigzag(body, x - last_x)
+                _zigzag(body, y - last_y)
+                self._last_xy[tracker_id] = (x, y)
+                previous_id = tracker_id
+
+        self.frames += 1
+        if self.frames - self._chunk_start >= self.chunk_frames:
+            self._flush()
+
+    def _flush(self):
+        count = self.frames - self._chunk_start
+        if count:
+            header = bytearray()
+            _varint(header, self._chunk_start)
+            _varint(header, count)
+            path = os.path.join(self.output_dir, f"{self._chunk_start // self.chunk_frames}.bin")
+            with open(path + ".tmp", "wb") as f:
+                f.write(header + self._body)
+            os.replace(path + ".tmp", path)
+            self.chunks = self._chunk_start // self.chunk_frames + 1
+            self._write_meta(complete=False)
+        self._new_chunk()
+
+    def _write_meta(self, complete):
+        meta = {
+            "version": FORMAT_VERSION,
+            "fps": self.fps,
+            "frames": self.frames,
+            "chunk_frames": self.chunk_frames,
+            "chunks": self.chunks,
+            "unit_cm": self.unit,
+            "pitch": {"length": CONFIG.length, "width": CONFIG.width},
+            "palette": self.style["palette"],
+            "ball_color": self.style["radar_ball_color"],
+            "complete": complete,
+        }
+        tmp = os.path.join(self.output_dir, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.output_dir, "meta.json"))
+
+    def close(self):
+        self._flush()
+        self._write_meta(complete=True)
+        print(f"✅ Position stream: {self.frames} frames, {self.chunks} chunks in {self.output_dir}")
+
+
+def decode_chunk(data: bytes, unit: int = POSITION_STREAM_UNIT):
+    """
+    Inverse of the chunk encoding, for checks and tools: a list of
+    (frame, ball xy or None, [(tracker id, kind, team, x, y), ...] or None)
+    with positions in cm.
+    """
+    pos = 0
+
+    def varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                return value
+
+    def zigzag():
+        value = varint()
+        return (value >> 1) ^ -(value & 1)
+
+    first, count = varint(), varint()
+    frames, last_ball, last_xy = [], (0, 0), {}
+    for frame in range(first, first + count):
+        flags = varint()
+        ball = None
+        if flags & FLAG_BALL:
+            last_ball = (last_ball[0] + zigzag(), last_ball[1] + zigzag())
+            ball = (last_ball[0] * unit, last_ball[1] * unit)
+        entities = None
+        if flags & FLAG_PITCH:
+            entities, tracker_id = [], 0
+            for _ in range(varint()):
+                tracker_id += varint()
+                code = data[pos]
+                pos += 1
+                x, y = last_xy.get(tracker_id, (0, 0))
+                x, y = x + zigzag(), y + zigzag()
+                last_xy[tracker_id] = (x, y)
+                entities.append((tracker_id, code // 4, code % 4 - 1, x * unit, y * unit))
+        frames.append((frame, ball, entities))
+    return frames
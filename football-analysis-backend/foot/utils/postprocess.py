@@ -0,0 +1,102 @@
+# utils/postprocess.py
+"""
+Array-level steps of frame_analysis.postprocess_frame. Each frame's
+detections are routed with index arrays and sorts over one sv.Detections,
+instead of a boolean-mask copy per class and a merge:
+
+- split_raw: confidence filter and ball/other split, two selections
+- nms_keep: class-agnostic greedy NMS, the same result as
+  Detections.with_nms, solved as a fixed point over the IoU matrix
+  rather than a Python loop per box
+- route_tracked: one stable sort of the tracked detections into
+  players, goalkeepers and referees. `combined` is in the order
+  sv.Detections.merge([players, goalkeepers, referees]) gave; team ids,
+  goalkeeper teams and referee ids are set in one array, anchors are
+  computed once and the labels built from it.
+
+`python -m pipelines.postprocess_benchmark` checks the result against the
+previous per-class implementation and times both.
+"""
+
+import numpy as np
+import supervision as sv
+
+from config import BALL_ID, GOALKEEPER_ID, PLAYER_ID, REFEREE_ID
+from utils.resolve_goalkeepers import goalkeeper_teams
+
+# route of each tracked class; "combined" is ordered by it
+ROUTES = (PLAYER_ID, GOALKEEPER_ID, REFEREE_ID)
+
+
+def split_raw(detections: sv.Detections, confidence: float):
+    """
+    (ball, others): the detections at or above `confidence`, ball boxes
+    padded by 10 px.
+    """
+    confident = detections.confidence >= confidence
+    is_ball = detections.class_id == BALL_ID
+    ball = detections[np.flatnonzero(confident & is_ball)]
+    others = detections[np.flatnonzero(confident & ~is_ball)]
+    if len(ball):
+        ball.xyxy = sv.pad_boxes(ball.xyxy, 10)
+    return ball, others
+
+
+def nms_keep(xyxy: np.ndarray, confidence: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Boolean mask of the boxes class-agnostic greedy NMS keeps: a box goes if
+    a kept box of higher confidence overlaps it by IoU > threshold.
+
+    Same order as supervision's box_non_max_suppression (ties included). The
+    greedy result is the unique fixed point of keep = no kept suppressor;
+    iterating from all-kept settles at least one more box per pass and
+    usually stops after two or three.
+    """
+    n = len(xyxy)
+    if n < 2:
+        return np.ones(n, dtype=bool)
+    order = np.flip(confidence.argsort())
+    boxes = xyxy[order]
+    suppresses = np.triu(sv.box_iou_batch(boxes, boxes) > threshold, k=1)  # [i, j]: i beats j
+    keep = np.ones(n, dtype=bool)
+    for _ in range(n):
+        new_keep = ~(suppresses & keep[:, None]).any(axis=0)
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+    result = np.empty(n, dtype=bool)
+    result[order] = keep
+    return result
+
+
+def route_tracked(tracked: sv.Detections) -> dict:
+    """
+    Players, goalkeepers, referees and combined detections of a frame's
+    tracked detections, with their final class ids (team 0/1 for players
+    and goalkeepers, 2 for referees), the labels of combined, and the
+    bottom-centre anchors of each group (for the homography).
+    """
+    route = np.full(len(tracked), len(ROUTES))
+    for rank, class_id in enumerate(ROUTES):
+        route[tracked.class_id == class_id] = rank
+    counts = np.bincount(route, minlength=len(ROUTES) + 1)
+    order = np.argsort(route, kind="stable")[:len(tracked) - counts[-1]]
+    combined = tracked[order]
+    bounds = np.cumsum(counts[:len(ROUTES)])
+    players, goalkeepers, referees = (np.arange(start, end) for start, end in zip((0, *bounds[:-1]), bounds))
+
+    xy = combined.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
+    class_id = combined.class_id.copy()
+    if counts[0]:
+        class_id[players] = combined.data["team_id"][players]
+        if counts[1]:
+            class_id[goalkeepers] = goalkeeper_teams(xy[players], class_id[players], xy[goalkeepers])
+    class_id[referees] -= 1
+    combined.class_id = class_id.astype(int)
+
+    groups = {"players": players, "goalkeepers": goalkeepers, "referees": referees}
+    routed = {name: combined[rows] for name, rows in groups.items()}
+    routed["combined"] = combined
+    routed["labels"] = [f"#{tracker_id}" for tracker_id in combined.tracker_id.tolist()]
+    routed["anchors"] = {name: xy[rows] for name, rows in groups.items()}
+    return routed
@@ -4,6 +4,22 @@ import numpy as np
 import supervision as sv
 
 
+def goalkeeper_teams(players_xy: np.ndarray, players_team: np.ndarray, goalkeepers_xy: np.ndarray) -> np.ndarray:
+    """
+    Team (0 or 1) of each goalkeeper point: the team whose players' centroid
+    is closest. A team without players is never closest, unless neither has
+    any (then every goalkeeper gets team 1).
+    """
+    centroids = np.full((2, 2), np.nan)
+    for team in (0, 1):
+        mine = players_team == team
+        if np.any(mine):
+            centroids[team] = players_xy[mine].mean(axis=0)
+    distances = np.linalg.norm(goalkeepers_xy[:, None, :] - centroids[None], axis=2)
+    distances = np.nan_to_num(distances, nan=np.inf)
+    return np.where(distances[:, 0] < distances[:, 1], 0, 1)
+
+
 def resolve_goalkeepers_team_id(
     players: sv.Detections,
     goalkeepers: sv.Detections
@@ -14,17 +30,8 @@ def resolve_goalkeepers_team_id(
     if len(goalkeepers) == 0 or len(players) == 0:
         return np.array([], dtype=int)
 
-    goalkeepers_xy = goalkeepers.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
-    players_xy = players.get_anchors_coordinates(sv.Position.BOTTOM_CENTER)
-
-    # centroids for each team
-    team_0_centroid = players_xy[players.class_id == 0].mean(axis=0)
-    team_1_centroid = players_xy[players.class_id == 1].mean(axis=0)
-
-    goalkeepers_team_id = []
-    for goalkeeper_xy in goalkeepers_xy:
-        dist_0 = np.linalg.norm(goalkeeper_xy - team_0_centroid)
-        dist_1 = np.linalg.norm(goalkeeper_xy - team_1_centroid)
-        goalkeepers_team_id.append(0 if dist_0 < dist_1 else 1)
-
-    return np.array(goalkeepers_team_id)
\ No newline at end of file
+    return goalkeeper_teams(
+        players.get_anchors_coordinates(sv.Position.BOTTOM_CENTER),
+        players.class_id,
+        goalkeepers.get_anchors_coordinates(sv.Position.BOTTOM_CENTER),
+    )
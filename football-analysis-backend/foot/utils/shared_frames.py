@@ -0,0 +1,99 @@
+# utils/shared_frames.py
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+
+def _decode_into_ring(source_path, shm_name, shape, free_slots, ready_slots, start=0, end=None):
+    """
+    Decoder process: read frames with OpenCV and copy each one into a free
+    slot of the shared ring, then hand the slot index to the consumer.
+    Only slot indices go through the queues, never the pixels. A frame whose
+    shape differs from the first one is reported as an error message.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    cap = cv2.VideoCapture(source_path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    index = start
+    try:
+        while end is None or index < end:
+            index += 1
+            ok, frame = cap.read()
+            if not ok:
+                break
+            slot = free_slots.get()
+            if slot is None:  # consumer stopped early
+                break
+            if frame.shape != shape[1:]:
+                ready_slots.put(
+                    f"frame shape changed from {shape[1:]} to {frame.shape} in {source_path}"
+                )
+                break
+            ring[slot] = frame
+            ready_slots.put(slot)
+    finally:
+        cap.release()
+        ready_slots.put(None)
+        del ring
+        shm.close()
+
+
+def shared_frames_generator(source_path: str, slots: int = 8, start: int = 0, end: int = None):
+    """
+    Drop-in replacement for `sv.get_video_frames_generator` that decodes in a
+    separate process and passes frames through a shared-memory ring buffer,
+    so decoding runs on its own core without pickling every frame.
+
+    The yielded array is a view into the ring and is recycled once the next
+    frame is requested: copy it if it has to outlive the loop iteration.
+    Frames [start, end) only, like the generator's start/end.
+    """
+    # Size the ring from a decoded frame, not the container metadata, which
+    # ignores rotation and can disagree with what OpenCV actually returns.
+    cap = cv2.VideoCapture(source_path)
+    ok, first = cap.read()
+    cap.release()
+    if not ok:
+        raise RuntimeError(f"Could not read video: {source_path}")
+
+    slots = max(2, slots)
+    shape = (slots, *first.shape)
+    ctx = mp.get_context("spawn")
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    free_slots, ready_slots = ctx.Queue(), ctx.Queue()
+    for i in range(slots):
+        free_slots.put(i)
+
+    decoder = ctx.Process(
+        target=_decode_into_ring,
+        args=(source_path, shm.name, shape, free_slots, ready_slots, start, end),
+        daemon=True,
+    )
+    decoder.start()
+
+    in_use = None
+    try:
+        while True:
+            slot = ready_slots.get()
+            if slot is None:
+                break
+            if isinstance(slot, str):
+                raise RuntimeError(slot)
+            if in_use is not None:
+                free_slots.put(in_use)
+            in_use = slot
+            yield ring[slot]
+    finally:
+        free_slots.put(None)
+        decoder.join(timeout=5)
+        if decoder.is_alive():
+            decoder.terminate()
+        del ring
+        shm.close()
+        shm.unlink()
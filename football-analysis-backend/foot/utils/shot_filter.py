@@ -0,0 +1,72 @@
+# utils/shot_filter.py
+
+import cv2
+import numpy as np
+
+from config import (
+    SHOT_FILTER_SIZE, SHOT_CUT_THRESHOLD, SHOT_MIN_PITCH_RATIO,
+    PITCH_HSV_LOW, PITCH_HSV_HIGH,
+)
+
+# flags returned by ShotFilter.update
+SHOT_CUT = 1          # first pitch frame of a new shot
+SHOT_OFF_PITCH = 2    # not a pitch view: skip the detectors
+
+_HIST_BINS = [16, 4]                  # hue, saturation
+_HIST_RANGES = [0, 180, 0, 256]
+
+
+def shot_filter_key() -> dict:
+    """
+    The settings that decide which frames skip detection; stored in the
+    detection cache's meta, whose skipped frames are empty.
+    """
+    return {
+        "size": list(SHOT_FILTER_SIZE),
+        "min_pitch_ratio": SHOT_MIN_PITCH_RATIO,
+        "hsv_low": list(PITCH_HSV_LOW),
+        "hsv_high": list(PITCH_HSV_HIGH),
+    }
+
+
+class ShotFilter:
+    """
+    Cheap per-frame check ahead of the detectors, on a SHOT_FILTER_SIZE copy
+    of the frame (about 2 ms for a 1080p frame on one core):
+
+    - pitch ratio: share of grass-green pixels; below SHOT_MIN_PITCH_RATIO
+      the frame is a crowd shot, graphic or close-up and gets SHOT_OFF_PITCH
+    - cut: Bhattacharyya distance between the hue/saturation histograms of
+      consecutive frames above SHOT_CUT_THRESHOLD. The first pitch frame
+      after a cut, or after off-pitch frames, gets SHOT_CUT.
+
+    One instance per video pass, fed every frame in order.
+    """
+
+    def __init__(self):
+        self._hist = None
+        self._off_pitch = True      # so the first pitch frame starts a shot
+        self.shots = 0
+        self.off_pitch_frames = 0
+
+    def update(self, frame) -> int:
+        small = cv2.resize(frame, SHOT_FILTER_SIZE, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        green = cv2.inRange(hsv, np.array(PITCH_HSV_LOW), np.array(PITCH_HSV_HIGH))
+        pitch_ratio = cv2.countNonZero(green) / green.size
+
+        hist = cv2.calcHist([hsv], [0, 1], None, _HIST_BINS, _HIST_RANGES)
+        cv2.normalize(hist, hist, 1.0, 0.0, cv2.NORM_L1)
+        cut = (self._hist is None
+               or cv2.compareHist(self._hist, hist, cv2.HISTCMP_BHATTACHARYYA) > SHOT_CUT_THRESHOLD)
+        self._hist = hist
+
+        if pitch_ratio < SHOT_MIN_PITCH_RATIO:
+            self._off_pitch = True
+            self.off_pitch_frames += 1
+            return SHOT_OFF_PITCH
+        if cut or self._off_pitch:
+            self._off_pitch = False
+            self.shots += 1
+            return SHOT_CUT
+        return 0
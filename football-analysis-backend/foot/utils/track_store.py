@@ -0,0 +1,92 @@
+# utils/track_store.py
+
+import numpy as np
+import supervision as sv
+
+from config import DETECTION_CACHE_CHUNK
+from utils.frame_store import FrameStoreWriter, load_store_meta, iter_frame_store
+
+# entity kinds, in the order analyze/postprocess merges them
+PLAYER_KIND, GOALKEEPER_KIND, REFEREE_KIND = 0, 1, 2
+_KINDS = (("players", PLAYER_KIND), ("goalkeepers", GOALKEEPER_KIND), ("referees", REFEREE_KIND))
+
+
+def _xyxy(detections):
+    return detections.xyxy.astype(np.float32).reshape(-1, 4)
+
+
+def _pitch(pitch, key, count):
+    if pitch is None:
+        return np.full((count, 2), np.nan, dtype=np.float32)
+    return np.asarray(pitch[key], dtype=np.float32).reshape(-1, 2)
+
+
+class TrackStoreWriter:
+    """
+    Stores the post-processed result of every frame (tracked players,
+    goalkeepers and referees with team and tracker ids, the ball, their
+    pitch coordinates, and whether the frame starts a new shot) so outputs can be re-rendered later without any model.
+    """
+
+    def __init__(self, tracks_dir: str, chunk_size: int = DETECTION_CACHE_CHUNK):
+        self.store = FrameStoreWriter(tracks_dir, chunk_size=chunk_size)
+
+    def add(self, analysis: dict):
+        pitch = analysis["pitch"]
+        ent_xyxy, ent_class, ent_tracker, ent_kind, ent_pitch = [], [], [], [], []
+        for key, kind in _KINDS:
+            det = analysis[key]
+            ent_xyxy.append(_xyxy(det))
+            ent_class.append(np.asarray(det.class_id if len(det) else [], dtype=np.int8))
+            ent_tracker.append(np.asarray(det.tracker_id if len(det) else [], dtype=np.int32))
+            ent_kind.append(np.full(len(det), kind, dtype=np.int8))
+            ent_pitch.append(_pitch(pitch, key, len(det)))
+        ball = analysis["ball"]
+        self.store.add(
+            ent_xyxy=np.concatenate(ent_xyxy),
+            ent_class=np.concatenate(ent_class),
+            ent_tracker=np.concatenate(ent_tracker),
+            ent_kind=np.concatenate(ent_kind),
+            ent_pitch=np.concatenate(ent_pitch),
+            ball_xyxy=_xyxy(ball),
+            ball_pitch=_pitch(pitch, "ball", len(ball)),
+            has_pitch=np.array([pitch is not None]),
+            cut=np.array([bool(analysis.get("cut"))]),
+        )
+
+    def close(self, complete: bool = True, **meta):
+        self.store.close(complete=complete, **meta)
+
+
+def load_tracks_meta(tracks_dir: str):
+    return load_store_meta(tracks_dir)
+
+
+def iter_tracks(tracks_dir: str, start: int = 0, end: int = None):
+    """
+    Yield per-frame dicts shaped like the output of
+    `frame_analysis.postprocess_frame` (without a homography), for frames
+    [start, end) of the stored job.
+    """
+    for frame in iter_frame_store(tracks_dir, start=start, end=end):
+        combined = sv.Detections(
+            xyxy=frame["ent_xyxy"],
+            class_id=frame["ent_class"].astype(int),
+            tracker_id=frame["ent_tracker"].astype(int),
+        )
+        kind = frame["ent_kind"]
+        analysis = {
+            "ball": sv.Detections(xyxy=frame["ball_xyxy"], class_id=np.zeros(len(frame["ball_xyxy"]), dtype=int)),
+            "combined": combined,
+            "labels": [f"#{tid}" for tid in combined.tracker_id],
+            "homography": None,
+            "pitch": None,
+            "cut": bool(frame["cut"][0]) if "cut" in frame else False,     # stores older than shot cuts
+        }
+        for key, k in _KINDS:
+            analysis[key] = combined[kind == k]
+        if frame["has_pitch"][0]:
+            analysis["pitch"] = {"ball": frame["ball_pitch"]}
+            for key, k in _KINDS:
+                analysis["pitch"][key] = frame["ent_pitch"][kind == k]
+        yield analysis
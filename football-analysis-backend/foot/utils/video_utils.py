@@ -1,14 +1,53 @@
 # utils/video_utils.py
 
+import os
+import shutil
+import subprocess
+
 import cv2
+import numpy as np
 import supervision as sv
-from config import FPS
+from config import FPS, SHARED_FRAME_DECODE, SHARED_FRAME_SLOTS
 
 
 def get_video_info(path: str) -> sv.VideoInfo:
     return sv.VideoInfo.from_video_path(path)
 
 
+def get_frames_generator(path: str, start: int = 0, end: int = None):
+    """
+    Frame generator used by the pipelines, for frames [start, end). OpenCV
+    seeks to the keyframe before `start` and decodes forward from there, so
+    a window costs about its own length, not the video's. With
+    SHARED_FRAME_DECODE the video is decoded in a helper process (see
+    utils/shared_frames.py).
+    """
+    if SHARED_FRAME_DECODE:
+        from utils.shared_frames import shared_frames_generator
+        return shared_frames_generator(path, slots=SHARED_FRAME_SLOTS, start=start, end=end)
+    return sv.get_video_frames_generator(path, start=start, end=end)
+
+
+def resolve_window(start, end, fps: float, total_frames: int):
+    """
+    Turn start/end positions -- a frame number (int) or a timestamp in
+    seconds (float), as produced by analysis_service.parse_position -- into
+    a frame range [start, end) clipped to the video.
+    """
+    def to_frame(position, default):
+        if position is None:
+            return default
+        if isinstance(position, float):
+            position = round(position * fps)
+        return min(max(int(position), 0), total_frames)
+
+    start_frame = to_frame(start, 0)
+    end_frame = to_frame(end, total_frames)
+    if end_frame <= start_frame:
+        raise ValueError(f"empty window: start {start} is not before end {end}")
+    return start_frame, end_frame
+
+
 def get_first_frame(path: str):
     generator = sv.get_video_frames_generator(path)
     return next(generator)
@@ -28,4 +67,150 @@ def create_side_by_side_writer(
         cv2.VideoWriter_fourcc(*"mp4v"),
         fps,
         (frame_width * 2, frame_height)
-    )
\ No newline at end of file
+    )
+
+
+# Output layouts: camera view next to the radar, or either one alone
+LAYOUTS = ("both", "camera", "radar")
+
+
+def compose_output_frame(camera, radar, layout: str = "both", scale: float = 1.0):
+    """
+    Build the frame that goes to the output video: the radar is resized to
+    the camera view's size when both are shown, and the result is scaled by
+    `scale` (e.g. 0.5 for a half-resolution preview).
+    """
+    if layout == "camera":
+        out = camera
+    elif layout == "radar":
+        out = radar
+    else:
+        height, width = camera.shape[:2]
+        out = np.hstack((camera, cv2.resize(radar, (width, height))))
+    if scale != 1.0:
+        out = cv2.resize(out, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(out, cv2.COLOR_RGB2BGR)
+
+
+class LazyVideoWriter:
+    """
+    VideoWriter that is opened with the size of the first frame written, so
+    callers don't have to know the composed output size up front.
+    """
+
+    def __init__(self, output_path: str, fps: float = FPS):
+        self.output_path = output_path
+        self.fps = fps
+        self.writer = None
+
+    def write(self, frame):
+        if self.writer is None:
+            height, width = frame.shape[:2]
+            self.writer = cv2.VideoWriter(
+                self.output_path,
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                self.fps,
+                (width, height)
+            )
+        self.writer.write(frame)
+
+    def release(self) -> bool:
+        """
+        Returns whether anything was written.
+        """
+        if self.writer is None:
+            return False
+        self.writer.release()
+        return True
+
+
+class SegmentedVideoWriter(LazyVideoWriter):
+    """
+    LazyVideoWriter for jobs that checkpoint: an mp4 cannot be reopened and
+    appended to, so frames go to numbered part files (<output>.partNNN.mp4)
+    and `cut()` closes the current part at each checkpoint. A resumed job
+    drops the parts written after its checkpoint (`rollback()`) and carries
+    on with the next one; `release()` joins the parts into the output.
+    """
+
+    def __init__(self, output_path: str, fps: float = FPS):
+        super().__init__(output_path, fps=fps)
+        self.segments = 0
+
+    def _part(self, index: int) -> str:
+        return f"{self.output_path}.part{index:03d}.mp4"
+
+    def write(self, frame):
+        if self.writer is None:
+            height, width = frame.shape[:2]
+            self.writer = cv2.VideoWriter(
+                self._part(self.segments),
+                cv2.VideoWriter_fourcc(*"mp4v"),
+                self.fps,
+                (width, height)
+            )
+        self.writer.write(frame)
+
+    def cut(self) -> int:
+        """
+        Close the current part; returns the number of finished parts.
+        """
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            self.segments += 1
+        return self.segments
+
+    def rollback(self):
+        index = self.segments
+        while os.path.exists(self._part(index)):
+            os.remove(self._part(index))
+            index += 1
+
+    def __getstate__(self):
+        # pickled in checkpoints right after cut(): no open VideoWriter
+        state = dict(self.__dict__)
+        state["writer"] = None
+        return state
+
+    def release(self) -> bool:
+        self.cut()
+        parts = [self._part(i) for i in range(self.segments)]
+        if not parts:
+            return False
+        concat_videos(parts, self.output_path, self.fps)
+        for part in parts:
+            os.remove(part)
+        return True
+
+
+def concat_videos(parts, output_path: str, fps: float = FPS):
+    """
+    Join video files of the same size into one: a stream copy with ffmpeg
+    when it is installed, otherwise a re-encode through OpenCV.
+    """
+    if len(parts) == 1:
+        os.replace(parts[0], output_path)
+        return
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = output_path + ".parts.txt"
+        with open(list_path, "w") as f:
+            f.writelines(f"file '{os.path.abspath(p)}'\n" for p in parts)
+        try:
+            subprocess.run(
+                [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", output_path],
+                check=True,
+            )
+            return
+        except subprocess.CalledProcessError:
+            pass
+        finally:
+            os.remove(list_path)
+
+    writer = LazyVideoWriter(output_path, fps=fps)
+    for part in parts:
+        for frame in sv.get_video_frames_generator(part):
+            writer.write(frame)
+    writer.release()
@@ -0,0 +1,112 @@
+"""
+Conditional GET, compression and Cache-Control for the JSON API.
+
+`init_app` installs an after_request hook that, for every successful GET of a
+JSON response built in the view (jsonify):
+
+- adds a weak ETag, the hash of the uncompressed body, and answers a request
+  whose If-None-Match matches it with an empty 304
+- compresses bodies of at least COMPRESS_MIN_BYTES with brotli (when the
+  `brotli` package is installed) or gzip, whichever the client accepts
+- sets Cache-Control from the route's `@cache_control(...)`, or
+  DEFAULT_CACHE_CONTROL: clients keep the body but revalidate it each time
+
+The ETag is weak because the gzip and brotli bodies share it; they are the
+same JSON. Files served by send_from_directory already get ETag and
+Last-Modified from werkzeug and are passed through untouched, apart from a
+route's Cache-Control.
+
+`TTLCache` keeps upstream API responses for a while, so repeated page visits
+do not each cost an API-Football request.
+"""
+
+import gzip
+import time
+import threading
+
+try:
+    import brotli
+except ImportError:     # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5      # much faster than the default 11, still smaller than gzip
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def cache_control(value: str):
+    """
+    Route decorator: Cache-Control of the route's successful responses, e.g.
+    @cache_control("public, max-age=300").
+    """
+    def decorate(view):
+        view.cache_control = value
+        return view
+    return decorate
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def init_app(app):
+    from flask import request
+
+    @app.after_request
+    def conditional_and_compressed(response):
+        if request.method not in ("GET", "HEAD") or response.status_code != 200:
+            return response
+        view = app.view_functions.get(request.endpoint)
+        policy = getattr(view, "cache_control", None)
+        if response.direct_passthrough or response.is_streamed or response.mimetype != "application/json":
+            if policy:
+                response.headers["Cache-Control"] = policy
+            return response
+
+        response.headers["Cache-Control"] = policy or DEFAULT_CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        response.add_etag(weak=True)
+        response.make_conditional(request)
+        if response.status_code == 304:
+            return response
+
+        body = response.get_data()
+        encoding = request.accept_encodings.best_match(_ENCODINGS)
+        if encoding and len(body) >= COMPRESS_MIN_BYTES and "Content-Encoding" not in response.headers:
+            response.set_data(_compress(body, encoding))
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class TTLCache:
+    """
+    Values kept for a given number of seconds, at most `max_entries` of them
+    (the oldest go first). Thread-safe.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = {}      # key -> (expiry, value), in insertion order
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key, value, ttl: float):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
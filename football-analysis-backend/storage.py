@@ -0,0 +1,350 @@
+"""
+Storage lifecycle of the upload and output video folders.
+
+One SQLite table records, per file, its size and last access and, for
+outputs, where it came from: the job that wrote it, its upload, and the
+stored tracks and re-render options it can be rebuilt from
+(foot/pipelines/rerender_pipelines.py).
+
+- Quotas: outputs and uploads each have a byte quota, and the disk keeps
+  `min_free` bytes free. `make_room` is asked before a job is admitted or
+  an upload is saved; it evicts outputs, least recently used first.
+- Eviction only deletes outputs that can be rebuilt: their tracks are
+  stored and their upload is still there. The row stays, marked evicted,
+  so the output can be regenerated on request. Other outputs (live
+  recordings, files from before the manager) are never evicted.
+- Proxies: `sweep` re-encodes uploads that have not been used for
+  `proxy_after` seconds, or the least recently used ones while uploads are
+  over quota. Each runs as a background task and replaces the file with an
+  H.264 proxy at the same resolution and frame count, so stored tracks and
+  re-renders still line up with it. Needs ffmpeg on PATH; a proxy that is
+  not smaller than its original is thrown away.
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import threading
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+
+ACCESS_RESOLUTION = 60.0     # s; more frequent accesses of a file are not written
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    job_id TEXT,
+    upload TEXT,
+    kind TEXT,
+    tracks_dir TEXT,
+    render TEXT,
+    evicted INTEGER NOT NULL DEFAULT 0,
+    original_size INTEGER,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS files_access ON files (folder, evicted, last_access);
+"""
+
+
+# transcode_proxy's result when the upload changed while it ran
+PROXY_REPLACED = "replaced"
+
+
+def transcode_proxy(path, crf):
+    """
+    Runs in a background process: re-encode `path` in place as an H.264
+    proxy (same resolution and frames). Returns (original size, new size),
+    None when the proxy came out no smaller and the original was kept, or
+    PROXY_REPLACED when the upload was replaced meanwhile (left as it is).
+    """
+    source = Path(path)
+    tmp = source.with_name(f".proxy_{source.stem}.mp4")
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", "-i", str(source),
+        "-map", "0:v:0", "-map", "0:a:0?", "-vsync", "passthrough",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+        "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart", str(tmp),
+    ]
+    before = source.stat()
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        after = source.stat()
+        if (after.st_mtime, after.st_size) != (before.st_mtime, before.st_size):
+            return PROXY_REPLACED
+        original, proxy = after.st_size, tmp.stat().st_size
+        if proxy >= original:
+            return None
+        os.replace(tmp, source)
+        return original, proxy
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class StorageManager:
+    """
+    folders: {"uploads": Path, "outputs": Path} -- created if missing
+    video_index: the VideoIndex of the same folders, kept in sync
+    submit: callable(fn, *args) -> Future, runs proxy transcodes
+    output_quota, upload_quota, min_free: bytes (0 = no quota)
+    proxy_after: seconds without access before an upload gets a proxy
+        (0 = only while uploads are over quota)
+    proxy_crf: x264 CRF of the proxies
+    """
+
+    def __init__(self, db_path, folders: dict, video_index, submit,
+                 output_quota=0, upload_quota=0, min_free=0, proxy_after=0, proxy_crf=28):
+        self.db_path = str(db_path)
+        self.folders = {key: Path(folder) for key, folder in folders.items()}
+        for folder in self.folders.values():
+            folder.mkdir(parents=True, exist_ok=True)
+        self.video_index = video_index
+        self.submit = submit
+        self.quotas = {"outputs": output_quota, "uploads": upload_quota}
+        self.min_free = min_free
+        self.proxy_after = proxy_after
+        self.proxy_crf = proxy_crf
+        self._lock = threading.Lock()
+        self._accessed = {}       # (folder key, name) -> last written access time
+        self._transcoding = None  # upload name being transcoded
+        self._ffmpeg = shutil.which("ffmpeg") is not None
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits on success and is always closed."""
+        db = sqlite3.connect(self.db_path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def path(self, key, name) -> Path:
+        return self.folders[key] / name
+
+    # -- recording ----------------------------------------------------------
+
+    def uploaded(self, name):
+        """
+        Record an upload just saved (a replaced file starts over: no proxy).
+        """
+        path = self.path("uploads", name)
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO files (folder, name, size, last_access) VALUES ('uploads', ?, ?, ?)",
+                (name, path.stat().st_size, time.time()),
+            )
+        self.video_index.touch("uploads", name)
+
+    def add_outputs(self, job_id, upload, outputs: dict, tracks_dir=None, render=None):
+        """
+        Record the outputs ({kind: filename}) a job wrote from `upload`.
+        With `tracks_dir` (stored tracks) they can be rebuilt by a re-render
+        with the `render` options, and so evicted.
+        """
+        now = time.time()
+        rows = []
+        for kind, name in outputs.items():
+            path = self.path("outputs", name)
+            if name and path.is_file():
+                rows.append((name, path.stat().st_size, now, job_id, upload, kind,
+                             tracks_dir, json.dumps(render or {})))
+        with self._lock, self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO files (folder, name, size, last_access, job_id, upload, kind,"
+                " tracks_dir, render) VALUES ('outputs', ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        for row in rows:
+            self.video_index.touch("outputs", row[0])
+
+    def accessed(self, key, name):
+        """
+        Note that a file was served (for LRU); cheap when called repeatedly.
+        """
+        now = time.time()
+        if now - self._accessed.get((key, name), 0.0) < ACCESS_RESOLUTION:
+            return
+        self._accessed[(key, name)] = now
+        with self._lock, self._connect() as db:
+            db.execute("UPDATE files SET last_access=? WHERE folder=? AND name=?", (now, key, name))
+
+    def delete(self, key, name) -> bool:
+        """
+        Delete a file and forget it; False if there was none.
+        """
+        path = self.path(key, name)
+        with self._lock, self._connect() as db:
+            known = db.execute("DELETE FROM files WHERE folder=? AND name=?", (key, name)).rowcount
+        if not path.is_file():
+            return bool(known)
+        path.unlink()
+        self.video_index.touch(key, name)
+        return True
+
+    # -- evicted outputs ----------------------------------------------------
+
+    def _rebuildable(self, row) -> bool:
+        if not row["tracks_dir"] or not (Path(row["tracks_dir"]) / "meta.json").exists():
+            return False
+        return json.loads(row["render"] or "{}").get("layout") == "radar" or \
+            self.path("uploads", row["upload"] or "").is_file()
+
+    def evicted(self, name):
+        """
+        Provenance of an evicted output ({job_id, upload, kind, tracks_dir,
+        render}) if it can still be regenerated, else None.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM files WHERE folder='outputs' AND name=? AND evicted=1",
+                             (name,)).fetchone()
+        if row is None or not self._rebuildable(row):
+            return None
+        return {"job_id": row["job_id"], "upload": row["upload"], "kind": row["kind"],
+                "tracks_dir": row["tracks_dir"], "render": json.loads(row["render"] or "{}")}
+
+    # -- quotas -------------------------------------------------------------
+
+    def _folder_bytes(self, key) -> int:
+        total = 0
+        with os.scandir(self.folders[key]) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    total += entry.stat().st_size
+        return total
+
+    def _shortfall(self, key, need) -> int:
+        """Bytes to free before `need` more fit in `key`'s quota and on disk."""
+        short = self.min_free + need - shutil.disk_usage(self.folders[key]).free
+        if self.quotas[key]:
+            short = max(short, self._folder_bytes(key) + need - self.quotas[key])
+        return short
+
+    def _evict(self, short) -> bool:
+        """
+        Evict outputs, least recently used first, until `short` bytes are
+        freed; nothing is evicted if they cannot free that much.
+        """
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM files WHERE folder='outputs' AND evicted=0"
+                              " AND tracks_dir IS NOT NULL ORDER BY last_access").fetchall()
+        victims, total = [], 0
+        for row in rows:
+            if total >= short:
+                break
+            path = self.path("outputs", row["name"])
+            if path.is_file() and self._rebuildable(row):
+                victims.append((row, path.stat().st_size))
+                total += victims[-1][1]
+        if total < short:
+            return False
+        for row, size in victims:
+            try:
+                self.path("outputs", row["name"]).unlink()
+            except OSError:
+                continue        # in use (Windows)
+            with self._lock, self._connect() as db:
+                db.execute("UPDATE files SET evicted=1 WHERE folder='outputs' AND name=?", (row["name"],))
+            self.video_index.touch("outputs", row["name"])
+            print(f"🗑️ Evicted {row['name']} ({size / 1e6:.0f} MB, rebuildable from job {row['job_id']})")
+        return True
+
+    def make_room(self, need=0, key="outputs") -> bool:
+        """
+        Make `need` more bytes fit in `key`'s folder, evicting outputs as
+        needed. False if they do not fit even then (an upload quota cannot be
+        met by evicting outputs).
+        """
+        short = self._shortfall(key, need)
+        if short > 0 and key == "uploads" and self.quotas["uploads"]:
+            if self._folder_bytes("uploads") + need > self.quotas["uploads"]:
+                return False
+        if short > 0 and self._evict(short):
+            short = self._shortfall(key, need)
+        return short <= 0
+
+    def usage(self) -> dict:
+        with self._connect() as db:
+            evicted = db.execute("SELECT COUNT(*) FROM files WHERE folder='outputs' AND evicted=1").fetchone()[0]
+            proxies = db.execute("SELECT COUNT(*) FROM files WHERE folder='uploads'"
+                                 " AND original_size IS NOT NULL").fetchone()[0]
+        disk = shutil.disk_usage(self.folders["outputs"])
+        return {
+            "uploads": {"bytes": self._folder_bytes("uploads"), "quota": self.quotas["uploads"] or None,
+                        "proxies": proxies},
+            "outputs": {"bytes": self._folder_bytes("outputs"), "quota": self.quotas["outputs"] or None,
+                        "evicted": evicted},
+            "disk": {"free": disk.free, "total": disk.total, "min_free": self.min_free},
+        }
+
+    # -- maintenance --------------------------------------------------------
+
+    def sweep(self, busy=()):
+        """
+        Enforce the quotas and start the next proxy transcode, if any.
+        `busy`: uploads unfinished jobs are reading, left alone. Cheap; call
+        it every few minutes.
+        """
+        self.make_room(0, "outputs")
+        if not self._ffmpeg or self._transcoding is not None:
+            return
+        name = self._next_proxy(set(busy))
+        if name is None:
+            return
+        self._transcoding = name
+        future = self.submit(transcode_proxy, str(self.path("uploads", name)), self.proxy_crf)
+        future.add_done_callback(lambda f: self._proxy_done(name, f))
+
+    def _next_proxy(self, busy):
+        on_disk = {}
+        with os.scandir(self.folders["uploads"]) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith(".") and entry.name not in busy:
+                    on_disk[entry.name] = entry.stat()
+        with self._connect() as db:
+            rows = {row["name"]: row for row in
+                    db.execute("SELECT name, last_access, original_size FROM files WHERE folder='uploads'")}
+        # uploads from before the manager count as accessed when last written
+        candidates = sorted(
+            (rows[name]["last_access"] if name in rows else stat.st_mtime, name)
+            for name, stat in on_disk.items()
+            if name not in rows or rows[name]["original_size"] is None
+        )
+        if not candidates:
+            return None
+        last_access, name = candidates[0]
+        idle = self.proxy_after and time.time() - last_access > self.proxy_after
+        over = self.quotas["uploads"] and sum(s.st_size for s in on_disk.values()) > self.quotas["uploads"]
+        return name if idle or over else None
+
+    def _proxy_done(self, name, future):
+        self._transcoding = None
+        try:
+            sizes = future.result()
+        except Exception as e:
+            print(f"⚠️ Proxy of {name} failed: {e}")
+            sizes = None
+        path = self.path("uploads", name)
+        if sizes == PROXY_REPLACED or not path.is_file():
+            return      # a new upload: it gets its own turn
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT last_access FROM files WHERE folder='uploads' AND name=?",
+                             (name,)).fetchone()
+            # kept originals are marked too, so they are not transcoded again
+            db.execute(
+                "INSERT OR REPLACE INTO files (folder, name, size, last_access, original_size)"
+                " VALUES ('uploads', ?, ?, ?, ?)",
+                (name, path.stat().st_size, row["last_access"] if row else path.stat().st_mtime,
+                 sizes[0] if sizes else path.stat().st_size),
+            )
+        if sizes:
+            self.video_index.touch("uploads", name)
+            print(f"📼 Proxy of {name}: {sizes[0] / 1e6:.0f} MB -> {sizes[1] / 1e6:.0f} MB")
@@ -0,0 +1,215 @@
+"""
+Metadata index of the upload and output video folders.
+
+One SQLite table holds, per file, its size and mtime, the sv.VideoInfo
+fields (width, height, fps, total frames), a content hash and a small JPEG
+thumbnail. Listings are plain SQL queries (sorted, paginated), so they stay
+fast however many videos there are.
+
+Probing a file (decoding a frame, hashing it) happens in a background
+process; rows appear immediately with the cheap stat fields and are filled
+in when the probe finishes. A file is probed again only when its size or
+mtime changes. Folders are rescanned only when their own mtime changes;
+files written in place (uploads, job outputs) are reported with `touch`.
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+SORT_COLUMNS = ("name", "mtime", "size", "duration")
+THUMBNAIL_WIDTH = 160
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    total_frames INTEGER,
+    duration REAL,
+    sha1 TEXT,
+    thumbnail TEXT,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS videos_mtime ON videos (folder, mtime);
+CREATE INDEX IF NOT EXISTS videos_size ON videos (folder, size);
+CREATE INDEX IF NOT EXISTS videos_duration ON videos (folder, duration);
+"""
+
+
+def probe_video(path, thumbnail_path):
+    """
+    Runs in a background process: video info, content hash and thumbnail
+    of one file. Returns a dict of the metadata columns.
+    """
+    import cv2
+    import supervision as sv
+
+    info = sv.VideoInfo.from_video_path(path)
+    meta = {
+        "width": info.width,
+        "height": info.height,
+        "fps": info.fps,
+        "total_frames": info.total_frames,
+        "duration": info.total_frames / info.fps if info.fps else None,
+        "thumbnail": None,
+    }
+
+    cap = cv2.VideoCapture(path)
+    if info.total_frames:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, info.total_frames // 10)
+    ok, frame = cap.read()
+    cap.release()
+    if ok:
+        height = int(frame.shape[0] * THUMBNAIL_WIDTH / frame.shape[1])
+        thumb = cv2.resize(frame, (THUMBNAIL_WIDTH, height), interpolation=cv2.INTER_AREA)
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        cv2.imwrite(thumbnail_path, thumb, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        meta["thumbnail"] = os.path.basename(thumbnail_path)
+
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    meta["sha1"] = digest.hexdigest()
+    return meta
+
+
+class VideoIndex:
+    """
+    folders: {"uploads": Path, ...} -- the indexed folders, by key
+    submit: callable(fn, *args) -> Future, runs probes in the background
+    thumbnails_dir: where thumbnails go, one sub-folder per key
+    """
+
+    def __init__(self, db_path, folders: dict, submit, thumbnails_dir):
+        self.db_path = str(db_path)
+        self.folders = {key: Path(folder) for key, folder in folders.items()}
+        self.submit = submit
+        self.thumbnails_dir = Path(thumbnails_dir)
+        self._lock = threading.Lock()
+        self._scanned = {}        # folder key -> folder mtime at the last scan
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits on success and is always closed."""
+        db = sqlite3.connect(self.db_path, timeout=10)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _thumbnail_path(self, key, name):
+        return self.thumbnails_dir / key / (hashlib.sha1(name.encode()).hexdigest()[:16] + ".jpg")
+
+    def _probe(self, key, name, stat):
+        def done(future):
+            try:
+                meta = future.result()
+            except Exception:
+                return          # unreadable or still being written; stat fields stay
+            with self._lock, self._connect() as db:
+                db.execute(
+                    "UPDATE videos SET width=?, height=?, fps=?, total_frames=?, duration=?,"
+                    " sha1=?, thumbnail=? WHERE folder=? AND name=? AND mtime=? AND size=?",
+                    (meta["width"], meta["height"], meta["fps"], meta["total_frames"],
+                     meta["duration"], meta["sha1"], meta["thumbnail"],
+                     key, name, stat.st_mtime, stat.st_size),
+                )
+
+        future = self.submit(probe_video, str(self.folders[key] / name),
+                             str(self._thumbnail_path(key, name)))
+        future.add_done_callback(done)
+
+    def touch(self, key, name):
+        """
+        (Re)index one file after it was written or deleted.
+        """
+        path = self.folders[key] / name
+        with self._lock, self._connect() as db:
+            if not path.is_file():
+                db.execute("DELETE FROM videos WHERE folder=? AND name=?", (key, name))
+                return
+            stat = path.stat()
+            row = db.execute("SELECT size, mtime FROM videos WHERE folder=? AND name=?",
+                             (key, name)).fetchone()
+            if row and row["size"] == stat.st_size and row["mtime"] == stat.st_mtime:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO videos (folder, name, size, mtime) VALUES (?, ?, ?, ?)",
+                (key, name, stat.st_size, stat.st_mtime),
+            )
+        self._probe(key, name, stat)
+
+    def refresh(self, key):
+        """
+        Sync the index with the folder if its entries changed since the
+        last scan (one stat call otherwise).
+        """
+        folder = self.folders[key]
+        folder_mtime = folder.stat().st_mtime
+        if self._scanned.get(key) == folder_mtime:
+            return
+        with self._lock, self._connect() as db:
+            known = {row["name"]: (row["size"], row["mtime"]) for row in
+                     db.execute("SELECT name, size, mtime FROM videos WHERE folder=?", (key,))}
+            on_disk = {}
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        on_disk[entry.name] = stat
+            gone = [(key, name) for name in known if name not in on_disk]
+            db.executemany("DELETE FROM videos WHERE folder=? AND name=?", gone)
+            changed = [
+                (name, stat) for name, stat in on_disk.items()
+                if known.get(name) != (stat.st_size, stat.st_mtime)
+            ]
+            db.executemany(
+                "INSERT OR REPLACE INTO videos (folder, name, size, mtime) VALUES (?, ?, ?, ?)",
+                [(key, name, stat.st_size, stat.st_mtime) for name, stat in changed],
+            )
+        self._scanned[key] = folder_mtime
+        for name, stat in changed:
+            self._probe(key, name, stat)
+
+    def info(self, key, name):
+        """
+        The indexed row of one file as a dict (metadata columns are None
+        until its probe finished), or None if it is not indexed.
+        """
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM videos WHERE folder=? AND name=?", (key, name)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, key, sort="name", descending=False, page=1, per_page=100):
+        """
+        One page of a folder's videos as dicts, and the total count.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {SORT_COLUMNS}")
+        self.refresh(key)
+        order = "DESC" if descending else "ASC"
+        with self._connect() as db:
+            total = db.execute("SELECT COUNT(*) FROM videos WHERE folder=?", (key,)).fetchone()[0]
+            rows = db.execute(
+                f"SELECT * FROM videos WHERE folder=? ORDER BY {sort} {order}, name LIMIT ? OFFSET ?",
+                (key, per_page, (page - 1) * per_page),
+            ).fetchall()
+        items = []
+        for row in rows:
+            item = dict(row)
+            del item["folder"]
+            items.append(item)
+        return items, total
@@ -2,13 +2,22 @@
 const outputContainer = document.getElementById('outputVideos');
 const BACKEND_BASE = 'http://127.0.0.1:5000';
 
-function renderOutputList(videos) {
+function describeVideo(item) {
+    if (!item || !item.width) return '';
+    const secs = Math.round(item.duration || 0);
+    const mins = Math.floor(secs / 60);
+    return `${item.width}×${item.height} · ${Math.round(item.fps)} fps · ${mins}:${String(secs % 60).padStart(2, '0')}`;
+}
+
+function renderOutputList(videos, items = []) {
     if (!videos.length) {
         outputContainer.textContent = "No output videos found.";
         return;
     }
     outputContainer.innerHTML = '';
-    videos.forEach(filename => {
+    videos.forEach((filename, i) => {
+        const item = items[i];
+        const poster = item && item.thumbnail_url ? `poster="${BACKEND_BASE}${item.thumbnail_url}"` : '';
         const card = document.createElement('div');
         card.style.background = "rgba(28,32,54,0.13)";
         card.style.borderRadius = "14px";
@@ -17,11 +26,12 @@ function renderOutputList(videos) {
         card.style.maxWidth = "480px";
         card.style.margin = "10px";
         card.innerHTML = `
-            <video width="400" controls preload="none" style="display:block;margin-bottom:10px;">
+            <video width="400" controls preload="none" ${poster} style="display:block;margin-bottom:10px;">
                 <source src="${BACKEND_BASE}/output_videos_download/${encodeURIComponent(filename)}" type="video/mp4">
                 Your browser does not support the video tag.
             </video>
             <div style="color:#edf0ff;font-size:1.07em;font-weight:600;">${filename}</div>
+            <div style="color:#aab2d5;font-size:0.9em;">${describeVideo(item)}</div>
         `;
         outputContainer.appendChild(card);
     });
@@ -30,10 +40,10 @@ function renderOutputList(videos) {
 async function fetchOutputVideos() {
     outputContainer.innerHTML = "Loading...";
     try {
-        const res = await fetch(`${BACKEND_BASE}/output_videos`);
+        const res = await fetch(`${BACKEND_BASE}/output_videos?sort=mtime&order=desc`);
         const data = await res.json();
         if (data.videos) {
-            renderOutputList(data.videos);
+            renderOutputList(data.videos, data.items || []);
         } else {
             outputContainer.textContent = "No output videos found.";
         }
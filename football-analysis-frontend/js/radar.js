@@ -0,0 +1,212 @@
+// ==================== CLIENT-SIDE RADAR ====================
+// Draws the radar of an analysis job on a <canvas>, in sync with the
+// camera video, from the job's position stream (/positions/<job_id>):
+// small binary chunks of per-frame pitch positions fetched around the
+// playback position. Format: foot/utils/position_stream.py in the backend.
+
+// Pitch markings in cm (same as the backend's SoccerPitchConfiguration)
+const PITCH_MARKINGS = {
+  penaltyBoxWidth: 4100,
+  penaltyBoxLength: 2015,
+  goalBoxWidth: 1832,
+  goalBoxLength: 550,
+  centreCircleRadius: 915,
+  penaltySpotDistance: 1100
+};
+const RADAR_PADDING = 50;            // cm around the pitch
+const RADAR_CHUNKS_KEPT = 4;         // decoded chunks kept in memory
+const FLAG_PITCH = 1;
+const FLAG_BALL = 2;
+
+// Decode one chunk: [{ frame, ball: [x, y] | null, entities: [{ id, kind, team, x, y }] | null }]
+function decodePositionChunk(buffer, unit) {
+  const bytes = new Uint8Array(buffer);
+  let pos = 0;
+
+  function varint() {
+    let value = 0;
+    let scale = 1;
+    for (;;) {
+      const byte = bytes[pos++];
+      value += (byte & 0x7f) * scale;
+      if (byte < 0x80) return value;
+      scale *= 128;
+    }
+  }
+  function zigzag() {
+    const value = varint();
+    return value % 2 ? -(value + 1) / 2 : value / 2;
+  }
+
+  const first = varint();
+  const count = varint();
+  const frames = [];
+  const lastXY = new Map();
+  let ballX = 0;
+  let ballY = 0;
+  for (let frame = first; frame < first + count; frame++) {
+    const flags = varint();
+    let ball = null;
+    let entities = null;
+    if (flags & FLAG_BALL) {
+      ballX += zigzag();
+      ballY += zigzag();
+      ball = [ballX * unit, ballY * unit];
+    }
+    if (flags & FLAG_PITCH) {
+      entities = [];
+      let id = 0;
+      const n = varint();
+      for (let i = 0; i < n; i++) {
+        id += varint();
+        const code = bytes[pos++];
+        const last = lastXY.get(id) || [0, 0];
+        const xy = [last[0] + zigzag(), last[1] + zigzag()];
+        lastXY.set(id, xy);
+        entities.push({ id, kind: code >> 2, team: (code & 3) - 1, x: xy[0] * unit, y: xy[1] * unit });
+      }
+    }
+    frames.push({ frame, ball, entities });
+  }
+  return frames;
+}
+
+class PositionStream {
+  constructor(url) {
+    this.url = url;
+    this.meta = null;
+    this.chunks = new Map();   // chunk index -> Promise of decoded frames
+  }
+
+  async load() {
+    const res = await fetch(this.url);
+    if (!res.ok) throw new Error(`Position stream not available: ${res.status}`);
+    this.meta = await res.json();
+    return this.meta;
+  }
+
+  chunk(index) {
+    if (index < 0 || index >= this.meta.chunks) return null;
+    if (!this.chunks.has(index)) {
+      const promise = fetch(`${this.url}/${index}.bin`)
+        .then(res => {
+          if (!res.ok) throw new Error(`Chunk ${index}: ${res.status}`);
+          return res.arrayBuffer();
+        })
+        .then(buffer => decodePositionChunk(buffer, this.meta.unit_cm))
+        .catch(err => {
+          this.chunks.delete(index);   // retry on the next request
+          throw err;
+        });
+      this.chunks.set(index, promise);
+      // drop the chunks farthest from the one just requested
+      while (this.chunks.size > RADAR_CHUNKS_KEPT) {
+        let farthest = index;
+        this.chunks.forEach((_, key) => {
+          if (Math.abs(key - index) > Math.abs(farthest - index)) farthest = key;
+        });
+        this.chunks.delete(farthest);
+      }
+    }
+    return this.chunks.get(index);
+  }
+
+  // Positions of a frame (null while its chunk is loading), and prefetch of the next chunk
+  async frame(frame) {
+    const index = Math.floor(frame / this.meta.chunk_frames);
+    const promise = this.chunk(index);
+    if (!promise) return null;
+    this.chunk(index + 1);
+    const frames = await promise;
+    return frames[frame - index * this.meta.chunk_frames] || null;
+  }
+}
+
+function drawRadarPitch(ctx, meta, scale) {
+  const { length, width } = meta.pitch;
+  const m = PITCH_MARKINGS;
+  const px = v => (v + RADAR_PADDING) * scale;
+
+  ctx.fillStyle = '#22a33a';
+  ctx.fillRect(0, 0, ctx.canvas.width, ctx.canvas.height);
+  ctx.strokeStyle = '#ffffff';
+  ctx.lineWidth = 2;
+  ctx.strokeRect(px(0), px(0), length * scale, width * scale);
+
+  ctx.beginPath();
+  ctx.moveTo(px(length / 2), px(0));
+  ctx.lineTo(px(length / 2), px(width));
+  ctx.stroke();
+  ctx.beginPath();
+  ctx.arc(px(length / 2), px(width / 2), m.centreCircleRadius * scale, 0, 2 * Math.PI);
+  ctx.stroke();
+
+  [[m.penaltyBoxLength, m.penaltyBoxWidth], [m.goalBoxLength, m.goalBoxWidth]].forEach(([boxLength, boxWidth]) => {
+    const top = (width - boxWidth) / 2;
+    ctx.strokeRect(px(0), px(top), boxLength * scale, boxWidth * scale);
+    ctx.strokeRect(px(length - boxLength), px(top), boxLength * scale, boxWidth * scale);
+  });
+
+  ctx.fillStyle = '#ffffff';
+  [m.penaltySpotDistance, length / 2, length - m.penaltySpotDistance].forEach(x => {
+    ctx.beginPath();
+    ctx.arc(px(x), px(width / 2), 3, 0, 2 * Math.PI);
+    ctx.fill();
+  });
+}
+
+function drawRadarPoint(ctx, x, y, radius, color) {
+  ctx.beginPath();
+  ctx.arc(x, y, radius, 0, 2 * Math.PI);
+  ctx.fillStyle = color;
+  ctx.fill();
+  ctx.strokeStyle = '#000000';
+  ctx.lineWidth = 1;
+  ctx.stroke();
+}
+
+// Draw the radar for `video` on `canvas` until the returned function is called
+async function attachRadar(video, canvas, positionsUrl) {
+  const stream = new PositionStream(positionsUrl);
+  const meta = await stream.load();
+  const scale = canvas.width / (meta.pitch.length + 2 * RADAR_PADDING);
+  canvas.height = Math.round((meta.pitch.width + 2 * RADAR_PADDING) * scale);
+  const ctx = canvas.getContext('2d');
+  const px = v => (v + RADAR_PADDING) * scale;
+
+  // the pitch is drawn once and copied under the points of every frame
+  drawRadarPitch(ctx, meta, scale);
+  const background = ctx.getImageData(0, 0, canvas.width, canvas.height);
+
+  let drawnFrame = -1;
+  let stopped = false;
+
+  async function render() {
+    if (stopped) return;
+    const frame = Math.min(Math.floor(video.currentTime * meta.fps), meta.frames - 1);
+    if (frame !== drawnFrame) {
+      try {
+        const positions = await stream.frame(frame);
+        if (positions) {
+          ctx.putImageData(background, 0, 0);
+          (positions.entities || []).forEach(e => {
+            const color = meta.palette[e.team] || '#9ca3af';
+            drawRadarPoint(ctx, px(e.x), px(e.y), e.kind === 2 ? 7 : 8, color);
+          });
+          if (positions.ball) {
+            drawRadarPoint(ctx, px(positions.ball[0]), px(positions.ball[1]), 4, meta.ball_color);
+          }
+          drawnFrame = frame;
+        }
+      } catch (err) {
+        console.error('Radar:', err);
+      }
+    }
+    requestAnimationFrame(render);
+  }
+  requestAnimationFrame(render);
+
+  return () => { stopped = true; };
+}
+
+window.attachRadar = attachRadar;
@@ -451,6 +451,45 @@ async function loadTransfers() {
   }
 }
 
+// ---------- Feature: Match Analysis (our own analysis jobs) ----------
+const metricsJobInput = byId('metricsJobId');
+const btnMatchMetrics = byId('btnMatchMetrics');
+const outTeamMetrics = byId('outTeamMetrics');
+const outPlayerMetrics = byId('outPlayerMetrics');
+
+async function loadMatchMetrics() {
+  const jobId = metricsJobInput?.value?.trim();
+  if (!jobId) return;
+  try {
+    setLoading(btnMatchMetrics, true, 'Metrics');
+    const data = await getJSON(`${BACKEND_BASE}/metrics/${encodeURIComponent(jobId)}`);
+
+    const teams = Object.entries(data.teams || {}).map(([team, t]) => ({ team, ...t }));
+    renderList(outTeamMetrics, teams, [
+      { header: 'Team', value: r => `Team ${Number(r.team) + 1}` },
+      { header: 'Possession', value: r => r.possession_pct === null ? '-' : `${r.possession_pct}%` },
+      { header: 'Distance (km)', value: r => (r.distance_m / 1000).toFixed(2) },
+      { header: 'Avg. Width (m)', value: 'avg_width_m' },
+      { header: 'Avg. Centroid (m)', value: r => r.avg_centroid_m.join(', ') }
+    ]);
+
+    renderList(outPlayerMetrics, data.players || [], [
+      { header: 'Track', value: r => `#${r.tracker_id}` },
+      { header: 'Team', value: r => `Team ${r.team + 1}` },
+      { header: 'Distance (m)', value: r => formatNumber(r.distance_m) },
+      { header: 'Top Speed (km/h)', value: 'top_speed_kmh' },
+      { header: 'Sprints', value: 'sprints' },
+      { header: 'On Ball (s)', value: 'possession_s' },
+      { header: 'Tracked (s)', value: 'seconds_tracked' }
+    ]);
+  } catch (e) {
+    console.error(e);
+    if (outPlayerMetrics) outPlayerMetrics.innerHTML = `<div class="error">No metrics for this job</div>`;
+  } finally {
+    setLoading(btnMatchMetrics, false);
+  }
+}
+
 // ---------- Wire buttons ----------
 if (btnProfiles) btnProfiles.addEventListener('click', loadProfiles);
 if (btnPlayerStats) btnPlayerStats.addEventListener('click', loadPlayerStats);
@@ -461,6 +500,7 @@ if (btnTopAssists) btnTopAssists.addEventListener('click', () => loadLeaderboard
 if (btnTopYC) btnTopYC.addEventListener('click', () => loadLeaderboard('topyellowcards'));
 if (btnTopRC) btnTopRC.addEventListener('click', () => loadLeaderboard('topredcards'));
 if (btnTransfers) btnTransfers.addEventListener('click', loadTransfers);
+if (btnMatchMetrics) btnMatchMetrics.addEventListener('click', loadMatchMetrics);
 
 // Initial log
 console.log('📊 Statistics page loaded successfully!');
@@ -17,9 +17,13 @@ const uploadAnotherBtn = document.getElementById('uploadAnotherBtn');
 
 // Processed video display element
 const resultVideo = document.getElementById('resultVideo');
+const resultRadar = document.getElementById('resultRadar');
+const clientRadar = document.getElementById('clientRadar');
 
 let selectedFile = null;
 let processedVideoUrl = null;
+let positionsUrl = null;   // position stream of the job, for the client-side radar
+let stopRadar = null;
 
 const BACKEND_BASE = 'http://127.0.0.1:5000'; // Flask backend
 const UPLOAD_ENDPOINT = `${BACKEND_BASE}/upload`;
@@ -106,7 +110,8 @@ async function startAnalysis(filename) {
   const response = await fetch(`${BACKEND_BASE}/start_analysis`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ filename })
+    // with the client-side radar the server renders the camera view only
+    body: JSON.stringify({ filename, radar: clientRadar && clientRadar.checked ? 'client' : 'server' })
   });
   if (!response.ok) {
     throw new Error('Failed to start analysis');
@@ -176,6 +181,7 @@ async function pollJobStatus(jobId) {
       if (statusData.status === 'done') {
         clearInterval(intervalId);
         processedVideoUrl = statusData.output_url;
+        positionsUrl = clientRadar && clientRadar.checked ? statusData.positions_url : null;
         showResults();
       } else if (statusData.status === 'error') {
         clearInterval(intervalId);
@@ -299,7 +305,7 @@ function showResults() {
   // Show processed video
   if (resultVideo) {
     if (processedVideoUrl) {
-      resultVideo.src = processedVideoUrl.startsWith('/videos/')
+      resultVideo.src = processedVideoUrl.startsWith('/')
         ? `${BACKEND_BASE}${processedVideoUrl}`
         : processedVideoUrl;
       resultVideo.load();
@@ -309,13 +315,23 @@ function showResults() {
       resultVideo.style.display = 'none';
     }
   }
+
+  // Radar drawn in the browser, in sync with the camera video
+  if (resultRadar && resultVideo && positionsUrl && window.attachRadar) {
+    window.attachRadar(resultVideo, resultRadar, `${BACKEND_BASE}${positionsUrl}`)
+      .then(stop => {
+        stopRadar = stop;
+        resultRadar.style.display = 'block';
+      })
+      .catch(err => console.error('Radar unavailable:', err));
+  }
 }
 
 // Download analyzed video
 downloadBtn.addEventListener('click', () => {
   if (processedVideoUrl) {
     const link = document.createElement('a');
-    link.href = processedVideoUrl.startsWith('/videos/')
+    link.href = processedVideoUrl.startsWith('/')
       ? `${BACKEND_BASE}${processedVideoUrl}`
       : processedVideoUrl;
     link.download = selectedFile ? ('analyzed_' + selectedFile.name) : 'analyzed_video.mp4';
@@ -335,6 +351,7 @@ uploadAnotherBtn.addEventListener('click', resetUpload);
 function resetUpload() {
   selectedFile = null;
   processedVideoUrl = null;
+  positionsUrl = null;
   videoInput.value = '';
   previewVideo.src = '';
   videoDetails.innerHTML = '';
@@ -355,6 +372,11 @@ function resetUpload() {
     resultVideo.src = '';
     resultVideo.style.display = 'none';
   }
+  if (stopRadar) {
+    stopRadar();
+    stopRadar = null;
+  }
+  if (resultRadar) resultRadar.style.display = 'none';
 }
 
 // Helpers
@@ -415,16 +437,24 @@ async function fetchUploadedVideos() {
     if (!res.ok) throw new Error(`List failed: ${res.status}`);
     const data = await res.json();
     const list = Array.isArray(data.videos) ? data.videos : [];
+    const total = Number.isFinite(data.total) ? data.total : list.length;
     const badge = document.getElementById('uvCount');
-    if (badge) badge.textContent = `${list.length} ${list.length === 1 ? 'file' : 'files'}`;
-    renderVideoList(list);
+    if (badge) badge.textContent = `${total} ${total === 1 ? 'file' : 'files'}`;
+    renderVideoList(list, data.items || []);
   } catch (err) {
     console.error('List videos error:', err);
     renderVideoList([]);
   }
 }
 
-function renderVideoList(videos) {
+function videoMeta(item) {
+  if (!item || !item.width) return 'Stored on server';
+  const secs = Math.round(item.duration || 0);
+  const length = `${Math.floor(secs / 60)}:${String(secs % 60).padStart(2, '0')}`;
+  return `${item.width}×${item.height} · ${Math.round(item.fps)} fps · ${length}`;
+}
+
+function renderVideoList(videos, items = []) {
   const container = document.getElementById('videoList');
   if (!container) return;
 
@@ -433,7 +463,7 @@ function renderVideoList(videos) {
     return;
   }
 
-  const html = videos.map(name => {
+  const html = videos.map((name, i) => {
     const href = `${BACKEND_BASE}/videos/${encodeURIComponent(name)}`;
     const ext = (name.split('.').pop() || '').toUpperCase();
     return `
@@ -442,7 +472,7 @@ function renderVideoList(videos) {
           <div class="uv-icon">${ext.slice(0,3)}</div>
           <div style="min-width:0;">
             <div class="uv-name">${name}</div>
-            <div class="uv-meta">Stored on server</div>
+            <div class="uv-meta">${videoMeta(items[i])}</div>
           </div>
         </div>
         <div class="uv-ops">